@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Run extract or verify over many recordings on a pool of workers (see cicada/batch.py)."""
+import sys
+import time
+import extract
+import verify
+from cicada import batch, interface
+
+def main(argv: list[str] | None = None):
+	argv = list(sys.argv[1:] if argv is None else argv)
+	job_args = []
+	if "--" in argv: # everything after -- is passed to each extract/verify run
+		job_args = argv[argv.index("--") + 1:]
+		argv = argv[:argv.index("--")]
+	parser = interface.build_batch_parser()
+	args = parser.parse_args(argv)
+	l_recordings = batch.find_recordings(args.inputs)
+	if not l_recordings:
+		parser.error(f"No recordings ({', '.join(batch.RECORDING_SUFFIXES)}) found in {' '.join(args.inputs)}.")
+	try:
+		l_tasks = batch.plan_tasks(args.command, l_recordings, job_args, args.workers)
+	except ValueError as exc:
+		parser.error(str(exc))
+	t0 = time.perf_counter()
+	l_rows = batch.run(l_tasks, {"extract": extract.main, "verify": verify.main}[args.command], args.workers, args.force)
+	summary_csv = interface.resolve_output_path(l_tasks[0].log.parent, args.summary_csv) # in the runs' out-dir
+	print(f"[batch] {batch.write_summary(l_rows, summary_csv, time.perf_counter() - t0)}")
+	print(f"[batch] wrote {summary_csv}")
+	if any(row["status"] == "failed" for row in l_rows):
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
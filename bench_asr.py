@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Benchmark transcription configurations on a reference clip."""
+from cicada import asr, interface
+from cicada.ingest import WHISPER_FS_HZ, ingest
+
+def run(args):
+	out_dir = interface.ensure_output_dir(args.out_dir)
+	print(f"[bench-asr] loading {args.clip}")
+	audio = ingest(args.clip, rates=(WHISPER_FS_HZ,), start_sec=args.start, end_sec=args.end)
+	reference_text = args.reference_text.read_text(encoding="utf-8") if args.reference_text else None
+	l_configs = [
+		asr.ASRConfig(backend=args.asr_backend, model_size=size, compute_type=ct, cpu_threads=args.cpu_threads)
+		for size in args.model_sizes for ct in args.compute_types
+	]
+	l_results = asr.run_benchmark(
+		audio.at(WHISPER_FS_HZ),
+		l_configs,
+		fs_Hz=WHISPER_FS_HZ,
+		window_sec=args.window_sec,
+		beam_size=args.beam_size,
+		reference_text=reference_text,
+	)
+	print(f"[bench-asr] {audio.duration_sec:.1f}s clip, {args.window_sec:g}s windows, beam {args.beam_size}:")
+	for r in sorted(l_results, key=lambda r: r.rtf):
+		print(f"\t{r.describe()}")
+	output_json = interface.resolve_output_path(out_dir, args.output_json)
+	asr.save_results(
+		output_json,
+		l_results,
+		clip=str(args.clip),
+		clip_sec=audio.duration_sec,
+		window_sec=args.window_sec,
+		beam_size=args.beam_size,
+		reference=str(args.reference_text) if args.reference_text else "last configuration",
+	)
+	print(f"[bench-asr] wrote {output_json}")
+	if args.rtf_budget is not None:
+		best = asr.pick_config(l_results, args.rtf_budget, args.min_agreement)
+		if best is None:
+			print(f"[bench-asr] nothing meets RTF <= {args.rtf_budget:g} with agreement >= {args.min_agreement:g}")
+		else:
+			print(f"[bench-asr] fastest within budget: {best.describe()}")
+	return l_results
+
+def main(argv: list[str] | None = None):
+	parser = interface.build_bench_asr_parser()
+	args = parser.parse_args(argv)
+	run(args)
+
+if __name__ == "__main__":
+	main()
@@ -6,7 +6,13 @@ import importlib
 COMMAND_MODULES = {
 	"sign": "sign",
 	"extract": "extract",
+	"decode": "decode",
 	"verify": "verify",
+	"bench-asr": "bench_asr",
+	"recheck": "recheck",
+	"batch": "batch",
+	"serve": "serve",
+	"submit": "submit",
 }
 
 def main(argv: list[str] | None = None):
@@ -0,0 +1,166 @@
+"""Transcription backends, and a benchmark for choosing between their configurations.
+A backend turns an ASRConfig into a model with faster-whisper's
+`transcribe(audio, **kwargs) -> (segments, info)` interface, which is all the
+signer and verifier rely on. `bench-asr` measures each configuration's real-time
+factor (decode seconds per audio second) and word agreement on a reference clip;
+sign and verify can then pick the fastest configuration within an RTF budget.
+"""
+import difflib
+import json
+import threading
+import time
+from dataclasses import asdict, astuple, dataclass, replace
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+MODEL_SIZES = ("tiny.en", "base.en", "small.en", "medium.en")
+COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+_BACKENDS: dict[str, Callable[["ASRConfig"], object]] = {}
+_RESIDENT_MODELS: dict[tuple, object] | None = None # ASRConfig fields -> model, once keep_models_resident()
+_RESIDENT_LOCK = threading.Lock()
+
+@dataclass
+class ASRConfig:
+	backend: str = "faster-whisper"
+	model_size: str = "medium.en"
+	compute_type: str = "float32"
+	cpu_threads: int = 0 # 0 for the backend's default
+	num_workers: int = 1 # Model replicas for concurrent decodes
+
+	def describe(self) -> str:
+		return f"{self.backend} {self.model_size} {self.compute_type}"
+
+def register_backend(name: str):
+	"""Register `fn(cfg) -> model` as the loader for backend `name`."""
+	def _register(fn):
+		_BACKENDS[name] = fn
+		return fn
+	return _register
+
+def backend_choices() -> tuple[str, ...]:
+	return tuple(sorted(_BACKENDS))
+
+@register_backend("faster-whisper")
+def _load_faster_whisper(cfg: ASRConfig):
+	from faster_whisper import WhisperModel
+	return WhisperModel(cfg.model_size, compute_type=cfg.compute_type, cpu_threads=cfg.cpu_threads, num_workers=cfg.num_workers)
+
+def load_model(cfg: ASRConfig):
+	try:
+		loader = _BACKENDS[cfg.backend]
+	except KeyError as exc:
+		raise ValueError(f"Unknown ASR backend {cfg.backend!r}; expected one of {backend_choices()}.") from exc
+	if _RESIDENT_MODELS is None:
+		return loader(cfg)
+	key = astuple(cfg)
+	with _RESIDENT_LOCK: # concurrent jobs wanting the same model load it once
+		if key not in _RESIDENT_MODELS:
+			_RESIDENT_MODELS[key] = loader(cfg)
+		return _RESIDENT_MODELS[key]
+
+def keep_models_resident():
+	"""Keep every model load_model loads, returning it again for the same configuration (for
+	long-running processes such as `serve`)."""
+	global _RESIDENT_MODELS
+	if _RESIDENT_MODELS is None:
+		_RESIDENT_MODELS = {}
+
+def resident_models() -> list[ASRConfig]:
+	return [ASRConfig(*key) for key in (_RESIDENT_MODELS or {})]
+
+def model_loader(cfg: ASRConfig) -> Callable[[str], object]:
+	"""`load_model(model_size)` for the deadline scheduler: same backend and compute type, any size."""
+	return lambda size: load_model(replace(cfg, model_size=size))
+
+@dataclass
+class BenchResult:
+	backend: str
+	model_size: str
+	compute_type: str
+	load_sec: float # Model load plus one warm-up decode
+	decode_sec: float
+	audio_sec: float
+	text: str
+	word_agreement: float | None = None # Against the reference transcript
+
+	@property
+	def rtf(self) -> float:
+		"""Real-time factor: decode seconds per audio second (below 1 is faster than real time)."""
+		return self.decode_sec / self.audio_sec if self.audio_sec else float("inf")
+
+	def config(self, base: ASRConfig = ASRConfig()) -> ASRConfig:
+		return replace(base, backend=self.backend, model_size=self.model_size, compute_type=self.compute_type)
+
+	def describe(self) -> str:
+		agreement = "n/a" if self.word_agreement is None else f"{self.word_agreement:.3f}"
+		return f"{self.backend:>14} {self.model_size:>10} {self.compute_type:>12}  RTF {self.rtf:6.3f}  agreement {agreement}  load {self.load_sec:5.1f}s"
+
+def word_agreement(ref_text: str, hyp_text: str) -> float:
+	"""Fraction of regularized words the two transcripts share, in order (1.0 is identical)."""
+	from .payload.signature import regularize_transcript
+	ref = [t.text for t in regularize_transcript(ref_text)]
+	hyp = [t.text for t in regularize_transcript(hyp_text)]
+	if not ref and not hyp:
+		return 1.0
+	matcher = difflib.SequenceMatcher(None, ref, hyp, autojunk=False)
+	n_match = sum(b.size for b in matcher.get_matching_blocks())
+	return 2.0 * n_match / (len(ref) + len(hyp))
+
+def bench_config(cfg: ASRConfig, samples: np.ndarray, fs_Hz: float = 16e3, window_sec: float = 10.0, beam_size: int = 1, load=load_model, clock: Callable[[], float] = time.monotonic) -> BenchResult:
+	"""Decode `samples` in consecutive windows (as the signer does) and time it."""
+	t0 = clock()
+	model = load(cfg)
+	seg_iter, _ = model.transcribe(samples[:int(fs_Hz)], language="en", beam_size=beam_size, vad_filter=False)
+	list(seg_iter) # warm up (segments decode lazily)
+	load_sec = clock() - t0
+	n_window = int(window_sec * fs_Hz)
+	l_text = []
+	t0 = clock()
+	for start in range(0, len(samples), n_window):
+		seg_iter, _ = model.transcribe(samples[start:(start + n_window)], language="en", beam_size=beam_size, vad_filter=False)
+		l_text.append("".join(seg.text for seg in seg_iter).strip())
+	decode_sec = clock() - t0
+	return BenchResult(cfg.backend, cfg.model_size, cfg.compute_type, load_sec, decode_sec, len(samples) / fs_Hz, " ".join(l_text))
+
+def run_benchmark(samples: np.ndarray, l_configs: list[ASRConfig], fs_Hz: float = 16e3, window_sec: float = 10.0, beam_size: int = 1, reference_text: str | None = None, load=load_model, clock: Callable[[], float] = time.monotonic) -> list[BenchResult]:
+	"""Benchmark every configuration. Without a reference transcript, agreement is measured
+	against the last configuration (by convention the largest, most precise one)."""
+	l_results = []
+	for cfg in l_configs:
+		print(f"[bench-asr] {cfg.describe()}...")
+		l_results.append(bench_config(cfg, samples, fs_Hz, window_sec, beam_size, load, clock))
+		print(f"[bench-asr] {l_results[-1].describe()}")
+	ref = reference_text if reference_text is not None else (l_results[-1].text if l_results else "")
+	for r in l_results:
+		r.word_agreement = word_agreement(ref, r.text)
+	return l_results
+
+def pick_config(l_results: list[BenchResult], rtf_budget: float, min_agreement: float = 0.0) -> BenchResult | None:
+	"""Fastest result within the RTF budget and agreement floor, or None."""
+	l_ok = [r for r in l_results if r.rtf <= rtf_budget and (r.word_agreement or 0.0) >= min_agreement]
+	return min(l_ok, key=lambda r: r.rtf) if l_ok else None
+
+def save_results(path: Path, l_results: list[BenchResult], **meta):
+	doc = {**meta, "results": [asdict(r) for r in l_results]}
+	Path(path).write_text(json.dumps(doc, indent=2), encoding="utf-8")
+
+def load_results(path: Path) -> list[BenchResult]:
+	doc = json.loads(Path(path).read_text(encoding="utf-8"))
+	return [BenchResult(**r) for r in doc["results"]]
+
+def select_config(base: ASRConfig, bench_path: Path, rtf_budget: float, min_agreement: float = 0.0) -> ASRConfig:
+	"""Replace base's model size and compute type with the fastest benchmarked configuration
+	meeting the budget; keep base if there are no results or none qualify."""
+	try:
+		l_results = [r for r in load_results(bench_path) if r.backend == base.backend]
+	except FileNotFoundError:
+		print(f"[asr] no benchmark at {bench_path} (run `cicada.py bench-asr`); using {base.describe()}")
+		return base
+	best = pick_config(l_results, rtf_budget, min_agreement)
+	if best is None:
+		print(f"[asr] no benchmarked configuration meets RTF <= {rtf_budget:g} with agreement >= {min_agreement:g}; using {base.describe()}")
+		return base
+	print(f"[asr] selected {best.describe()}")
+	return best.config(base)
@@ -0,0 +1,259 @@
+"""Audio device abstraction.
+Signer stages open their streams through open_input/open_output. A device may be
+a sounddevice id or name (a real sound card), or a virtual device backed by an
+array or WAV file. Virtual streams call the same callbacks as sounddevice, but
+on a thread and in stream time rather than wall time, so the signer can run
+headless and faster than real time.
+
+An input with speed=None is paced by its consumer: callbacks may block, and the
+stream only advances as fast as the pipeline accepts audio. A virtual output
+given an input as its `clock` plays in that input's stream time, so its samples
+line up with the input audio sample for sample.
+"""
+import threading
+import time
+from math import gcd
+from pathlib import Path
+from types import SimpleNamespace
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+def _resample(x: np.ndarray, fs_from: float, fs_to: float) -> np.ndarray:
+	if fs_from == fs_to: return x
+	g = gcd(int(fs_from), int(fs_to))
+	return resample_poly(x, int(fs_to) // g, int(fs_from) // g)
+
+def _time_info(t: float):
+	return SimpleNamespace(currentTime=t, inputBufferAdcTime=t, outputBufferDacTime=t)
+
+class _VirtualStream:
+	"""Drives a sounddevice-style callback from a thread. Subclasses implement _run."""
+	def __init__(self, samplerate: float, blocksize: int, callback, channels: int = 1):
+		self.samplerate = float(samplerate)
+		self.blocksize = int(blocksize)
+		self.callback = callback
+		self.channels = channels
+		self._stop = threading.Event()
+		self._thread = None
+		self._done = threading.Event()
+
+	@property
+	def active(self) -> bool:
+		return self._thread is not None and not self._done.is_set()
+
+	def start(self):
+		self._thread = threading.Thread(target=self._main, daemon=True)
+		self._thread.start()
+
+	def _main(self):
+		try:
+			self._run()
+		finally:
+			self._done.set()
+
+	def stop(self):
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join()
+
+	def close(self): pass
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *exc):
+		self.stop()
+		self.close()
+
+class ArrayInput:
+	"""Virtual microphone playing `samples` (mono, at `fs_Hz`) once.
+	speed: multiple of real time, or None to go as fast as the consumer accepts blocks."""
+	def __init__(self, samples: np.ndarray, fs_Hz: float, speed: float | None = None):
+		samples = np.asarray(samples, dtype=np.float32)
+		self.samples = samples.mean(axis=1) if samples.ndim > 1 else samples
+		self.fs_Hz = float(fs_Hz)
+		self.speed = speed
+		self._cv = threading.Condition()
+		self._t_stream = 0.0
+		self._finished = False
+		self._followers: list["_OutputStream"] = [] # Running output streams clocked by this input
+
+	@property
+	def blocking(self) -> bool:
+		"""True if the stream's callback may block (the consumer paces the stream)."""
+		return self.speed is None
+
+	@property
+	def stream_time(self) -> float:
+		"""Seconds of audio delivered so far."""
+		return self._t_stream
+
+	def wait_for(self, t: float, timeout: float | None = None) -> bool:
+		"""Block until stream time reaches `t` seconds or the input is finished. Returns False on timeout."""
+		with self._cv:
+			return self._cv.wait_for(lambda: self._t_stream >= t or self._finished, timeout)
+
+	@property
+	def finished(self) -> bool:
+		return self._finished
+
+	def open(self, samplerate: float, blocksize: int, callback, channels: int = 1) -> _VirtualStream:
+		return _InputStream(self, samplerate, blocksize, callback, channels)
+
+class WavInput(ArrayInput):
+	"""Virtual microphone playing a WAV file."""
+	def __init__(self, path: Path, speed: float | None = None):
+		samples, fs_Hz = sf.read(path, dtype="float32", always_2d=True)
+		super().__init__(samples, fs_Hz, speed=speed)
+		self.path = Path(path)
+
+class _InputStream(_VirtualStream):
+	def __init__(self, dev: ArrayInput, samplerate, blocksize, callback, channels=1):
+		super().__init__(samplerate, blocksize, callback, channels)
+		self.dev = dev
+
+	def _run(self):
+		dev = self.dev
+		x = _resample(dev.samples, dev.fs_Hz, self.samplerate).astype(np.float32)
+		t0 = time.monotonic()
+		n = 0
+		while n < len(x) and not self._stop.is_set():
+			with dev._cv: # outputs clocked by this input play up to its stream time first, so they stay in step
+				while not self._stop.is_set() and not all(o._caught_up(n / self.samplerate) for o in dev._followers):
+					dev._cv.wait(0.05)
+			block = x[n:(n + self.blocksize)]
+			indata = np.repeat(block[:, None], self.channels, axis=1)
+			self.callback(indata, len(block), _time_info(n / self.samplerate), None)
+			n += len(block)
+			with dev._cv:
+				dev._t_stream = n / self.samplerate
+				dev._cv.notify_all()
+			if dev.speed is not None:
+				lag = t0 + n / self.samplerate / dev.speed - time.monotonic()
+				if lag > 0: self._stop.wait(lag)
+		with dev._cv:
+			dev._finished = True
+			dev._cv.notify_all()
+
+class ArrayOutput:
+	"""Virtual speaker collecting everything played into `samples`.
+	clock: an ArrayInput whose stream time paces playback (e.g. the signer's virtual mic);
+	without one, plays at `speed` times real time."""
+	def __init__(self, clock: ArrayInput | None = None, speed: float = 1.0, max_tail_sec: float = 30.0):
+		self.clock = clock
+		self.speed = speed
+		self.max_tail_sec = max_tail_sec # On stop, keep playing until silence, at most this long
+		self.fs_Hz = None
+		self._blocks: list[np.ndarray] = []
+
+	@property
+	def samples(self) -> np.ndarray:
+		return np.concatenate(self._blocks) if self._blocks else np.zeros(0, dtype=np.float32)
+
+	def open(self, samplerate: float, blocksize: int, callback, channels: int = 1) -> _VirtualStream:
+		self.fs_Hz = float(samplerate)
+		return _OutputStream(self, samplerate, blocksize, callback, channels)
+
+	def _on_close(self): pass
+
+class WavOutput(ArrayOutput):
+	"""Virtual speaker written to a WAV file when its stream is closed."""
+	def __init__(self, path: Path, clock: ArrayInput | None = None, speed: float = 1.0, max_tail_sec: float = 30.0):
+		super().__init__(clock=clock, speed=speed, max_tail_sec=max_tail_sec)
+		self.path = Path(path)
+
+	def _on_close(self):
+		sf.write(self.path, self.samples, int(self.fs_Hz))
+		print(f"[audio] wrote {len(self.samples)/self.fs_Hz:.1f}s of transmit audio to {self.path}")
+
+class _OutputStream(_VirtualStream):
+	def __init__(self, dev: ArrayOutput, samplerate, blocksize, callback, channels=1):
+		super().__init__(samplerate, blocksize, callback, channels)
+		self.dev = dev
+		self.n_out = 0
+
+	def _pull(self, keep_silent: bool = True) -> bool:
+		"""Play one block; True if it was not silent. Silent blocks are discarded unless keep_silent."""
+		outdata = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+		self.callback(outdata, self.blocksize, _time_info(self.n_out / self.samplerate), None)
+		sounding = bool(np.any(outdata))
+		if sounding or keep_silent:
+			self.dev._blocks.append(outdata[:, 0].copy())
+			self.n_out += self.blocksize
+			if self.dev.clock is not None:
+				with self.dev.clock._cv:
+					self.dev.clock._cv.notify_all()
+		return sounding
+
+	def _caught_up(self, t: float) -> bool:
+		"""Whether everything this stream may play by stream time t has been played."""
+		return (self.n_out + self.blocksize) / self.samplerate > t
+
+	def _run(self):
+		dev = self.dev
+		if dev.clock is not None:
+			with dev.clock._cv:
+				dev.clock._followers.append(self)
+		try:
+			self._play()
+		finally:
+			if dev.clock is not None:
+				with dev.clock._cv:
+					dev.clock._followers.remove(self)
+					dev.clock._cv.notify_all()
+
+	def _play(self):
+		dev = self.dev
+		t0 = time.monotonic()
+		while not self._stop.is_set():
+			t_next = (self.n_out + self.blocksize) / self.samplerate
+			if dev.clock is not None:
+				if not dev.clock.wait_for(t_next, timeout=0.05): continue
+				if dev.clock.finished and dev.clock.stream_time < t_next: # input is over: play out whatever is queued
+					if not self._pull(keep_silent=False): self._stop.wait(0.05)
+					continue
+			else:
+				lag = t0 + t_next / dev.speed - time.monotonic()
+				if lag > 0 and self._stop.wait(lag): break
+			self._pull()
+		n_tail = 0
+		while self._pull() and n_tail < dev.max_tail_sec * self.samplerate:
+			n_tail += self.blocksize
+
+	def close(self):
+		self.dev._on_close()
+
+def open_input(device, samplerate: float, blocksize: int, callback, channels: int = 1, dtype: str = "float32"):
+	"""Input stream on a virtual device or a sounddevice device id/name (None for the default)."""
+	if isinstance(device, ArrayInput):
+		return device.open(samplerate, blocksize, callback, channels)
+	import sounddevice as sd
+	return sd.InputStream(samplerate=samplerate, channels=channels, blocksize=blocksize, dtype=dtype, callback=callback, device=device)
+
+def open_output(device, samplerate: float, blocksize: int, callback, channels: int = 1, dtype: str = "float32"):
+	"""Output stream on a virtual device or a sounddevice device id/name (None for the default)."""
+	if isinstance(device, ArrayOutput):
+		return device.open(samplerate, blocksize, callback, channels)
+	import sounddevice as sd
+	return sd.OutputStream(samplerate=samplerate, channels=channels, blocksize=blocksize, dtype=dtype, callback=callback, device=device)
+
+def is_blocking(device) -> bool:
+	"""True for virtual inputs paced by their consumer (callbacks may block instead of dropping audio)."""
+	return bool(getattr(device, "blocking", False))
+
+def mix_wavs(l_paths: list[Path], out_path: Path, fs_Hz: float = 44100.0, gains: list[float] | None = None) -> np.ndarray:
+	"""Sum WAV files (aligned at their first sample, resampled to fs_Hz) into one mono WAV, e.g. speech plus transmissions."""
+	gains = gains or [1.0] * len(l_paths)
+	l_x = []
+	for path, g in zip(l_paths, gains):
+		x, fs = sf.read(path, dtype="float32", always_2d=True)
+		l_x.append(g * _resample(x.mean(axis=1), fs, fs_Hz))
+	mix = np.zeros(max(len(x) for x in l_x), dtype=np.float32)
+	for x in l_x:
+		mix[:len(x)] += x
+	peak = np.max(np.abs(mix)) if len(mix) else 0.0
+	if peak > 1.0: mix /= peak
+	sf.write(out_path, mix, int(fs_Hz))
+	return mix
@@ -0,0 +1,189 @@
+"""Run extract or verify over many recordings (`batch`).
+Inputs are recordings, directories (searched recursively for recordings) or glob patterns.
+Files are spread over a pool of worker processes, each of which keeps the modem and Whisper
+model it builds for its first file and reuses them for the rest (longest recordings are handed
+out first). A file whose outputs are newer than it is skipped unless forced. Each file's output
+goes to `<out-dir>/<stem>_<command>.log`, and every file gets a row in a summary CSV: frames
+found, payloads matched, audio seconds and processing time. Demodulator plots are off, as every
+file would overwrite the same plot files.
+"""
+import csv
+import glob
+import multiprocessing as mp
+import time
+import traceback
+from collections.abc import Callable
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from pathlib import Path
+
+import soundfile as sf
+
+from . import asr, interface
+
+RECORDING_SUFFIXES = (".wav", ".flac", ".ogg")
+SUMMARY_COLUMNS = ["input", "status", "frames", "matched", "audio_sec", "wall_sec", "x_realtime", "output", "error"]
+_PER_FILE_ARGS = ("output_csv", "output_md", "frames_csv", "soft_frames") # would name one file's outputs for all of them
+
+def find_recordings(l_inputs: list[str]) -> list[Path]:
+	"""Recordings named by paths, directories and glob patterns, in order and without repeats."""
+	l_paths = []
+	for spec in l_inputs:
+		path = Path(spec)
+		if path.is_dir():
+			l_paths += sorted(p for p in path.rglob("*") if p.suffix.lower() in RECORDING_SUFFIXES)
+		elif path.exists():
+			l_paths.append(path)
+		else:
+			l_paths += sorted(Path(p) for p in glob.glob(spec, recursive=True) if Path(p).suffix.lower() in RECORDING_SUFFIXES)
+	return list(dict.fromkeys(l_paths))
+
+@dataclass
+class BatchTask:
+	command: str
+	input: Path
+	argv: list[str] # The command's arguments for this file
+	output: Path # Main output (frames CSV for extract, annotated transcript for verify)
+	frames_csv: Path
+	matches_csv: Path | None
+	log: Path
+	audio_sec: float
+
+	def up_to_date(self) -> bool:
+		mtime = self.input.stat().st_mtime
+		return all(p.exists() and p.stat().st_mtime >= mtime for p in (self.output, self.frames_csv))
+
+	def summary_row(self, status: str, wall_sec: float | None = None, error: str = "") -> dict:
+		frames = _count_rows(self.frames_csv)
+		matched = None
+		if self.matches_csv is not None and frames is not None:
+			# verify only writes matches when there are some: an archive older than the frames is stale
+			fresh = self.matches_csv.exists() and self.matches_csv.stat().st_mtime >= self.frames_csv.stat().st_mtime
+			matched = _count_rows(self.matches_csv) if fresh else 0
+		return {
+			"input": str(self.input),
+			"status": status,
+			"frames": frames,
+			"matched": matched,
+			"audio_sec": round(self.audio_sec, 2),
+			"wall_sec": None if wall_sec is None else round(wall_sec, 2),
+			"x_realtime": round(self.audio_sec / wall_sec, 2) if wall_sec else None,
+			"output": str(self.output) if self.output.exists() else None,
+			"error": error,
+		}
+
+def _count_rows(path: Path) -> int | None:
+	if not path.exists():
+		return None
+	with open(path, newline="") as f:
+		return sum(1 for _ in csv.DictReader(f))
+
+def _audio_sec(path: Path, start: float | None, end: float | None) -> float:
+	duration = sf.info(str(path)).duration
+	return max(min(duration, end if end is not None else duration) - (start or 0.0), 0.0)
+
+def plan_tasks(command: str, l_recordings: list[Path], job_args: list[str], workers: int = 1) -> list[BatchTask]:
+	"""One task per recording, with the outputs `command` will write for it. Raises ValueError
+	for arguments that name a single file's outputs (--demod-plot's included), for recordings sharing a name, and for
+	verify --jobs with several workers (pool workers cannot start pools of their own)."""
+	parser = {"extract": interface.build_extract_parser, "verify": interface.build_verify_parser}[command]()
+	d_stems = {}
+	for path in l_recordings:
+		d_stems.setdefault(path.stem, []).append(str(path))
+	l_clashes = [paths for paths in d_stems.values() if len(paths) > 1]
+	if l_clashes:
+		raise ValueError(f"Recordings would overwrite each other's outputs: {'; '.join(', '.join(p) for p in l_clashes)}")
+	if "--demod-plot" in job_args:
+		raise ValueError("--demod-plot writes the same plot files for every recording; run the command on one file to plot.")
+	l_tasks = []
+	for path in l_recordings:
+		argv = [str(path)] + job_args + ["--demod-no-plot"]
+		args = parser.parse_args(argv)
+		l_per_file = [name for name in _PER_FILE_ARGS if getattr(args, name, None) is not None]
+		if l_per_file:
+			raise ValueError(f"--{l_per_file[0].replace('_', '-')} names one file's output; batch names them after each recording.")
+		if workers > 1 and getattr(args, "jobs", 1) > 1:
+			raise ValueError("Use either batch --workers or verify --jobs, not both.")
+		out_dir = Path(args.out_dir)
+		frames_csv = interface.resolve_output_path(out_dir, f"{path.stem}_frames.csv")
+		if command == "extract":
+			output, matches_csv = frames_csv, None
+		else:
+			output = interface.resolve_output_path(out_dir, f"{path.stem}_transcript.md")
+			matches_csv = output.with_name(f"{path.stem}_matches.csv")
+		log = interface.resolve_output_path(out_dir, f"{path.stem}_{command}.log")
+		l_tasks.append(BatchTask(command, path, argv, output, frames_csv, matches_csv, log, _audio_sec(path, args.start, args.end)))
+	return l_tasks
+
+def _init_worker():
+	asr.keep_models_resident()
+	interface.keep_modems_resident()
+
+def run_task(task: BatchTask, main: Callable[[list[str]], object]) -> dict:
+	"""Run one file with its output going to task.log; returns its summary row."""
+	t0 = time.perf_counter()
+	status, error = "done", ""
+	task.log.parent.mkdir(parents=True, exist_ok=True)
+	with open(task.log, "w") as f, redirect_stdout(f), redirect_stderr(f):
+		try:
+			main(task.argv)
+		except SystemExit as exc:
+			if exc.code:
+				status, error = "failed", f"exited with status {exc.code}"
+		except Exception as exc:
+			traceback.print_exc()
+			status, error = "failed", f"{type(exc).__name__}: {exc}"
+	return task.summary_row(status, time.perf_counter() - t0, error)
+
+def _run_indexed(item):
+	i, task, main = item
+	return i, run_task(task, main)
+
+def run(l_tasks: list[BatchTask], main: Callable[[list[str]], object], workers: int = 1, force: bool = False) -> list[dict]:
+	"""Summary rows of every task, in task order. `main` must be picklable (a module-level function) when workers > 1."""
+	l_rows = [None] * len(l_tasks)
+	l_todo = []
+	for i, task in enumerate(l_tasks):
+		if not force and task.up_to_date():
+			l_rows[i] = task.summary_row("up to date")
+		else:
+			l_todo.append(i)
+	l_todo.sort(key=lambda i: -l_tasks[i].audio_sec) # longest first, so no worker is left with a long file at the end
+	print(f"[batch] {len(l_todo)} of {len(l_tasks)} recordings to {l_tasks[0].command if l_tasks else 'process'}; {len(l_tasks) - len(l_todo)} up to date")
+	l_items = [(i, l_tasks[i], main) for i in l_todo]
+	if workers <= 1 or len(l_items) <= 1:
+		_init_worker()
+		results = map(_run_indexed, l_items)
+		pool = None
+	else:
+		pool = mp.Pool(min(workers, len(l_items)), initializer=_init_worker)
+		results = pool.imap_unordered(_run_indexed, l_items)
+	try:
+		for n, (i, row) in enumerate(results, start=1):
+			l_rows[i] = row
+			counts = "" if row["frames"] is None else f": {row['frames']} frames" + ("" if row["matched"] is None else f", {row['matched']} matched")
+			error = f" - {row['error']}" if row["error"] else ""
+			print(f"[batch] {n}/{len(l_items)} {row['status']} {row['input']}{counts} ({row['wall_sec']:.1f} s){error}")
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+	return l_rows
+
+def write_summary(l_rows: list[dict], path: Path, wall_sec: float) -> str:
+	"""Write the summary CSV and return a one-line description of the batch."""
+	path.parent.mkdir(parents=True, exist_ok=True)
+	with open(path, "w", newline="") as f:
+		writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+		writer.writeheader()
+		writer.writerows(l_rows)
+	l_ran = [r for r in l_rows if r["status"] != "up to date"]
+	n_failed = sum(r["status"] == "failed" for r in l_rows)
+	n_frames = sum(r["frames"] or 0 for r in l_rows)
+	l_matched = [r["matched"] for r in l_rows if r["matched"] is not None] # verify only
+	audio_sec = sum(r["audio_sec"] for r in l_ran)
+	throughput = f"{audio_sec / wall_sec:.1f}x real time" if wall_sec > 0 else "n/a"
+	return (
+		f"{len(l_rows)} recordings ({len(l_ran) - n_failed} processed, {len(l_rows) - len(l_ran)} up to date, {n_failed} failed): "
+		f"{n_frames} frames{f', {sum(l_matched)} matched' if l_matched else ''}; {audio_sec:.0f} s of audio in {wall_sec:.0f} s ({throughput})"
+	)
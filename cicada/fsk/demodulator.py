@@ -4,7 +4,7 @@ from pathlib import Path
 import numpy as np
 from numpy.lib.stride_tricks import as_strided
 from .waveform import FSKWaveform
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 
 @dataclass 
 class FSKDemodulatorParameters: 
@@ -141,8 +141,10 @@ class FSKDemodulator:
 		plot_dir.mkdir(parents=True, exist_ok=True)
 		lo = np.percentile(Ep, 10)
 		hi = np.percentile(Ep, 90)
-		plt.figure(figsize=(32,4)) # Ep: 2D energy vs time
-		plt.imshow(
+		# Standalone Figures rather than pyplot's: nothing global to keep them alive or share between threads
+		fig = Figure(figsize=(32,4)) # Ep: 2D energy vs time
+		ax = fig.add_subplot()
+		im = ax.imshow(
 			Ep-np.mean(Ep,axis=0, keepdims=True),
 			aspect="auto",
 			vmin=lo,
@@ -150,18 +152,19 @@ class FSKDemodulator:
 			origin="lower",
 		)
 		for dr in l_dr: # Line markers for detected frames
-			plt.axvline(dr.pulse_map_idx, color="red", linestyle="--", linewidth=0.8)
-		plt.colorbar(label="energy")
-		plt.title("Ep (pulse energy map)")
-		plt.xlabel("time col / sample offset (strided)")
-		plt.ylabel("pulse / hop")
-		plt.savefig(plot_dir / "pulse_energy.png", dpi=300, bbox_inches="tight")
+			ax.axvline(dr.pulse_map_idx, color="red", linestyle="--", linewidth=0.8)
+		fig.colorbar(im, ax=ax, label="energy")
+		ax.set_title("Ep (pulse energy map)")
+		ax.set_xlabel("time col / sample offset (strided)")
+		ax.set_ylabel("pulse / hop")
+		fig.savefig(plot_dir / "pulse_energy.png", dpi=300, bbox_inches="tight")
 
-		plt.figure(figsize=(32,4)) # Ef: 1D frame energy
-		plt.plot(np.log10(np.maximum(Ef, 1e-12))) # avoid log10(0) while preserving shape
+		fig = Figure(figsize=(32,4)) # Ef: 1D frame energy
+		ax = fig.add_subplot()
+		ax.plot(np.log10(np.maximum(Ef, 1e-12))) # avoid log10(0) while preserving shape
 		for dr in l_dr: # Line markers for detected frames
-			plt.axvline(dr.pulse_map_idx, color="red", linestyle="--", linewidth=1.8)
-		plt.title("log(Ef) (frame energy)")
-		plt.xlabel("start col")
-		plt.ylabel("score")
-		plt.savefig(plot_dir / "frame_energy.png", dpi=300, bbox_inches="tight")
+			ax.axvline(dr.pulse_map_idx, color="red", linestyle="--", linewidth=1.8)
+		ax.set_title("log(Ef) (frame energy)")
+		ax.set_xlabel("start col")
+		ax.set_ylabel("score")
+		fig.savefig(plot_dir / "frame_energy.png", dpi=300, bbox_inches="tight")
@@ -0,0 +1,129 @@
+"""Read a recording once and fan it out at every rate the pipeline needs.
+PCM WAVs are memory-mapped; anything else soundfile can open (FLAC, Ogg, 24-bit
+WAV) is decoded block by block. Each mono block is pushed through one streaming
+polyphase resampler per output rate (e.g. 44.1 kHz for the demodulator and
+16 kHz for Whisper), so the file is read and decoded exactly once.
+"""
+import hashlib
+import struct
+from dataclasses import dataclass, field
+from math import ceil, gcd
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+DEMOD_FS_HZ = 44100
+WHISPER_FS_HZ = 16000
+_MEMMAP_DTYPES = {"PCM_U8": np.uint8, "PCM_16": np.int16, "PCM_32": np.int32, "FLOAT": np.float32, "DOUBLE": np.float64}
+
+def _wav_data_offset(path: Path) -> int | None:
+	"""Byte offset of a RIFF/WAVE file's data chunk, or None if it can't be located."""
+	with open(path, "rb") as f:
+		if f.read(4) != b"RIFF":
+			return None
+		f.read(4)
+		if f.read(4) != b"WAVE":
+			return None
+		while len(hdr := f.read(8)) == 8:
+			chunk_id, size = hdr[:4], struct.unpack("<I", hdr[4:])[0]
+			if chunk_id == b"data":
+				return f.tell()
+			f.seek(size + (size & 1), 1) # chunks are word-aligned
+	return None
+
+class StreamingResampler:
+	"""Block-wise resample_poly. Keeps enough input history to cover the anti-aliasing
+	filter, so concatenating the outputs matches resample_poly over the whole signal."""
+	def __init__(self, fs_in: float, fs_out: float):
+		g = gcd(int(fs_in), int(fs_out))
+		self.up, self.down = int(fs_out) // g, int(fs_in) // g
+		half_len = 10 * max(self.up, self.down) # resample_poly's filter half-length (upsampled taps)
+		self.n_ctx = ceil((half_len / self.up + 1) / self.down) * self.down # input history, a multiple of down
+		self._buf = np.zeros(0, dtype=np.float32)
+		self._buf_start = 0 # input index of _buf[0]; always a multiple of down
+		self._n_in = 0
+		self._n_out = 0
+
+	def process(self, x: np.ndarray, final: bool = False) -> np.ndarray:
+		if self.up == self.down:
+			return x
+		self._buf = np.concatenate([self._buf, x.astype(np.float32, copy=False)])
+		self._n_in += len(x)
+		if final:
+			n_hi = -(-self._n_in * self.up // self.down)
+		else:
+			n_hi = max(self._n_in - self.n_ctx, 0) * self.up // self.down
+		if n_hi <= self._n_out:
+			return np.zeros(0, dtype=np.float32)
+		out_base = self._buf_start * self.up // self.down
+		y = resample_poly(self._buf, self.up, self.down)
+		y = y[(self._n_out - out_base):(n_hi - out_base)].astype(np.float32, copy=False)
+		self._n_out = n_hi
+		keep_from = max((n_hi * self.down // self.up - self.n_ctx) // self.down * self.down, self._buf_start)
+		self._buf = self._buf[(keep_from - self._buf_start):]
+		self._buf_start = keep_from
+		return y
+
+@dataclass
+class IngestedAudio:
+	path: Path
+	fs_Hz: int # Sample rate of the file
+	start_sec: float # Offset of the ingested span within the file
+	duration_sec: float
+	digest: str # sha256 of the ingested span's audio data
+	streams: dict[int, np.ndarray] = field(default_factory=dict) # output rate -> mono float32 samples
+
+	def at(self, fs_Hz: float) -> np.ndarray:
+		return self.streams[int(fs_Hz)]
+
+def iter_blocks(path: Path, start_sec: float = 0.0, end_sec: float | None = None, block_frames: int = 1 << 16, digest=None):
+	"""Yield (file rate, mono float32 block) over [start_sec, end_sec) of a recording."""
+	info = sf.info(str(path))
+	fs = int(info.samplerate)
+	i0 = min(max(int(round(start_sec * fs)), 0), info.frames)
+	i1 = info.frames if end_sec is None else min(max(int(round(end_sec * fs)), i0), info.frames)
+	dtype = _MEMMAP_DTYPES.get(info.subtype) if info.format in ("WAV", "WAVEX") else None
+	offset = _wav_data_offset(path) if dtype is not None else None
+	if offset is not None and offset + info.frames * info.channels * np.dtype(dtype).itemsize <= Path(path).stat().st_size:
+		mm = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(info.frames, info.channels))
+		scale = {np.uint8: 1 / 128, np.int16: 1 / 32768, np.int32: 1 / 2147483648}.get(dtype, 1.0)
+		for b0 in range(i0, i1, block_frames):
+			raw = mm[b0:min(b0 + block_frames, i1)]
+			if digest is not None: digest.update(memoryview(np.ascontiguousarray(raw)).cast("B"))
+			block = raw.astype(np.float32)
+			if dtype == np.uint8: block -= 128
+			yield fs, (block.mean(axis=1) if info.channels > 1 else block[:, 0]) * np.float32(scale)
+		del mm
+		return
+	with sf.SoundFile(str(path)) as f:
+		f.seek(i0)
+		n_left = i1 - i0
+		while n_left > 0:
+			raw = f.read(min(block_frames, n_left), dtype="float32", always_2d=True)
+			if not len(raw): break
+			n_left -= len(raw)
+			if digest is not None: digest.update(memoryview(raw).cast("B"))
+			yield fs, raw.mean(axis=1) if info.channels > 1 else raw[:, 0]
+
+def ingest(path: Path, rates=(DEMOD_FS_HZ, WHISPER_FS_HZ), start_sec: float | None = None, end_sec: float | None = None, block_frames: int = 1 << 16) -> IngestedAudio:
+	"""Read [start_sec, end_sec) of a recording once and resample it to every rate in `rates`."""
+	path = Path(path)
+	start_sec = start_sec or 0.0
+	info = sf.info(str(path))
+	fs = int(info.samplerate)
+	l_rates = sorted({int(r) for r in rates})
+	resamplers = {r: StreamingResampler(fs, r) for r in l_rates}
+	parts = {r: [] for r in l_rates}
+	h = hashlib.sha256()
+	n_in = 0
+	for _, block in iter_blocks(path, start_sec, end_sec, block_frames, digest=h):
+		n_in += len(block)
+		for r in l_rates:
+			parts[r].append(resamplers[r].process(block))
+	for r in l_rates:
+		parts[r].append(resamplers[r].process(np.zeros(0, dtype=np.float32), final=True))
+	streams = {r: np.concatenate(parts[r]).astype(np.float32, copy=False) for r in l_rates}
+	start_sec = min(int(round(start_sec * fs)), info.frames) / fs
+	return IngestedAudio(path, fs, start_sec, n_in / fs, h.hexdigest(), streams)
@@ -11,8 +11,11 @@ from cicada.fsk.waveform import FSKParameters, FSKWaveform, default_mod_table
 from cicada.fsk.demodulator import FSKDemodulatorParameters, FSKDemodulator
 from cicada.modem import Modem
 from cicada.payload import payload_type_choices
+from cicada.offline_asr import ENGINES
+from cicada import asr
 
 DEFAULT_OUT_DIR = Path("out")
+_RESIDENT_MODEMS: dict[tuple, tuple] | None = None # modem settings -> (modem, wf, demod), once keep_modems_resident()
 
 class WrappedHelpFormatter(HelpFormatter):
 	def __init__(self, prog, width=80, max_help_position=26):
@@ -55,6 +58,36 @@ def add_waveform_args(parser: ArgumentParser):
 	parser.add_argument("--wf-symbols-per-frame", type=int, default=1024, help="Symbols per frame (used by modem/demod).")
 	parser.add_argument("--wf-mod-pattern", type=int, default=16, help="Pattern multiplier for modulation table.")
 
+def add_seek_args(parser: ArgumentParser):
+	parser.add_argument("--start", type=float, default=None, help="Only process the recording from this many seconds in.")
+	parser.add_argument("--end", type=float, default=None, help="Only process the recording up to this many seconds in.")
+
+def add_asr_args(parser: ArgumentParser):
+	parser.add_argument("--asr-backend", choices=asr.backend_choices(), default="faster-whisper", help="Transcription backend.")
+	parser.add_argument("--compute-type", default="float32", help="Compute type for the Whisper model (e.g. float32, int8_float32, int8).")
+	parser.add_argument(
+		"--rtf-budget",
+		type=float,
+		default=None,
+		help="Use the fastest configuration from the --asr-bench results with a real-time factor (decode s per audio s) at most this, instead of --model-size/--compute-type.",
+	)
+	parser.add_argument("--asr-bench", type=Path, default=Path("asr_bench.json"), help="bench-asr results (relative to out-dir unless absolute) used by --rtf-budget.")
+	parser.add_argument("--min-agreement", type=float, default=0.9, help="Word agreement a configuration needs to be chosen by --rtf-budget.")
+
+def build_asr_config(args, out_dir: Path) -> asr.ASRConfig:
+	"""ASRConfig from the --asr-* flags; with --rtf-budget, the benchmarked pick also replaces
+	args.model_size and args.compute_type so the rest of the command follows it."""
+	cfg = asr.ASRConfig(
+		backend=args.asr_backend,
+		model_size=args.model_size,
+		compute_type=args.compute_type,
+		cpu_threads=getattr(args, "cpu_threads", 0),
+	)
+	if args.rtf_budget is not None:
+		cfg = asr.select_config(cfg, resolve_output_path(out_dir, args.asr_bench), args.rtf_budget, args.min_agreement)
+		args.model_size, args.compute_type = cfg.model_size, cfg.compute_type
+	return cfg
+
 def build_waveform_parameters(args) -> FSKParameters:
 	return FSKParameters(
 		bits_per_symbol=args.wf_bits_per_symbol,
@@ -113,8 +146,15 @@ def add_modem_flags(parser: ArgumentParser):
 		action="store_false",
 		help="Do not discard duplicate frames detected by the demodulator.",
 	)
+	parser.add_argument(
+		"--transport",
+		dest="use_transport",
+		action="store_true",
+		help="Fragment payloads across multiple frames with the transport layer (sender and receiver must agree).",
+	)
 	parser.set_defaults(discard_duplicate_frames=True)
 	parser.set_defaults(use_ldpc=True)
+	parser.set_defaults(use_transport=False)
 
 # ---- Command-specific parser builders ----
 def build_sign_parser() -> argparse.ArgumentParser:
@@ -129,9 +169,31 @@ def build_sign_parser() -> argparse.ArgumentParser:
 	add_demod_args(parser)
 	add_modem_flags(parser)
 	parser.add_argument("--model-size", default="medium.en", help="Whisper model size.")
+	add_asr_args(parser)
 	parser.add_argument("--window-sec", type=float, default=10.0, help="Transcription window length (s).")
 	parser.add_argument("--overlap-sec", type=float, default=3.0, help="Transcription window overlap (s).")
 	parser.add_argument("--mic-blocksize", type=int, default=1024, help="Audio blocksize for microphone capture.")
+	parser.add_argument(
+		"--transcribe-process",
+		action="store_true",
+		help="Run Whisper in a separate process reading mic audio from a shared-memory ring buffer.",
+	)
+	parser.add_argument(
+		"--incremental",
+		action="store_true",
+		help="Decode only new audio each hop (prompted with prior text) and assemble the window from word timestamps.",
+	)
+	parser.add_argument(
+		"--vad",
+		action="store_true",
+		help="Skip transcription of windows without speech and decode only the speech regions.",
+	)
+	parser.add_argument(
+		"--deadline",
+		action="store_true",
+		help="Decode each window within one hop: shrink the window, lower beam size or fall back to smaller models when behind.",
+	)
+	parser.add_argument("--beam-size", type=int, default=1, help="Whisper beam size for signer transcription.")
 	parser.add_argument(
 		"--signer-transcript",
 		type=Path,
@@ -141,9 +203,44 @@ def build_sign_parser() -> argparse.ArgumentParser:
 		help="Optional path to log raw transcript chunks (default: out/signer_transcript.md).",
 	)
 	parser.add_argument("--header-message", default="q3q.net", help="Header message for SignaturePayloads.")
+	parser.add_argument(
+		"--payload-version",
+		type=int,
+		choices=(1, 2),
+		default=1,
+		help="SignaturePayload format. Version 2 gives 4 of the 11 header message characters to the word count and a digest of the signed words, so verifiers only run pairings on windows with that digest (older verifiers cannot read it).",
+	)
 	parser.add_argument("--bls-privkey", type=Path, default=Path("bls_privkey.b64"), help="Path to BLS private key (base64).")
 	parser.add_argument("--bls-pubkey", type=Path, default=Path("bls_pubkey.b64"), help="Path to BLS public key (base64).")
 	parser.add_argument("--mic-device", default=None, help="sounddevice input device (id or name) to use for microphone capture.")
+	parser.add_argument("--speaker-device", default=None, help="sounddevice output device (id or name) to transmit on.")
+	parser.add_argument("--tx-blocksize", type=int, default=1024, help="Audio blocksize for the transmit stream.")
+	parser.add_argument("--mic-wav", type=Path, default=None, help="Read the microphone from this WAV file instead of a sound card (headless simulation).")
+	parser.add_argument(
+		"--mic-speed",
+		type=float,
+		default=None,
+		help="Play --mic-wav at this multiple of real time (default: as fast as transcription keeps up, dropping nothing).",
+	)
+	parser.add_argument(
+		"--speaker-wav",
+		type=Path,
+		nargs="?",
+		const=Path("signer_tx.wav"),
+		default=None,
+		help="Write transmissions to this WAV file instead of a sound card, aligned with --mic-wav if given (default: out/signer_tx.wav).",
+	)
+	parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus-text latency metrics on http://127.0.0.1:PORT/metrics.")
+	parser.add_argument(
+		"--metrics-json",
+		type=Path,
+		nargs="?",
+		const=Path("signer_metrics.json"),
+		default=None,
+		help="Periodically write a JSON metrics snapshot (default: out/signer_metrics.json).",
+	)
+	parser.add_argument("--metrics-interval", type=float, default=5.0, help="Seconds between JSON metrics snapshots.")
+	parser.add_argument("--latency-slo", type=float, default=None, help="Warn and count violations when speech-to-signature latency exceeds this many seconds.")
 	return parser
 
 def build_extract_parser() -> argparse.ArgumentParser:
@@ -157,7 +254,8 @@ def build_extract_parser() -> argparse.ArgumentParser:
 	add_waveform_args(parser)
 	add_demod_args(parser)
 	add_modem_flags(parser)
-	parser.add_argument("input_wav", type=Path, help="Input WAV file to analyze.")
+	parser.add_argument("input_wav", type=Path, help="Input recording to analyze (WAV, FLAC or Ogg; resampled to --wf-fs).")
+	add_seek_args(parser)
 	parser.add_argument(
 		"--output-csv",
 		type=Path,
@@ -166,6 +264,43 @@ def build_extract_parser() -> argparse.ArgumentParser:
 		default=None,
 		help="Filename (relative to out-dir unless absolute) for extracted payload metadata (default: out/<input>_frames.csv).",
 	)
+	parser.add_argument(
+		"--soft-frames",
+		type=Path,
+		default=None,
+		help="Filename (relative to out-dir unless absolute) for the demodulated frames before FEC, for `decode` (default: out/<input>_soft.npz).",
+	)
+	parser.add_argument(
+		"--no-soft-frames",
+		dest="write_soft_frames",
+		action="store_false",
+		help="Do not write the soft-frame store.",
+	)
+	parser.add_argument(
+		"--nonascii-discard-threshold",
+		type=int,
+		default=0,
+		help="Maximum allowed non-ASCII characters allowed in a text field before discarding a payload.",
+	)
+	parser.set_defaults(write_soft_frames=True)
+	return parser
+
+def build_decode_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		description="Re-run FEC and payload parsing on the soft frames `extract` stored, without demodulating the recording again.",
+		formatter_class=lambda prog: WrappedHelpFormatter(prog, width=80),
+	)
+	add_output_dir_arg(parser)
+	add_debug_flag(parser)
+	add_payload_type_arg(parser)
+	add_modem_flags(parser)
+	parser.add_argument("input_npz", type=Path, help="Soft-frame store written by extract (<input>_soft.npz).")
+	parser.add_argument(
+		"--output-csv",
+		type=Path,
+		default=None,
+		help="Filename (relative to out-dir unless absolute) for decoded payload metadata (default: out/<input>_frames.csv).",
+	)
 	parser.add_argument(
 		"--nonascii-discard-threshold",
 		type=int,
@@ -185,7 +320,8 @@ def build_verify_parser() -> argparse.ArgumentParser:
 	add_waveform_args(parser)
 	add_demod_args(parser)
 	add_modem_flags(parser)
-	parser.add_argument("input", type=Path, help="Input WAV to transcribe or transcript markdown to verify directly.")
+	parser.add_argument("input", type=Path, help="Input recording (WAV, FLAC or Ogg) to transcribe or transcript markdown to verify directly.")
+	add_seek_args(parser)
 	parser.add_argument(
 		"--frames-csv",
 		type=Path,
@@ -201,10 +337,129 @@ def build_verify_parser() -> argparse.ArgumentParser:
 		help="Where to write annotated markdown (default: out/<input>_transcript.md).",
 	)
 	parser.add_argument("--model-size", default="medium.en", help="Whisper model size to use for transcription (signature payloads only).")
+	add_asr_args(parser)
 	parser.add_argument("--window-sec", type=float, default=20.0, help="Transcription window length in seconds.")
 	parser.add_argument("--overlap-sec", type=float, default=16.0, help="Transcription window overlap in seconds.")
+	parser.add_argument(
+		"--single-pass",
+		action="store_true",
+		help="Transcribe the recording once with word timestamps and cut the overlapping windows from that timeline instead of re-decoding each one.",
+	)
+	parser.add_argument(
+		"--asr-engine",
+		choices=ENGINES,
+		default="serial",
+		help="How to run Whisper over the windows: one at a time, in batches, or concurrently on --num-workers model replicas. With --single-pass, batched splits the recording on speech pauses (Silero VAD) rather than decoding it whole.",
+	)
+	parser.add_argument("--batch-size", type=int, default=8, help="Windows per batch for --asr-engine batched.")
+	parser.add_argument("--cpu-threads", type=int, default=0, help="CPU threads per Whisper replica (0: CTranslate2 default).")
+	parser.add_argument("--num-workers", type=int, default=1, help="Whisper replicas decoding concurrently for --asr-engine pool.")
+	parser.add_argument(
+		"--transcript-cache",
+		type=Path,
+		default=Path("transcript_cache"),
+		help="Directory (relative to out-dir unless absolute) caching transcriptions by audio content and model settings.",
+	)
+	parser.add_argument("--no-transcript-cache", dest="transcript_cache", action="store_const", const=None, help="Always re-transcribe.")
+	parser.add_argument("--transcript-cache-mb", type=float, default=512.0, help="Size budget of the transcript cache; least recently used entries are evicted.")
 	parser.add_argument("--bls-pubkey", type=Path, default=Path("bls_pubkey.b64"), help="BLS public key for SignaturePayload verification (base64).")
+	parser.add_argument(
+		"--keyring",
+		type=Path,
+		default=None,
+		help="Directory of <name>.b64 public keys (each optionally with <name>.headers, one header message per line) or CSV with columns name, bls_pubkey, header_message. Verifies payloads from several signers in one pass, instead of --bls-pubkey.",
+	)
 	parser.add_argument("--nonascii-discard-threshold", type=int, default=0, help="Max non-ASCII characters allowed in payload content before discarding.")
+	parser.add_argument(
+		"--localize",
+		action="store_true",
+		help="Only match each payload against speech just before where its frame was heard (using word timestamps), and drop payloads whose header timestamps are inconsistent with their position in the recording.",
+	)
+	parser.add_argument("--signer-window-sec", type=float, default=10.0, help="Signer's transcription window (sign --window-sec), for --localize.")
+	parser.add_argument("--localize-slack-sec", type=float, default=4.0, help="Extra seconds around the signed window allowed for signer latency and timestamp error, for --localize.")
+	parser.add_argument("--timestamp-tolerance-sec", type=float, default=10.0, help="How far a header timestamp may stray from the recording's clock, for --localize.")
+	parser.add_argument(
+		"--merge-chunks",
+		action="store_true",
+		help="Merge the overlapping chunk transcripts into one deduplicated token stream (keeping differing readings as alternates), match each payload once against it and write one annotated transcript instead of one section per chunk.",
+	)
+	parser.add_argument("--jobs", type=int, default=1, help="Worker processes checking payload signatures in parallel (results are identical to --jobs 1).")
+	return parser
+
+def build_bench_asr_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		description="Measure real-time factor and word agreement of transcription configurations on a reference clip.",
+		formatter_class=lambda prog: WrappedHelpFormatter(prog, width=80),
+	)
+	add_output_dir_arg(parser)
+	parser.add_argument("clip", type=Path, help="Reference speech recording (WAV, FLAC or Ogg).")
+	add_seek_args(parser)
+	parser.add_argument("--asr-backend", choices=asr.backend_choices(), default="faster-whisper", help="Transcription backend.")
+	parser.add_argument("--model-sizes", nargs="+", default=list(asr.MODEL_SIZES), help="Model sizes to benchmark, smallest first.")
+	parser.add_argument("--compute-types", nargs="+", default=list(asr.COMPUTE_TYPES), help="Compute types to benchmark, least precise first.")
+	parser.add_argument(
+		"--reference-text",
+		type=Path,
+		default=None,
+		help="Reference transcript of the clip; defaults to the transcript of the last (largest, most precise) configuration.",
+	)
+	parser.add_argument("--window-sec", type=float, default=10.0, help="Decode the clip in consecutive windows of this length (s), as the signer does.")
+	parser.add_argument("--beam-size", type=int, default=1, help="Whisper beam size.")
+	parser.add_argument("--cpu-threads", type=int, default=0, help="CPU threads per model (0: backend default).")
+	parser.add_argument("--output-json", type=Path, default=Path("asr_bench.json"), help="Where to write results (relative to out-dir unless absolute).")
+	parser.add_argument("--rtf-budget", type=float, default=None, help="Also report the fastest configuration within this real-time factor.")
+	parser.add_argument("--min-agreement", type=float, default=0.9, help="Word agreement required by --rtf-budget.")
+	return parser
+
+def build_recheck_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		description="Re-verify archived matches (verify's <input>_matches.csv) with batched BLS checks.",
+		formatter_class=lambda prog: WrappedHelpFormatter(prog, width=80),
+	)
+	parser.add_argument("matches", type=Path, nargs="+", help="Matches CSVs, or directories searched for *_matches.csv.")
+	parser.add_argument("--bls-pubkey", type=Path, default=Path("bls_pubkey.b64"), help="BLS public key the matches were signed with (base64).")
+	parser.add_argument("--keyring", type=Path, default=None, help="Keyring of several signers' public keys (as for verify --keyring), instead of --bls-pubkey.")
+	parser.add_argument("--individual", action="store_true", help="Check every match on its own instead of in one batch (for comparison).")
+	return parser
+
+def build_batch_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		description="Run extract or verify over many recordings on a pool of worker processes. Arguments after -- are passed to every run (e.g. -- --localize --bls-pubkey key.b64).",
+		formatter_class=lambda prog: WrappedHelpFormatter(prog, width=80),
+	)
+	parser.add_argument("command", choices=("extract", "verify"), help="What to run on each recording.")
+	parser.add_argument("inputs", nargs="+", help="Recordings, directories (searched recursively for .wav, .flac and .ogg) or quoted glob patterns.")
+	parser.add_argument("--workers", type=int, default=1, help="Recordings processed at once, each worker loading its own modem and Whisper model once.")
+	parser.add_argument("--force", action="store_true", help="Also process recordings whose outputs are newer than them.")
+	parser.add_argument("--summary-csv", type=Path, default=Path("batch_summary.csv"), help="Summary of every recording (relative to the runs' out-dir unless absolute).")
+	return parser
+
+def build_serve_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		description="Serve extract and verify jobs over local HTTP, keeping Whisper models, modems and public keys loaded between jobs.",
+		formatter_class=lambda prog: WrappedHelpFormatter(prog, width=80),
+	)
+	parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (keep it local: jobs read and write files as this user).")
+	parser.add_argument("--port", type=int, default=8765, help="Port to listen on (0 for any free port).")
+	parser.add_argument("--workers", type=int, default=1, help="Jobs run at once (they share the resident models).")
+	parser.add_argument("--max-queued", type=int, default=8, help="Jobs that may wait for a worker; more are refused with HTTP 503.")
+	parser.add_argument("--no-preload", dest="preload", action="store_false", help="Load the Whisper model and modem on the first job that needs them instead of at startup.")
+	parser.add_argument("--model-size", default="medium.en", help="Whisper model size to preload.")
+	parser.add_argument("--compute-type", default="float32", help="Compute type of the preloaded Whisper model.")
+	parser.add_argument("--asr-backend", choices=asr.backend_choices(), default="faster-whisper", help="Transcription backend of the preloaded model.")
+	parser.add_argument("--cpu-threads", type=int, default=0, help="CPU threads of the preloaded model (0: backend default).")
+	parser.add_argument("--bls-pubkey", type=Path, default=Path("bls_pubkey.b64"), help="BLS public key to parse at startup, if it exists.")
+	parser.add_argument("--keyring", type=Path, default=None, help="Keyring whose keys to parse at startup.")
+	return parser
+
+def build_submit_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		description="Send an extract or verify job to a running `serve` and stream back its output.",
+		formatter_class=lambda prog: WrappedHelpFormatter(prog, width=80),
+	)
+	parser.add_argument("--url", default="http://127.0.0.1:8765", help="Address of the service.")
+	parser.add_argument("command", choices=("extract", "verify"), help="Job to run.")
+	parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments of the job, as for the command itself (paths are resolved on the service's side).")
 	return parser
 
 def add_payload_type_arg(parser: ArgumentParser, default: str = "signature"):
@@ -218,12 +473,37 @@ def add_payload_type_arg(parser: ArgumentParser, default: str = "signature"):
 	)
 
 def build_modem(args, plot_dir: Path):
+	key = None
+	if _RESIDENT_MODEMS is not None:
+		key = tuple(getattr(args, k) for k in MODEM_SETTINGS) + (str(plot_dir),)
+		if key in _RESIDENT_MODEMS:
+			return _RESIDENT_MODEMS[key]
 	wf = FSKWaveform(build_waveform_parameters(args))
 	demod_params = build_demodulator_parameters(args, wf)
 	demod = FSKDemodulator(cfg=demod_params, wf=wf, plot_dir=plot_dir)
 	modem = Modem(wf, demodulator=demod, discard_duplicate_frames=args.discard_duplicate_frames, use_ldpc=args.use_ldpc, use_bit_mask=False)
+	if key is not None:
+		_RESIDENT_MODEMS[key] = modem, wf, demod
 	return modem, wf, demod
 
+# Arguments build_modem depends on
+MODEM_SETTINGS = (
+	"wf_bits_per_symbol", "wf_fs", "wf_fc", "wf_symbol_rate", "wf_symbols_per_frame", "wf_bw", "wf_hop_factor", "wf_mod_pattern",
+	"demod_frame_search_win", "demod_frame_search_step", "demod_pulse_frac", "demod_plot", "discard_duplicate_frames", "use_ldpc",
+)
+
+# Arguments a soft-frame store keeps so `decode` can rebuild the waveform
+SOFT_FRAME_SETTINGS = tuple(k for k in MODEM_SETTINGS if k.startswith(("wf_", "demod_")) and k != "demod_plot")
+
+def keep_modems_resident():
+	"""Reuse the modem build_modem built for the same settings (for long-running processes such as `serve`)."""
+	global _RESIDENT_MODEMS
+	if _RESIDENT_MODEMS is None:
+		_RESIDENT_MODEMS = {}
+
+def resident_modem_count() -> int:
+	return len(_RESIDENT_MODEMS or {})
+
 def load_bls_keypair(priv_path: Path, pub_path: Path):
 	priv_text = priv_path.read_text(encoding="ascii").strip()
 	pub_text = pub_path.read_text(encoding="ascii").strip()
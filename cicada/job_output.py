@@ -0,0 +1,45 @@
+"""Per-thread routing of sys.stdout/sys.stderr, so that `serve` can send what each job prints to
+that job's client while several jobs run at once."""
+import io
+import sys
+import threading
+from collections.abc import Callable
+
+class RoutedStream(io.TextIOBase):
+	"""Stand-in for sys.stdout/sys.stderr sending each thread's writes to its job, if it has one."""
+	def __init__(self, default):
+		self.default = default
+		self.local = threading.local()
+
+	def write(self, s: str) -> int:
+		sink = getattr(self.local, "sink", None)
+		if sink is None:
+			return self.default.write(s)
+		sink(s)
+		return len(s)
+
+	def flush(self):
+		if getattr(self.local, "sink", None) is None:
+			self.default.flush()
+
+def route_output(sink: Callable[[str], None] | None):
+	for stream in (sys.stdout, sys.stderr):
+		if isinstance(stream, RoutedStream):
+			stream.local.sink = sink
+
+def carry_output(fn: Callable) -> Callable:
+	"""fn, printing where the calling thread prints when run on another thread (e.g. a pool the job starts)."""
+	l_sinks = [getattr(stream.local, "sink", None) if isinstance(stream, RoutedStream) else None for stream in (sys.stdout, sys.stderr)]
+	if not any(l_sinks):
+		return fn
+	def _routed(*args, **kwargs):
+		l_prev = [(stream, getattr(stream.local, "sink", None)) for stream in (sys.stdout, sys.stderr) if isinstance(stream, RoutedStream)]
+		for stream, sink in zip((sys.stdout, sys.stderr), l_sinks):
+			if isinstance(stream, RoutedStream):
+				stream.local.sink = sink
+		try:
+			return fn(*args, **kwargs)
+		finally:
+			for stream, sink in l_prev:
+				stream.local.sink = sink
+	return _routed
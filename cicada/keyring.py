@@ -0,0 +1,95 @@
+"""Named BLS public keys of several signers, for verifying multi-signer recordings in one pass.
+A keyring is either a directory of base64 public keys (`<name>.b64`, as written by
+make_bls_keys.py, each optionally with `<name>.headers` listing the header messages that
+signer uses, one per line) or a CSV with columns name, bls_pubkey and header_message (one row
+per header message; the last may be empty). Keys are validated once when loaded. Payloads are
+routed to the keys whose header messages match theirs, and only fall back to the others.
+"""
+import base64
+import csv
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cicada.payload.signature import V2_HEADER_CHARS, get_verifier
+
+N_HEADER_MESSAGE_CHARS = 11
+
+def normalize_header_message(message: str, n_chars: int = N_HEADER_MESSAGE_CHARS) -> str:
+	"""Header messages as they arrive: at most n_chars characters, without NUL padding."""
+	return message[:n_chars].rstrip("\x00").strip()
+
+@dataclass
+class KeyringEntry:
+	name: str
+	pubkey_bytes: bytes
+	header_messages: list[str] = field(default_factory=list) # Normalized
+
+class Keyring:
+	def __init__(self, l_entries: list[KeyringEntry]):
+		self.entries = []
+		self.by_name: dict[str, KeyringEntry] = {}
+		self.by_header: dict[str, list[KeyringEntry]] = {}
+		for entry in l_entries:
+			self.add(entry)
+
+	def add(self, entry: KeyringEntry):
+		if entry.name in self.by_name:
+			raise ValueError(f"Keyring has two keys named {entry.name!r}.")
+		try:
+			get_verifier(entry.pubkey_bytes) # parses and subgroup-checks the key once
+		except ValueError as exc:
+			raise ValueError(f"Keyring key {entry.name!r}: {exc}") from exc
+		entry.header_messages = [normalize_header_message(m) for m in entry.header_messages]
+		self.entries.append(entry)
+		self.by_name[entry.name] = entry
+		for message in entry.header_messages: # as sent in version 1 headers, and cut short in version 2 ones
+			for key in dict.fromkeys([message, normalize_header_message(message, N_HEADER_MESSAGE_CHARS - V2_HEADER_CHARS)]):
+				if entry not in self.by_header.setdefault(key, []):
+					self.by_header[key].append(entry)
+
+	@classmethod
+	def single(cls, pubkey_bytes: bytes, name: str = "bls_pubkey") -> "Keyring":
+		return cls([KeyringEntry(name, bytes(pubkey_bytes))])
+
+	@classmethod
+	def load(cls, path: Path) -> "Keyring":
+		path = Path(path)
+		if path.is_dir():
+			l_entries = []
+			for key_path in sorted(path.glob("*.b64")):
+				pubkey_bytes = base64.b64decode(key_path.read_text(encoding="ascii").strip())
+				try: # compressed (96 bytes) or serialized (192 bytes) G2 points; private keys and the like are skipped
+					get_verifier(pubkey_bytes)
+				except ValueError:
+					print(f"[keyring] skipping {key_path.name}: not a BLS public key")
+					continue
+				headers_path = key_path.with_suffix(".headers")
+				l_headers = headers_path.read_text(encoding="ascii").splitlines() if headers_path.exists() else []
+				l_entries.append(KeyringEntry(key_path.stem, pubkey_bytes, [h for h in l_headers if h.strip()]))
+			return cls(l_entries)
+		d_entries: dict[str, KeyringEntry] = {}
+		with open(path, newline="") as f:
+			for row in csv.DictReader(f):
+				name = row["name"].strip()
+				pubkey_bytes = base64.b64decode(row["bls_pubkey"].strip())
+				entry = d_entries.setdefault(name, KeyringEntry(name, pubkey_bytes))
+				if entry.pubkey_bytes != pubkey_bytes:
+					raise ValueError(f"Keyring lists two keys named {name!r}.")
+				if (row.get("header_message") or "").strip():
+					entry.header_messages.append(row["header_message"])
+		return cls(list(d_entries.values()))
+
+	def candidates(self, header_message: str) -> list[KeyringEntry]:
+		"""Keys to try for a payload: those whose header messages match its own, then the rest."""
+		l_hinted = self.by_header.get(normalize_header_message(header_message), [])
+		return l_hinted + [e for e in self.entries if e not in l_hinted]
+
+	def identify(self, sig_bytes: bytes, msg: bytes, header_message: str) -> KeyringEntry | None:
+		"""The key that made this signature over msg, if any."""
+		for entry in self.candidates(header_message):
+			if get_verifier(entry.pubkey_bytes).verify(sig_bytes, msg):
+				return entry
+		return None
+
+	def __len__(self) -> int:
+		return len(self.entries)
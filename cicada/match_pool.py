@@ -0,0 +1,93 @@
+"""Shard verify's payload matching across worker processes (verify --jobs).
+Each signature check is independent CPU-bound work in blst. The parent tokenizes the
+transcript (or builds the token stream's window index) and parses the public key, then
+forks the workers, which inherit them copy-on-write instead of being sent them. The Whisper
+model has been released by then, so workers only run Python and blst. Each task is a shard
+of payload indices and returns their match indices. Matching is deterministic, so the match
+table equals serial mode's.
+"""
+import multiprocessing as mp
+import threading
+
+from cicada.payload.signature import all_verifiers, get_verifier
+
+_SHARED = {} # Set in the parent before forking; read by the workers
+_LOCK = threading.Lock() # One matching run at a time per process (the `serve` daemon runs jobs on threads)
+
+def can_fork() -> bool:
+	return "fork" in mp.get_all_start_methods()
+
+def _counters() -> dict[bytes, tuple[int, int]]:
+	return {pk: (v.n_miller_loops, v.n_final_exps) for pk, v in all_verifiers().items()}
+
+def _run_shard(match_fn, l_ipl):
+	d0 = _counters()
+	l_matches = match_fn(l_ipl)
+	d1 = _counters()
+	return l_matches, {pk: (n[0] - d0.get(pk, (0, 0))[0], n[1] - d0.get(pk, (0, 0))[1]) for pk, n in d1.items()}
+
+def _match_stream_shard(l_ipl):
+	stream, l_payloads, l_starts, kwargs, fs = (_SHARED[k] for k in ("stream", "payloads", "starts", "payload_kwargs", "fs"))
+	return [(ipl, stream.match_window(l_payloads[ipl], kwargs, l_starts[ipl] / fs)) for ipl in l_ipl]
+
+def _match_chunks_shard(l_ipl):
+	payload_cls, l_chunks, l_chunk_tokens = _SHARED["payload_cls"], _SHARED["chunks"], _SHARED["chunk_tokens"]
+	l_matches = []
+	for ichunk, (chunk, l_tokens) in enumerate(zip(l_chunks, l_chunk_tokens)):
+		d = payload_cls.match_chunk(chunk.text, _SHARED["payloads"], _SHARED["starts"], _SHARED["payload_kwargs"], _SHARED["fs"], chunk.words, l_tokens=l_tokens, l_payload_idx=l_ipl)
+		l_matches += [(ichunk, ipl, idx) for ipl, idx in d.items()]
+	return l_matches
+
+_MATCHERS = {"stream": _match_stream_shard, "chunks": _match_chunks_shard}
+
+def _worker(args):
+	name, l_ipl = args
+	return _run_shard(_MATCHERS[name], l_ipl)
+
+def _run(name: str, jobs: int, shared: dict) -> list:
+	"""Run a matcher over every payload, split into `jobs` interleaved shards (payloads are in
+	recording order, so each shard gets a share of every part of the recording)."""
+	with _LOCK:
+		return _run_locked(name, jobs, shared)
+
+def _run_locked(name: str, jobs: int, shared: dict) -> list:
+	_SHARED.update(shared)
+	try:
+		n_payloads = len(shared["payloads"])
+		pk = shared["payload_kwargs"].get("bls_pubkey_bytes")
+		if pk is not None:
+			get_verifier(pk) # parse the key once, before forking (a keyring's keys already are)
+		if jobs <= 1 or n_payloads <= 1 or not can_fork():
+			return _MATCHERS[name](list(range(n_payloads)))
+		jobs = min(jobs, n_payloads)
+		l_shards = [(name, list(range(i, n_payloads, jobs))) for i in range(jobs)]
+		with mp.get_context("fork").Pool(jobs) as pool:
+			l_results = pool.map(_worker, l_shards, chunksize=1)
+		l_matches = []
+		for l_shard_matches, d_counts in l_results:
+			l_matches += l_shard_matches
+			for pk, (n_miller, n_final) in d_counts.items(): # so the parent's counters cover the workers' checks
+				get_verifier(pk).add_counts(n_miller, n_final)
+		return l_matches
+	finally:
+		_SHARED.clear()
+
+def match_stream(stream, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz: float, jobs: int = 1) -> dict:
+	"""match_payloads on `jobs` processes: payload index -> StreamMatch."""
+	for word_count in sorted({pl.header.word_count for pl in l_payloads}):
+		stream.windows(word_count) # build the window index before forking
+	for word_count in sorted({pl.header.word_count for pl in l_payloads if getattr(pl.header, "version", 1) == 2}):
+		stream.digest_windows(word_count)
+	shared = {"stream": stream, "payloads": l_payloads, "starts": l_payload_start_sam, "payload_kwargs": payload_kwargs, "fs": wav_fs_Hz}
+	l_matches = _run("stream", jobs, shared)
+	return {ipl: stream.to_match(l_payloads[ipl], iwin) for ipl, iwin in sorted(l_matches) if iwin >= 0}
+
+def match_chunks(payload_cls, l_chunks, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz: float, jobs: int = 1):
+	"""payload_cls.match_chunk for every chunk on `jobs` processes. Returns each chunk's tokens and
+	its {payload index: token index} matches, for annotate_chunk."""
+	l_chunk_tokens = [payload_cls.tokenize_text(chunk.text) for chunk in l_chunks]
+	shared = {"payload_cls": payload_cls, "chunks": l_chunks, "chunk_tokens": l_chunk_tokens, "payloads": l_payloads, "starts": l_payload_start_sam, "payload_kwargs": payload_kwargs, "fs": wav_fs_Hz}
+	l_d_matches = [{} for _ in l_chunks]
+	for ichunk, ipl, idx in sorted(_run("chunks", jobs, shared)):
+		l_d_matches[ichunk][ipl] = idx
+	return l_chunk_tokens, l_d_matches
@@ -0,0 +1,159 @@
+"""Minimal in-process metrics for the signer.
+Histograms, counters and gauges are kept in a MetricsRegistry and exposed either
+as Prometheus text on a localhost HTTP endpoint or as a periodically rewritten
+JSON file. No external dependencies.
+"""
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_BUCKETS_SEC = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+def _label_str(labels: tuple) -> str:
+	return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+class Histogram:
+	def __init__(self, buckets=DEFAULT_BUCKETS_SEC):
+		self.buckets = tuple(buckets)
+		self.counts = [0] * len(self.buckets)
+		self.count = 0
+		self.sum = 0.0
+
+	def observe(self, v: float):
+		self.count += 1
+		self.sum += v
+		for i, b in enumerate(self.buckets):
+			if v <= b:
+				self.counts[i] += 1
+				break
+
+	def quantile(self, q: float) -> float:
+		"""Upper bucket bound containing quantile q (inf if beyond the last bucket, 0 if empty)."""
+		if not self.count: return 0.0
+		target = q * self.count
+		acc = 0
+		for b, c in zip(self.buckets, self.counts):
+			acc += c
+			if acc >= target: return b
+		return float("inf")
+
+class Counter:
+	"""Only increases; `fn` reads a count kept elsewhere (such as the transmitter's) instead of inc()."""
+	def __init__(self, fn: Callable[[], float] | None = None):
+		self.fn = fn
+		self._value = 0.0
+	def inc(self, n: float = 1.0): self._value += n
+	@property
+	def value(self) -> float:
+		return float(self.fn()) if self.fn is not None else self._value
+
+class Gauge:
+	def __init__(self, fn: Callable[[], float] | None = None):
+		self.fn = fn
+		self._value = 0.0
+	def set(self, v: float): self._value = v
+	@property
+	def value(self) -> float:
+		return float(self.fn()) if self.fn is not None else self._value
+
+class MetricsRegistry:
+	_kinds = {"histogram": Histogram, "counter": Counter, "gauge": Gauge}
+
+	def __init__(self, prefix: str = "cicada_"):
+		self.prefix = prefix
+		self._lock = threading.Lock()
+		self._metrics: dict[tuple[str, tuple], object] = {}
+		self._meta: dict[str, tuple[str, str]] = {} # name -> (kind, help)
+
+	def _get(self, kind: str, name: str, help: str, labels: dict | None, **kwargs):
+		key = (self.prefix + name, tuple(sorted((labels or {}).items())))
+		with self._lock:
+			registered_kind = self._meta.get(key[0], (kind,))[0]
+			if registered_kind != kind: # the exposition can only have one TYPE per name
+				raise ValueError(f"Metric {key[0]} is a {registered_kind}, not a {kind}.")
+			m = self._metrics.get(key)
+			if m is None:
+				m = self._metrics[key] = self._kinds[kind](**kwargs)
+				self._meta.setdefault(key[0], (kind, help))
+			return m
+
+	def histogram(self, name: str, help: str = "", labels: dict | None = None) -> Histogram:
+		return self._get("histogram", name, help, labels)
+
+	def counter(self, name: str, help: str = "", labels: dict | None = None, fn: Callable[[], float] | None = None) -> Counter:
+		return self._get("counter", name, help, labels, fn=fn)
+
+	def gauge(self, name: str, help: str = "", labels: dict | None = None, fn: Callable[[], float] | None = None) -> Gauge:
+		return self._get("gauge", name, help, labels, fn=fn)
+
+	def to_prometheus(self) -> str:
+		lines = []
+		with self._lock:
+			items = sorted(self._metrics.items())
+		seen = set()
+		for (name, labels), m in items:
+			kind, help = self._meta[name]
+			if name not in seen:
+				seen.add(name)
+				if help: lines.append(f"# HELP {name} {help}")
+				lines.append(f"# TYPE {name} {kind}")
+			if isinstance(m, Histogram):
+				acc = 0
+				for b, c in zip(m.buckets, m.counts):
+					acc += c
+					lines.append(f"{name}_bucket{_label_str(labels + (('le', b),))} {acc}")
+				lines.append(f"{name}_bucket{_label_str(labels + (('le', '+Inf'),))} {m.count}")
+				lines.append(f"{name}_sum{_label_str(labels)} {m.sum}")
+				lines.append(f"{name}_count{_label_str(labels)} {m.count}")
+			else:
+				lines.append(f"{name}{_label_str(labels)} {m.value}")
+		return "\n".join(lines) + "\n"
+
+	def to_dict(self) -> dict:
+		out = {"time": time.time()}
+		with self._lock:
+			items = sorted(self._metrics.items())
+		for (name, labels), m in items:
+			key = name + _label_str(labels)
+			if isinstance(m, Histogram):
+				out[key] = {"count": m.count, "sum": m.sum}
+				for q in (0.5, 0.95, 0.99):
+					v = m.quantile(q)
+					out[key][f"p{round(100*q)}"] = v if v != float("inf") else None # JSON has no inf
+			else:
+				out[key] = m.value
+		return out
+
+def serve_metrics(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+	"""Serve Prometheus text at http://host:port/metrics on a daemon thread."""
+	class _Handler(BaseHTTPRequestHandler):
+		def do_GET(self):
+			if self.path.rstrip("/") not in ("", "/metrics"):
+				self.send_error(404)
+				return
+			body = registry.to_prometheus().encode("utf-8")
+			self.send_response(200)
+			self.send_header("Content-Type", "text/plain; version=0.0.4")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+		def log_message(self, *args): pass
+	server = ThreadingHTTPServer((host, port), _Handler)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	print(f"[metrics] serving http://{host}:{port}/metrics")
+	return server
+
+def json_metrics_writer(registry: MetricsRegistry, path: Path, interval_sec: float = 5.0, stop_event: threading.Event | None = None):
+	"""Rewrite `path` with a JSON snapshot every `interval_sec` (atomic rename) until stop_event is set,
+	then write a final snapshot."""
+	stop_event = stop_event or threading.Event()
+	tmp = Path(str(path) + ".tmp")
+	while True:
+		stopping = stop_event.wait(interval_sec)
+		tmp.write_text(json.dumps(registry.to_dict(), indent=1), encoding="utf-8")
+		os.replace(tmp, path)
+		if stopping: break
@@ -45,6 +45,8 @@ class Modem:
 			self.data_bits_per_frame = n_ldpc_data_bits_per_frame
 		else: self.data_bits_per_frame = wf.symbols_per_frame * wf.bits_per_symbol
 		self.bytes_per_frame = self.data_bits_per_frame // 8
+		n_header_syms = len(wf.bits_to_symbols(wf.header_bits))
+		self.samples_per_frame = (wf.symbols_per_frame + n_header_syms) * wf.samples_per_pulse
 
 		# Initialize bit mask
 		if use_bit_mask:
@@ -60,7 +62,7 @@ class Modem:
 		n_data_bits = self.data_bits_per_frame
 		if v_data_bits.size > n_data_bits:
 			warnings.warn(
-				f"Truncating input ({v_data_bits.size} bits / {v_data_bits.size/8:.1f} bytes) to {n_data_bits} bits (~{n_data_bits//8} bytes).",
+				f"Truncating input ({v_data_bits.size} bits / {v_data_bits.size/8:.1f} bytes) to {n_data_bits} bits (~{n_data_bits//8} bytes). Use cicada.transport for multi-frame messages.",
 				stacklevel=2,
 			)
 			v_data_bits = v_data_bits[:n_data_bits]
@@ -72,7 +74,10 @@ class Modem:
 		return self.bit_modulator(v_enc_bits).astype(np.float32)
 
 	def recover_bytes(self, v_samples):
-		l_dr = self.demodulator.frame_search(v_samples)[0]
+		return self.decode_results(self.demodulator.frame_search(v_samples)[0])
+
+	def decode_results(self, l_dr):
+		"""Frame bytes and start indices from demodulator results (FEC, unmasking, deduplication)."""
 		l_frame_bytes = []
 		l_start_idxs = []
 		for dr in l_dr:
@@ -0,0 +1,139 @@
+"""Offline Whisper transcription engine for verify.
+Verify knows the whole recording up front, so instead of decoding windows one
+after another it can:
+
+	serial   decode windows one at a time (the original behaviour)
+	batched  decode windows in batches through faster-whisper's BatchedInferencePipeline
+	pool     decode windows concurrently on a WhisperModel with `num_workers` replicas
+
+All engines decode eagerly and return plain segment lists, and keep count of
+audio seconds decoded per wall second.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+
+from .asr import ASRConfig, load_model
+from .job_output import carry_output
+from .speech import TimedWord, segment_words, transcribe_timeline, whisper_model_fs_Hz
+
+ENGINES = ("serial", "batched", "pool")
+
+@dataclass
+class OfflineASRParameters:
+	model_size: str = "medium.en"
+	compute_type: str = "float32"
+	backend: str = "faster-whisper"
+	engine: str = "serial"
+	batch_size: int = 8 # Windows per batch (batched engine)
+	cpu_threads: int = 0 # CTranslate2 intra-op threads per replica; 0 for its default
+	num_workers: int = 1 # Model replicas for concurrent decodes (pool engine)
+	beam_size: int = 1
+
+@dataclass
+class WindowSegments:
+	start_sec: float
+	end_sec: float
+	segments: list[tuple[float, float, str]] # (start_sec, end_sec, text) on the recording's timeline
+
+	@property
+	def text(self) -> str:
+		return "".join(text for _, _, text in self.segments).lstrip()
+
+def window_starts(n_total_sam: int, window_sec: float, overlap_sec: float, fs_Hz: float = whisper_model_fs_Hz) -> list[int]:
+	"""Start samples of the overlapping verify windows covering a recording."""
+	n_shift = int(window_sec * fs_Hz) - int(overlap_sec * fs_Hz)
+	return list(range(0, n_total_sam, n_shift))
+
+def _batched_pipeline(model):
+	from faster_whisper import BatchedInferencePipeline
+	return BatchedInferencePipeline(model)
+
+class OfflineTranscriber:
+	def __init__(self, cfg: OfflineASRParameters = OfflineASRParameters(), model=None, batched_pipeline=_batched_pipeline):
+		if cfg.engine not in ENGINES:
+			raise ValueError(f"Unknown ASR engine {cfg.engine!r}; expected one of {ENGINES}.")
+		self.cfg = cfg
+		if model is None:
+			model = load_model(ASRConfig(
+				backend=cfg.backend,
+				model_size=cfg.model_size,
+				compute_type=cfg.compute_type,
+				cpu_threads=cfg.cpu_threads,
+				num_workers=cfg.num_workers if cfg.engine == "pool" else 1,
+			))
+		self.model = model
+		self.batched_pipeline = batched_pipeline # model -> BatchedInferencePipeline (batched engine)
+		self.audio_sec = 0.0 # Audio seconds sent to the model
+		self.wall_sec = 0.0
+
+	@property
+	def throughput(self) -> float:
+		"""Audio seconds decoded per wall-clock second."""
+		return self.audio_sec / self.wall_sec if self.wall_sec else 0.0
+
+	def summary(self) -> str:
+		return f"{self.cfg.engine} engine decoded {self.audio_sec:.1f}s of audio in {self.wall_sec:.1f}s ({self.throughput:.2f} audio-s per wall-s)"
+
+	def _transcribe_kwargs(self) -> dict:
+		return {"language": "en", "beam_size": self.cfg.beam_size, "vad_filter": False}
+
+	def transcribe_windows(self, samples: np.ndarray, window_sec: float, overlap_sec: float) -> list[WindowSegments]:
+		"""Decode every overlapping window of `samples` (at the model rate)."""
+		fs = whisper_model_fs_Hz
+		n_window = int(window_sec * fs)
+		l_starts = window_starts(len(samples), window_sec, overlap_sec)
+		t0 = time.monotonic()
+		if self.cfg.engine == "batched":
+			l_windows = self._batched_windows(samples, l_starts, n_window, window_sec - overlap_sec)
+		else:
+			def _decode(start):
+				window = samples[start:(start + n_window)]
+				if len(window) < n_window:
+					window = np.concatenate([window, np.zeros(n_window - len(window), dtype=window.dtype)])
+				seg_iter, info = self.model.transcribe(window, **self._transcribe_kwargs())
+				t = start / fs
+				return WindowSegments(t, t + info.duration, [(t + s.start, t + s.end, s.text) for s in seg_iter])
+			if self.cfg.engine == "pool" and self.cfg.num_workers > 1:
+				with ThreadPoolExecutor(max_workers=self.cfg.num_workers) as pool:
+					l_windows = list(pool.map(carry_output(_decode), l_starts)) # serve routes a job's output per thread
+			else:
+				l_windows = [_decode(start) for start in l_starts]
+		self.wall_sec += time.monotonic() - t0
+		self.audio_sec += len(l_starts) * window_sec
+		return l_windows
+
+	def _batched_windows(self, samples, l_starts, n_window, shift_sec) -> list[WindowSegments]:
+		fs = whisper_model_fs_Hz
+		l_windows = [WindowSegments(start / fs, (start + n_window) / fs, []) for start in l_starts]
+		clips = [{"start": w.start_sec, "end": min(w.end_sec, len(samples) / fs)} for w in l_windows]
+		seg_iter, info = self.batched_pipeline(self.model).transcribe(
+			samples,
+			clip_timestamps=clips,
+			batch_size=self.cfg.batch_size,
+			**self._transcribe_kwargs(),
+		)
+		for seg in seg_iter: # segments carry their clip's offset in `seek` (model frames)
+			iwin = int(round(seg.seek / self.model.frames_per_second / shift_sec))
+			l_windows[iwin].segments.append((seg.start, seg.end, seg.text))
+		return l_windows
+
+	def transcribe_timeline(self, samples: np.ndarray) -> list[TimedWord]:
+		"""Decode the whole recording once with word timestamps. The batched engine splits it on
+		speech pauses (Silero VAD) and decodes the pieces in batches."""
+		t0 = time.monotonic()
+		if self.cfg.engine == "batched":
+			seg_iter, info = self.batched_pipeline(self.model).transcribe(
+				samples,
+				language="en",
+				beam_size=self.cfg.beam_size,
+				batch_size=self.cfg.batch_size,
+				word_timestamps=True,
+			)
+			l_words = segment_words(seg_iter)
+		else:
+			l_words = transcribe_timeline(samples, self.model, beam_size=self.cfg.beam_size)
+		self.wall_sec += time.monotonic() - t0
+		self.audio_sec += len(samples) / whisper_model_fs_Hz
+		return l_words
@@ -48,6 +48,10 @@ class Payload(ABC):
 			search_start = idx + len(tok)
 		return tokens
 
+	def match_runs(self, runs, **kwargs) -> int:
+		"""Position of the first run of transcript tokens this payload matches, or -1; payloads with needs_transcript implement this."""
+		raise NotImplementedError
+
 	@classmethod
 	@abstractmethod
 	def from_transcript(cls, chunk_text: str, **kwargs) -> "Payload":
@@ -79,10 +83,16 @@ class Payload(ABC):
 	def describe(self, start_sam: int | None, wav_fs_Hz: float) -> str:
 		raise NotImplementedError
 	
+	@classmethod
+	def check_timestamps(cls, l_payloads: List["Payload"], l_payload_start_sam: List[int], wav_fs_Hz: float, tolerance_sec: float = 10.0) -> List[str]:
+		"""Describe each payload's problem with its embedded timestamp ("" if none)."""
+		return [""] * len(l_payloads)
+
 	@abstractmethod
-	def annotate_chunk(self, chunk_text: str, l_payloads, l_payload_start_sam, wav_fs_Hz=44100) -> str:
+	def annotate_chunk(self, chunk_text: str, l_payloads, l_payload_start_sam, wav_fs_Hz=44100, chunk_words=None) -> str:
 		"""Given a transcript string (chunk_text) and a list of payloads, find where those payloads 
 		match the transcript string, and produce an annotated version describing the matches. 
+		chunk_words are the chunk's TimedWords, when known.
 		Returns a string with annotated markdown.
 		"""
 		raise NotImplementedError
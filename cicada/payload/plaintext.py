@@ -79,7 +79,7 @@ class PlaintextPayload(Payload):
 		return f"[^{slug}]: {self.describe(start_sam, wav_fs_Hz)}"
 
 	@classmethod
-	def annotate_chunk(cls, chunk_text: str, l_payloads, l_match_idx, l_payload_start_sam, wav_fs_Hz=44100):
+	def annotate_chunk(cls, chunk_text: str, l_payloads, l_match_idx, l_payload_start_sam, wav_fs_Hz=44100, chunk_words=None):
 		return chunk_text + "\n\n" # We don't compare plaintext payloads; just return the raw chunk.
 
 	@classmethod
@@ -2,9 +2,18 @@
 
 import base64
 import csv
+import secrets
+import statistics
 import struct
+import threading
 import time
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
 from typing import Iterable, List, Tuple
 import warnings
 import blst
@@ -13,6 +22,21 @@ from .base import Payload
 
 DST = b"BLS_SIG_BLS12381G1_XMD:SHA-256_SSWU_RO_NUL_"	# domain separation tag
 
+CSV_COLUMNS = ["frame_start_sam", "timestamp", "word_count", "header_message", "bls_signature", "payload_version", "transcript_digest"]
+
+# Version 2 headers set the word count byte to 0, which no version 1 header has (they sign at least
+# one word), move the word count to the first header message character and carry a digest of the
+# signed tokens in the last DIGEST_BYTES ones.
+V2_MARKER = 0
+DIGEST_BYTES = 3
+V2_HEADER_CHARS = 1 + DIGEST_BYTES # Header message characters a version 2 header gives up
+MAX_WORD_COUNT = 255
+
+def transcript_digest(run: bytes) -> bytes:
+	"""Short digest of a run of regularized tokens (NUL-terminated, as EncodedTokens.run). Not a
+	security measure (the signature covers it): it lets a verifier skip pairings on other windows."""
+	return zlib.crc32(run).to_bytes(4, "big")[-DIGEST_BYTES:]
+
 def _escape_csv_text_field(value: str) -> str:
 	escaped = value.encode("unicode_escape").decode("ascii")
 	return (
@@ -24,11 +48,206 @@ def _escape_csv_text_field(value: str) -> str:
 def _unescape_csv_text_field(value: str) -> str:
 	return bytes(value, "utf-8").decode("unicode_escape")
 
+@dataclass
+class CheckCounts:
+	n_miller_loops: int = 0
+	n_final_exps: int = 0
+
+_RUN_COUNTS = threading.local()
+
+@contextmanager
+def count_checks():
+	"""Count the Miller loops and final exponentiations this thread makes inside the block. The
+	verifiers' own totals are shared by every job of a `serve` daemon, so they mix runs."""
+	counts = CheckCounts()
+	if not hasattr(_RUN_COUNTS, "stack"):
+		_RUN_COUNTS.stack = []
+	_RUN_COUNTS.stack.append(counts)
+	try:
+		yield counts
+	finally:
+		_RUN_COUNTS.stack.remove(counts)
+
+class SignatureVerifier:
+	"""Checks BLS signatures against one public key, reusing work across candidate windows.
+	e(sig, g2) == e(H(msg), pk) is checked with each side's Miller loop computed once: the
+	key is parsed and subgroup-checked once, e(sig, g2) once per signature, and e(H(msg), pk)
+	is cached by message (overlapping chunks repeat most windows). A check that hits the caches
+	is one final exponentiation instead of two Miller loops, a hash to the curve and a final
+	exponentiation. Safe to share between threads."""
+	def __init__(self, bls_pubkey_bytes: bytes, max_cached_messages: int = 1 << 16):
+		try:
+			pk = blst.P2_Affine(bytes(bls_pubkey_bytes))
+		except Exception as exc:
+			raise ValueError("Malformed BLS public key.") from exc
+		if pk.is_inf() or not pk.in_group():
+			raise ValueError("BLS public key is not a valid G2 group element.")
+		self.pubkey = pk
+		self.pubkey_bytes = bytes(bls_pubkey_bytes)
+		self.max_cached_messages = max_cached_messages
+		self._sig_point: dict[bytes, blst.P1_Affine | None] = {}
+		self._sig_gt: dict[bytes, blst.PT | None] = {}
+		self._msg_gt: OrderedDict[bytes, blst.PT] = OrderedDict()
+		self._lock = threading.Lock() # Guards the message cache and the counters
+		self.n_miller_loops = 0
+		self.n_final_exps = 0
+
+	def add_counts(self, n_miller_loops: int = 0, n_final_exps: int = 0):
+		"""Record work done with this key (here or in a match_pool worker)."""
+		with self._lock:
+			self.n_miller_loops += n_miller_loops
+			self.n_final_exps += n_final_exps
+		for counts in getattr(_RUN_COUNTS, "stack", ()):
+			counts.n_miller_loops += n_miller_loops
+			counts.n_final_exps += n_final_exps
+
+	def signature_point(self, sig_bytes: bytes) -> "blst.P1_Affine | None":
+		"""The signature as a G1 point, or None if it is malformed or out of the group."""
+		if sig_bytes not in self._sig_point:
+			try:
+				sig = blst.P1_Affine(bytearray(sig_bytes))
+				self._sig_point[sig_bytes] = sig if (sig.in_group() and not sig.is_inf()) else None
+			except Exception:
+				self._sig_point[sig_bytes] = None
+		return self._sig_point[sig_bytes]
+
+	def signature_gt(self, sig_bytes: bytes) -> "blst.PT | None":
+		"""Miller loop of e(sig, g2), or None for a malformed or out-of-group signature."""
+		if sig_bytes not in self._sig_gt: # never evicted: a thread racing here at worst repeats the loop
+			sig = self.signature_point(sig_bytes)
+			self._sig_gt[sig_bytes] = blst.PT(sig) if sig is not None else None
+			self.add_counts(n_miller_loops=sig is not None)
+		return self._sig_gt[sig_bytes]
+
+	def message_gt(self, msg: bytes) -> "blst.PT":
+		"""Miller loop of e(H(msg), pk), cached by message (least recently used evicted)."""
+		with self._lock:
+			gt = self._msg_gt.get(msg)
+			if gt is not None:
+				self._msg_gt.move_to_end(msg)
+				return gt
+		h = blst.P1().hash_to(msg, DST, self.pubkey_bytes).to_affine() # outside the lock: other threads' hits need not wait
+		gt = blst.PT(h, self.pubkey)
+		self.add_counts(n_miller_loops=1)
+		with self._lock:
+			self._msg_gt[msg] = gt
+			self._msg_gt.move_to_end(msg)
+			while len(self._msg_gt) > self.max_cached_messages:
+				self._msg_gt.popitem(last=False)
+		return gt
+
+	def verify(self, sig_bytes: bytes, msg: bytes) -> bool:
+		gt_sig = self.signature_gt(sig_bytes)
+		if gt_sig is None:
+			return False
+		self.add_counts(n_final_exps=1)
+		return bool(blst.PT.finalverify(gt_sig, self.message_gt(msg)))
+
+	def verify_batch(self, l_pairs) -> bool:
+		"""Whether every (signature bytes, message) pair is valid, checked as one random linear
+		combination e(sum r_i sig_i, g2) == prod e(r_i H(m_i), pk) with 64-bit scalars r_i: N + 1
+		Miller loops and one final exponentiation. A batch with an invalid pair passes with
+		probability about 2^-64."""
+		if not l_pairs:
+			return True
+		ctx = blst.Pairing(True, DST)
+		for sig_bytes, msg in l_pairs:
+			sig = self.signature_point(sig_bytes)
+			if sig is None:
+				return False
+			scalar = (secrets.randbits(64) | 1).to_bytes(8, "little")
+			try:
+				ctx.mul_n_aggregate(self.pubkey, sig, scalar, msg, self.pubkey_bytes)
+			except Exception:
+				return False
+		ctx.commit()
+		self.add_counts(n_miller_loops=len(l_pairs) + 1, n_final_exps=1)
+		return bool(ctx.finalverify())
+
+	def find_invalid(self, l_pairs) -> list[int]:
+		"""Indices of the invalid (signature bytes, message) pairs: one batch check if all are
+		valid, bisecting failing batches down to the bad entries otherwise."""
+		l_bad = [i for i, (sig_bytes, _) in enumerate(l_pairs) if self.signature_point(sig_bytes) is None]
+		def _bisect(l_idx):
+			if not l_idx or self.verify_batch([l_pairs[i] for i in l_idx]):
+				return []
+			if len(l_idx) == 1:
+				return l_idx
+			mid = len(l_idx) // 2
+			return _bisect(l_idx[:mid]) + _bisect(l_idx[mid:])
+		set_bad = set(l_bad)
+		return sorted(l_bad + _bisect([i for i in range(len(l_pairs)) if i not in set_bad]))
+
+_VERIFIERS: dict[bytes, SignatureVerifier] = {}
+_VERIFIERS_LOCK = threading.Lock()
+
+def get_verifier(bls_pubkey_bytes: bytes) -> SignatureVerifier:
+	"""Shared SignatureVerifier per public key, so its caches span payloads and chunks."""
+	bls_pubkey_bytes = bytes(bls_pubkey_bytes)
+	with _VERIFIERS_LOCK:
+		if bls_pubkey_bytes not in _VERIFIERS:
+			_VERIFIERS[bls_pubkey_bytes] = SignatureVerifier(bls_pubkey_bytes)
+		return _VERIFIERS[bls_pubkey_bytes]
+
+def all_verifiers() -> dict[bytes, SignatureVerifier]:
+	return _VERIFIERS
+
+class EncodedTokens:
+	"""A chunk's tokens encoded once into one buffer of NUL-terminated words, so the signed
+	bytes of any run of tokens are a single slice located by prefix offsets."""
+	def __init__(self, l_tokens):
+		l_enc = [tok.text.encode("utf-8") + b"\x00" for tok in l_tokens]
+		self.buf = b"".join(l_enc)
+		self.offsets = list(accumulate((len(e) for e in l_enc), initial=0))
+		self._digests: dict[int, dict[bytes, list[int]]] = {}
+
+	def __len__(self) -> int:
+		return len(self.offsets) - 1
+
+	def run(self, idx: int, n: int) -> bytes:
+		return self.buf[self.offsets[idx]:self.offsets[idx + n]]
+
+	def digest_index(self, n: int) -> dict[bytes, list[int]]:
+		"""transcript_digest of every run of n tokens -> the indices where such runs start
+		(computed once per run length, then a lookup per version 2 payload)."""
+		if n not in self._digests:
+			d = {}
+			for idx in range(len(self) - n + 1):
+				d.setdefault(transcript_digest(self.run(idx, n)), []).append(idx)
+			self._digests[n] = d
+		return self._digests[n]
+
+def window_messages(header_bytes: bytes, tokens, word_count: int, l_idx=None):
+	"""(token index, signed message) for every run of word_count consecutive tokens
+	(or only the runs starting at l_idx). `tokens` is a token list or its EncodedTokens."""
+	enc = tokens if isinstance(tokens, EncodedTokens) else EncodedTokens(tokens)
+	for idx in (range(len(enc) - word_count + 1) if l_idx is None else l_idx):
+		yield idx, header_bytes + enc.run(idx, word_count)
+
+def token_times(chunk_text: str, l_tokens, l_words) -> list[tuple[float, float]] | None:
+	"""(start, end) seconds of each token, taken from the timed word it came from. The chunk text
+	must be the words joined by whitespace (as verify's chunks are); returns None otherwise."""
+	l_word_starts = [m.start() for m in re.finditer(r"\S+", chunk_text)]
+	if len(l_word_starts) != len(l_words):
+		return None
+	l_times = []
+	for tok in l_tokens:
+		w = l_words[max(bisect_right(l_word_starts, tok.idx) - 1, 0)]
+		l_times.append((w.start, w.end))
+	return l_times
+
+def signed_speech_bounds(frame_sec: float, signer_window_sec: float, slack_sec: float) -> tuple[float, float]:
+	"""Interval of the recording a payload heard at frame_sec can have signed: the signer's
+	window of speech just before it transmitted, widened by slack for latency and timestamp error."""
+	return frame_sec - signer_window_sec - slack_sec, frame_sec + slack_sec
+
 @dataclass
 class SignaturePayloadHeader:
 	timestamp: float
 	word_count: int
 	message: str
+	version: int = 1
+	digest: bytes = b"" # transcript_digest of the signed tokens (version 2)
 
 	@classmethod
 	def from_bytes(cls, ch: bytes, n_header_message_chars: int = 11):
@@ -36,27 +255,42 @@ class SignaturePayloadHeader:
 		timestamp = float(struct.unpack(">I", ts_bytes)[0])
 		wc_bytes = ch[4:5]
 		word_count = struct.unpack(">B", wc_bytes)[0]
+		if word_count == V2_MARKER:
+			n_message = n_header_message_chars - V2_HEADER_CHARS
+			header_bytes = ch[6:(6 + n_message)]
+			header_message = header_bytes.rstrip(b"\x00").decode("ascii", errors="replace")
+			return cls(timestamp, ch[5], header_message, 2, bytes(ch[(6 + n_message):(5 + n_header_message_chars)]))
 		header_bytes = ch[5:(5 + n_header_message_chars)]
 		header_message = header_bytes.rstrip(b"\x00").decode("ascii", errors="replace")
 		return cls(timestamp, word_count, header_message)
 
 	def to_bytes(self, n_header_message_chars: int = 11):
 		timestamp_bytes = struct.pack(">I", int(self.timestamp))
-		word_count_bytes = struct.pack(">B", self.word_count)
+		if not 0 < self.word_count <= MAX_WORD_COUNT:
+			raise ValueError(f"Headers sign 1 to {MAX_WORD_COUNT} words ({self.word_count} given).")
+		if self.version == 2:
+			word_count_bytes = struct.pack(">BB", V2_MARKER, self.word_count)
+			n_message = n_header_message_chars - V2_HEADER_CHARS
+		else:
+			word_count_bytes = struct.pack(">B", self.word_count)
+			n_message = n_header_message_chars
 		message = self.message.encode("ascii", errors="replace")
-		if len(message) > n_header_message_chars:
+		if len(message) > n_message:
 			warnings.warn(
-				f"header_message too long ({len(message)} bytes); truncating to {n_header_message_chars} bytes",
+				f"header_message too long ({len(message)} bytes); truncating to {n_message} bytes",
 				UserWarning,
 			)
-			message = message[:n_header_message_chars]
-		message_bytes = message.ljust(n_header_message_chars, b"\x00")
+			message = message[:n_message]
+		message_bytes = message.ljust(n_message, b"\x00")
+		if self.version == 2:
+			message_bytes += self.digest
 		return timestamp_bytes + word_count_bytes + message_bytes
 
 class SignaturePayload(Payload):
 	payload_type = "signature"
 	requires_bls_keys = True
 	needs_transcript = True
+	signer: str | None = None # Keyring name of the key that verified this payload, once matched
 
 	header: SignaturePayloadHeader
 	bls_signature: bytes
@@ -67,11 +301,17 @@ class SignaturePayload(Payload):
 		bls_privkey: blst.SecretKey | None = kwargs.get("bls_privkey")
 		bls_pubkey_bytes: bytes | None = kwargs.get("bls_pubkey_bytes")
 		ts = kwargs.get("timestamp", time.time())
+		version = kwargs.get("payload_version", 1)
 		if not header_message or bls_privkey is None or bls_pubkey_bytes is None:
 			raise ValueError("SignaturePayload.from_transcript requires header_message, bls_privkey, and bls_pubkey_bytes.")
 		l_tokens = regularize_transcript(chunk_text)
+		if not 0 < len(l_tokens) <= MAX_WORD_COUNT:
+			raise ValueError(f"SignaturePayload signs 1 to {MAX_WORD_COUNT} words ({len(l_tokens)} given).")
 		pl = cls.__new__(cls)
 		pl.header = SignaturePayloadHeader(ts, len(l_tokens), header_message)
+		if version == 2:
+			pl.header.version = 2
+			pl.header.digest = transcript_digest(EncodedTokens(l_tokens).run(0, len(l_tokens)))
 		pl.bls_signature = pl.calculate_signature(l_tokens, bls_privkey, bls_pubkey_bytes)
 		return pl
 
@@ -110,14 +350,16 @@ class SignaturePayload(Payload):
 			l_sam_idx = [-1] * len(l_payloads)
 		with open(out_csv, "w", newline="") as f:
 			writer = csv.writer(f)
-			writer.writerow(["frame_start_sam", "timestamp", "word_count", "header_message", "bls_signature"])
+			writer.writerow(CSV_COLUMNS)
 			for pl, sam_idx in zip(l_payloads, l_sam_idx):
-				pl_sig: SignaturePayload = pl  # type: ignore[assignment]
-				ts_field = f"{int(pl_sig.header.timestamp):010d}"
-				wc_field = str(pl_sig.header.word_count)
-				header_field = _escape_csv_text_field(pl_sig.header.message)
-				sig_b64 = base64.b64encode(pl_sig.bls_signature).decode("ascii")
-				writer.writerow([sam_idx, ts_field, wc_field, header_field, sig_b64])
+				writer.writerow(pl._csv_row(sam_idx))
+
+	def _csv_row(self, sam_idx: int) -> list:
+		ts_field = f"{int(self.header.timestamp):010d}"
+		wc_field = str(self.header.word_count)
+		header_field = _escape_csv_text_field(self.header.message)
+		sig_b64 = base64.b64encode(self.bls_signature).decode("ascii")
+		return [sam_idx, ts_field, wc_field, header_field, sig_b64, self.header.version, self.header.digest.hex()]
 
 	@classmethod
 	def load_csv(cls, in_csv: str, **kwargs) -> Tuple[List[Payload], List[int]]:
@@ -138,6 +380,8 @@ class SignaturePayload(Payload):
 				hdr.timestamp = float(ts)
 				hdr.word_count = wc
 				hdr.message = header_message
+				hdr.version = int(row.get("payload_version") or 1) # absent from CSVs written before version 2
+				hdr.digest = bytes.fromhex(row.get("transcript_digest") or "")
 				pl.header = hdr
 				pl.bls_signature = bls_sig
 
@@ -149,6 +393,30 @@ class SignaturePayload(Payload):
 		header_bytes = self.header.to_bytes(n_header_message_chars=n_header_message_chars)
 		return header_bytes + self.bls_signature
 
+	def signed_message(self, l_signed_tokens: List[str], n_header_message_chars: int = 11) -> bytes:
+		"""The message this payload's signature covers, given the regularized tokens it signed."""
+		return self.header.to_bytes(n_header_message_chars=n_header_message_chars) + b"".join(t.encode("utf-8") + b"\x00" for t in l_signed_tokens)
+
+	@classmethod
+	def write_matches_csv(cls, l_payloads: List[Payload], l_sam_idx: List[int], l_signed_tokens: List[List[str]], out_csv: str):
+		"""Archive matched payloads as a frames CSV with the regularized tokens each one signed
+		(space-separated) and its signer's keyring name, so `recheck` can re-verify them without
+		the recording."""
+		with open(out_csv, "w", newline="") as f:
+			writer = csv.writer(f)
+			writer.writerow(CSV_COLUMNS + ["signed_tokens", "signer"])
+			for pl, sam_idx, l_tokens in zip(l_payloads, l_sam_idx, l_signed_tokens):
+				writer.writerow(pl._csv_row(sam_idx) + [" ".join(l_tokens), pl.signer or ""])
+
+	@classmethod
+	def load_matches_csv(cls, in_csv: str) -> Tuple[List[Payload], List[int], List[List[str]]]:
+		l_payloads, l_sam_idx = cls.load_csv(in_csv)
+		with open(in_csv, newline="") as f:
+			l_rows = list(csv.DictReader(f))
+		for pl, row in zip(l_payloads, l_rows):
+			pl.signer = row.get("signer") or None
+		return l_payloads, l_sam_idx, [row["signed_tokens"].split() for row in l_rows]
+
 	def calculate_signature(self, l_tokens: Iterable, bls_privkey: blst.SecretKey, bls_pubkey_bytes: bytes) -> bytes:
 		header_bytes = self.header.to_bytes()
 		msg = bytearray(header_bytes)
@@ -157,33 +425,55 @@ class SignaturePayload(Payload):
 		sig = blst.P1().hash_to(msg, DST, bls_pubkey_bytes).sign_with(bls_privkey).compress()
 		return sig
 
-	def match_to_chunk(self, chunk_text: str, bls_pubkey_bytes: bytes = None, n_header_message_chars: int = 11, **kwargs) -> int:
-		if bls_pubkey_bytes is None:
-			raise ValueError("SignaturePayload.match_chunk requires bls_pubkey_bytes.")
-		l_tokens = regularize_transcript(chunk_text)
+	def match_to_chunk(self, chunk_text: str, bls_pubkey_bytes: bytes = None, n_header_message_chars: int = 11, l_token_times=None, time_bounds=None, l_tokens=None, encoded_tokens=None, bls_keyring=None, **kwargs) -> int:
+		"""Index of the first token of the window this payload signed, or -1. With l_token_times
+		and time_bounds, only windows lying within time_bounds (seconds) are tried. Callers matching
+		many payloads to one chunk pass its l_tokens and encoded_tokens to tokenize it only once."""
+		if bls_pubkey_bytes is None and bls_keyring is None:
+			raise ValueError("SignaturePayload.match_chunk requires bls_pubkey_bytes or a keyring.")
+		if l_tokens is None:
+			l_tokens = regularize_transcript(chunk_text)
 		word_count = self.header.word_count
 		if len(l_tokens) < word_count:
 			warnings.warn("Not enough tokens in this chunk to match this payload.", UserWarning)
 			return -1
-		try:
-			pl_sig = blst.P1_Affine(bytearray(self.bls_signature))
-		except Exception:
+		l_idx = None
+		if l_token_times is not None and time_bounds is not None:
+			lo, hi = time_bounds
+			l_idx = [idx for idx in range(len(l_tokens) - word_count + 1) if l_token_times[idx][0] >= lo and l_token_times[idx + word_count - 1][1] <= hi]
+		enc = encoded_tokens if encoded_tokens is not None else EncodedTokens(l_tokens)
+		if self.header.version == 2: # pairings only on windows with the header's digest
+			l_hits = enc.digest_index(word_count).get(self.header.digest, [])
+			l_idx = l_hits if l_idx is None else sorted(set(l_hits).intersection(l_idx))
+		l_idx = range(len(enc) - word_count + 1) if l_idx is None else l_idx
+		i = self.match_runs((enc.run(idx, word_count) for idx in l_idx), bls_pubkey_bytes, n_header_message_chars, bls_keyring)
+		return l_idx[i] if i >= 0 else -1
+
+	def match_runs(self, runs, bls_pubkey_bytes: bytes = None, n_header_message_chars: int = 11, bls_keyring=None, **kwargs) -> int:
+		"""Position in `runs` (signed token bytes, as from EncodedTokens.run) of the first run this
+		payload signed, or -1. With a Keyring, keys hinted by the header message are tried first."""
+		if bls_keyring is not None:
+			runs = list(runs)
+			for entry in bls_keyring.candidates(self.header.message):
+				i = self.match_runs(runs, entry.pubkey_bytes, n_header_message_chars)
+				if i >= 0:
+					self.signer = entry.name
+					return i
+			return -1
+		if bls_pubkey_bytes is None:
+			raise ValueError("SignaturePayload.match_runs requires bls_pubkey_bytes.")
+		verifier = get_verifier(bytes(bls_pubkey_bytes))
+		sig_bytes = bytes(self.bls_signature)
+		if verifier.signature_gt(sig_bytes) is None:
 			warnings.warn("Corrupted payload signature.", UserWarning)
 			return -1
-		bls_pubkey = blst.P2_Affine(bls_pubkey_bytes)
 		header_bytes = self.header.to_bytes(n_header_message_chars=n_header_message_chars)
-		for idx in range(len(l_tokens) - word_count + 1):
-			msg = bytearray(header_bytes)
-			for tok in l_tokens[idx:(idx + word_count)]:
-				msg += (tok.text.encode("utf-8") + b"\x00")
-			try:
-				ctx = blst.Pairing(True, DST)
-				ctx.aggregate(bls_pubkey, pl_sig, msg, bls_pubkey_bytes)
-				ctx.commit()
-				if ctx.finalverify():
-					return idx
-			except Exception:
+		digest = self.header.digest if self.header.version == 2 else None
+		for i, run in enumerate(runs):
+			if digest is not None and transcript_digest(run) != digest:
 				continue
+			if verifier.verify(sig_bytes, header_bytes + run):
+				return i
 		return -1
 
 	def describe(self, start_sam: int | None, wav_fs_Hz: float) -> str:
@@ -196,22 +486,74 @@ class SignaturePayload(Payload):
 			f"header='{self.header.message}', "
 			f"timestamp={ts_str} UTC, "
 			f"words={self.header.word_count}, "
+			f"{f'digest={self.header.digest.hex()}, ' if self.header.version == 2 else ''}"
 			f"signature={self.bls_signature.hex()}"
+			f"{f', signer={self.signer}' if self.signer else ''}"
 		)
 
 	@classmethod
-	def annotate_chunk(cls, chunk_text: str, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz=44100):
+	def check_timestamps(cls, l_payloads, l_payload_start_sam, wav_fs_Hz: float, tolerance_sec: float = 10.0) -> List[str]:
+		"""Sanity-check header timestamps against where payloads were heard. In a genuine recording
+		timestamp minus audio position is nearly constant (the recording's start time plus signer
+		latency), so timestamps increase with position. Returns a problem description per payload
+		("" if none)."""
+		l_offsets = [pl.header.timestamp - start / wav_fs_Hz for pl, start in zip(l_payloads, l_payload_start_sam)]
+		if not l_offsets:
+			return []
+		ref_offset = statistics.median(l_offsets)
+		l_issues = []
+		latest_ts = None
+		for ipl in sorted(range(len(l_payloads)), key=lambda i: l_payload_start_sam[i]):
+			ts = l_payloads[ipl].header.timestamp
+			issue = ""
+			if abs(l_offsets[ipl] - ref_offset) > tolerance_sec:
+				issue = f"header timestamp is {l_offsets[ipl] - ref_offset:+.0f} s off the recording's clock"
+			elif latest_ts is not None and ts < latest_ts - 1.0: # timestamps have 1 s resolution
+				issue = f"header timestamp goes back {latest_ts - ts:.0f} s from an earlier payload"
+			if not issue:
+				latest_ts = ts if latest_ts is None else max(latest_ts, ts)
+			l_issues.append((ipl, issue))
+		return [issue for _, issue in sorted(l_issues)]
+
+	@classmethod
+	def match_chunk(cls, chunk_text: str, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz=44100, chunk_words=None, l_tokens=None, l_payload_idx=None) -> dict[int, int]:
+		"""Payload index -> index of the first token of its window in this chunk, for the matching
+		payloads among l_payload_idx (default: all). With payload_kwargs["localize"] and the chunk's
+		timed words, each payload is only tried against windows of speech that fall just before its
+		frame (see signed_speech_bounds)."""
 		kwargs = {}
 		if payload_kwargs:
 			kwargs.update(payload_kwargs)
-		l_tokens = cls.tokenize_text(chunk_text)
+		if l_tokens is None:
+			l_tokens = cls.tokenize_text(chunk_text)
+		kwargs.update(l_tokens=l_tokens, encoded_tokens=EncodedTokens(l_tokens))
+		l_times = None
+		if kwargs.get("localize") and chunk_words is not None:
+			l_times = token_times(chunk_text, l_tokens, chunk_words)
+		d_matches = {}
+		for idx in (range(len(l_payloads)) if l_payload_idx is None else l_payload_idx):
+			if l_times is not None:
+				lo, hi = signed_speech_bounds(l_payload_start_sam[idx] / wav_fs_Hz, kwargs["signer_window_sec"], kwargs["localize_slack_sec"])
+				if not l_times or l_times[-1][1] < lo or l_times[0][0] > hi: # chunk is elsewhere in the recording
+					continue
+				kwargs.update(l_token_times=l_times, time_bounds=(lo, hi))
+			match_idx = l_payloads[idx].match_to_chunk(chunk_text, **kwargs)
+			if match_idx >= 0:
+				d_matches[idx] = match_idx
+		return d_matches
+
+	@classmethod
+	def annotate_chunk(cls, chunk_text: str, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz=44100, chunk_words=None, l_tokens=None, d_matches=None):
+		"""Footnote the payloads matching this chunk; d_matches (from match_chunk) skips matching."""
+		if l_tokens is None:
+			l_tokens = cls.tokenize_text(chunk_text)
+		if d_matches is None:
+			d_matches = cls.match_chunk(chunk_text, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz, chunk_words, l_tokens)
 		l_payload_idx = []
 		l_chunk_text_idx = []
-		for idx, pl in enumerate(l_payloads):
-			match_idx = pl.match_to_chunk(chunk_text, **kwargs)
-			if match_idx >= 0:
-				l_payload_idx.append(idx)
-				l_chunk_text_idx.append(l_tokens[match_idx].idx if match_idx < len(l_tokens) else 0)
+		for idx, match_idx in sorted(d_matches.items()):
+			l_payload_idx.append(idx)
+			l_chunk_text_idx.append(l_tokens[match_idx].idx if match_idx < len(l_tokens) else 0)
 		pairs = sorted(zip(l_chunk_text_idx, l_payload_idx), key=lambda t: t[0])
 		if pairs:
 			l_chunk_text_idx, l_payload_idx = map(list, zip(*pairs))
@@ -244,6 +586,7 @@ class SignaturePayload(Payload):
 			f"{self.header.word_count} words starting near {start_desc}"
 			f"{f' ({start_sec:.2f} sec)' if start_sec is not None else ''}. "
 			f"Header message: {self.header.message}"
+			f"{f'. Signed by {self.signer}' if self.signer else ''}"
 		)
 
 @dataclass
@@ -251,14 +594,22 @@ class TranscriptToken:
 	text: str
 	idx: int
 
+_RE_DASHES = re.compile("[-–—]")
+_RE_WORD = re.compile(r"\S+")
+_RE_NON_ALNUM = re.compile(r"[^a-z0-9]")
+
+@lru_cache(maxsize=1 << 16)
+def regularize_token(tok: str) -> str:
+	"""Regularized form of one whitespace-delimited token (memoized; transcripts reuse few words)"""
+	tok = tok.lower() # Lowercase
+	tok = number_parser.parser.parse(tok) # Word to numeric
+	return _RE_NON_ALNUM.sub("", tok) # Strip non-alphanumeric
+
 def regularize_transcript(s): 
 	"""Convert a string of English into a list of regularized TranscriptTokens"""
-	for dash in ("-", "–", "—"): s = s.replace(dash, " ") # replace dashes with space
-	l_tokens = [(m.group(), m.start()) for m in re.finditer(r'\S+', s)] # Split on whitespace to (token, start_index) pairs
+	s = _RE_DASHES.sub(" ", s) # replace dashes with space
 	l_tokens_clean = list()
-	for itok in range(len(l_tokens)): # Clean each token in the list
-		tok = l_tokens[itok][0].lower() # Lowercase
-		tok = number_parser.parser.parse(tok) # Word to numeric
-		tok = re.sub(r"[^a-z0-9]", "", tok) # Strip non-alphanumeric
-		if len(tok) > 0: l_tokens_clean.append(TranscriptToken(text=tok, idx=l_tokens[itok][1]))
+	for m in _RE_WORD.finditer(s): # Split on whitespace, keeping each token's start index
+		tok = regularize_token(m.group())
+		if tok: l_tokens_clean.append(TranscriptToken(text=tok, idx=m.start()))
 	return l_tokens_clean
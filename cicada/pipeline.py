@@ -0,0 +1,258 @@
+"""Event-driven signer pipeline.
+Stages run on their own threads and block on bounded queues instead of polling:
+
+	capture -> window -> transcribe -> sign -> modulate -> play
+
+Capture drops blocks only if the window stage stalls, the window stage emits
+exactly once per hop of new audio, and each later stage only ever works on the
+newest item (stale windows and transcripts are replaced, not queued). Modulate
+and play are handled by the StreamTransmitter.
+
+With `transcribe_process`, capture writes into a shared-memory ring and Whisper
+runs in its own process, so decoding no longer competes with the audio
+callback, signing and modulation for the GIL.
+
+With a virtual mic from audio_io that is paced by its consumer (e.g. a WAV
+file), no stage drops anything and each stage waits for the next to finish, so
+stream time stands still while a window is decoded and signed. The signer then
+runs as fast as Whisper allows and transmissions start right at window ends.
+
+Stage latencies, queue depths, drops and xruns are recorded in a
+MetricsRegistry (see metrics.py).
+"""
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from . import audio_io, speech
+from .metrics import MetricsRegistry
+from .speech import TranscriptLogger, whisper_model_fs_Hz
+from .ringbuffer import SharedAudioRing
+from .transmitter import StreamTransmitter
+from .vad import VADGatedTranscriber
+
+@dataclass
+class SignerPipelineParameters:
+	window_sec: float = 10.0
+	overlap_sec: float = 3.0
+	mic_blocksize_sam: int = 1024
+	mic_device: str | int | audio_io.ArrayInput | None = None # sounddevice id/name or a virtual input
+	mic_queue_blocks: int = 256 # Capture buffer between the audio callback and the window stage
+	transcribe_process: bool = False # Run Whisper in a worker process fed by a shared-memory ring
+	model_size: str = "medium.en" # Loaded by the worker with transcribe_process; otherwise the size of the model passed in
+	compute_type: str = "float32"
+	asr_backend: str = "faster-whisper"
+	ring_windows: int = 4 # Ring capacity in windows; a decode slower than this many windows is discarded
+	incremental: bool = False # Decode only new audio each hop and stitch the window from a word timeline
+	vad: bool = False # Skip Whisper on windows without speech and cut decode input to speech
+	deadline: bool = False # Adapt window, beam size and model to decode each window within one hop
+	beam_size: int = 1
+	latency_slo_sec: float | None = None # Warn and count violations when speech-to-signature latency exceeds this
+	debug: bool = False
+
+class SignerPipeline:
+	"""Wire the signer stages together. `make_payload_bytes` maps transcript text to payload bytes,
+	raising ValueError for text it cannot sign (e.g. no words), which is skipped.
+	`model` may be None when cfg.transcribe_process is set. `load_model(model_size)` lets the
+	deadline scheduler fall back to smaller models. Metrics are recorded into `metrics`."""
+	def __init__(
+		self,
+		cfg: SignerPipelineParameters,
+		model,
+		make_payload_bytes: Callable[[str], bytes],
+		transmitter: StreamTransmitter,
+		transcript_writer: TranscriptLogger | None = None,
+		load_model: Callable[[str], object] | None = None,
+		metrics: MetricsRegistry | None = None,
+	):
+		self.cfg = cfg
+		self.model = model
+		self.make_payload_bytes = make_payload_bytes
+		self.transmitter = transmitter
+		self.transcript_writer = transcript_writer
+		self.load_model = load_model
+		self.lossless = audio_io.is_blocking(cfg.mic_device)
+		if self.lossless and cfg.transcribe_process:
+			raise ValueError("A consumer-paced virtual mic cannot feed the shared-memory ring; give it a speed.")
+		self.q_mic = queue.Queue(maxsize=1 if self.lossless else cfg.mic_queue_blocks) # a virtual mic shouldn't run ahead
+		self.q_windows = queue.Queue(maxsize=1)
+		self.q_transcripts = queue.Queue(maxsize=1)
+		self.stop_event = threading.Event()
+		self._threads: list[threading.Thread] = []
+		self._ring = None
+		self._proc = None
+		self.transcriber = None # In-process transcriber, once started
+		self.metrics = metrics or MetricsRegistry()
+		self._register_metrics()
+
+	def _register_metrics(self):
+		m = self.metrics
+		m.gauge("queue_depth", "Items waiting in a pipeline queue", {"queue": "mic"}, fn=self.q_mic.qsize)
+		m.gauge("queue_depth", "Items waiting in a pipeline queue", {"queue": "transcripts"}, fn=self.q_transcripts.qsize)
+		m.counter("xruns_total", "Audio callback over/underruns", {"stream": "output"}, fn=lambda: self.transmitter.n_xruns)
+		m.counter("dropped_payloads_total", "Payloads replaced before they went on air", fn=lambda: self.transmitter.n_dropped)
+		self._h_sign = m.histogram("stage_latency_seconds", "Per-stage latency", {"stage": "sign"})
+		self._h_modulate = m.histogram("stage_latency_seconds", "Per-stage latency", {"stage": "modulate"})
+		self._h_playback = m.histogram("stage_latency_seconds", "Per-stage latency", {"stage": "playback"})
+		self._h_transcribe = m.histogram("stage_latency_seconds", "Per-stage latency", {"stage": "transcribe"})
+		self._h_to_signature = m.histogram("speech_to_signature_seconds", "End of window audio to signed payload")
+		self._h_to_air = m.histogram("speech_to_air_seconds", "End of window audio to first payload sample on air")
+		self._h_jitter = m.histogram("tx_jitter_seconds", "Transmission start minus earliest possible start")
+		self._c_dropped_transcripts = m.counter("dropped_transcripts_total", "Transcripts replaced before they were signed")
+		self._c_slo = m.counter("slo_violations_total", "Payloads signed later than the latency SLO")
+		if self.cfg.latency_slo_sec is not None:
+			m.gauge("latency_slo_seconds", "Speech-to-signature latency SLO").set(self.cfg.latency_slo_sec)
+
+	def start(self):
+		if self.cfg.transcribe_process:
+			self._start_process_stages()
+		else:
+			self._start_thread_stages()
+		self._threads.append(threading.Thread(target=self._sign_worker, daemon=True))
+		self.transmitter.start()
+		for t in self._threads:
+			t.start()
+		return self
+
+	def _start_thread_stages(self):
+		cfg = self.cfg
+		self._threads = [
+			threading.Thread(
+				target=speech.mic_worker,
+				args=(self.q_mic,),
+				kwargs={"mic_blocksize_sam": cfg.mic_blocksize_sam, "mic_device": cfg.mic_device, "stop_event": self.stop_event, "metrics": self.metrics},
+				daemon=True,
+			),
+			threading.Thread(
+				target=speech.window_worker,
+				args=(self.q_mic, self.q_windows),
+				kwargs={"window_sec": cfg.window_sec, "overlap_sec": cfg.overlap_sec, "debug": cfg.debug, "metrics": self.metrics, "lossless": self.lossless},
+				daemon=True,
+			),
+			threading.Thread(
+				target=speech.transcribe_worker,
+				args=(self.model, self.q_windows, self.q_transcripts),
+				kwargs={"debug": cfg.debug, "transcript_writer": self.transcript_writer, "transcriber": self._make_transcriber(), "metrics": self.metrics, "lossless": self.lossless},
+				daemon=True,
+			),
+		]
+
+	def _transcriber_kwargs(self) -> dict:
+		cfg = self.cfg
+		return {
+			"overlap_sec": cfg.overlap_sec,
+			"beam_size": cfg.beam_size,
+			"incremental": cfg.incremental,
+			"vad": cfg.vad,
+			"deadline": cfg.deadline,
+		}
+
+	def _make_transcriber(self):
+		self.transcriber = speech.build_signer_transcriber(
+			self.model,
+			model_size=self.cfg.model_size,
+			load_model=self.load_model,
+			window_sec=self.cfg.window_sec,
+			debug=self.cfg.debug,
+			**self._transcriber_kwargs(),
+		)
+		return self.transcriber
+
+	def _start_process_stages(self):
+		cfg = self.cfg
+		window_samples = int(cfg.window_sec * whisper_model_fs_Hz)
+		hop_samples = window_samples - int(cfg.overlap_sec * whisper_model_fs_Hz)
+		capacity = cfg.ring_windows * window_samples
+		self._ring = SharedAudioRing(capacity)
+		ctx = mp.get_context("spawn") # don't fork a process that holds PortAudio and CTranslate2 threads
+		q_hops = ctx.Queue()
+		q_out = ctx.Queue()
+		self._proc = ctx.Process(
+			target=speech.ring_transcribe_process,
+			args=(self._ring.name, capacity, q_hops, q_out),
+			kwargs={"model_size": cfg.model_size, "compute_type": cfg.compute_type, "backend": cfg.asr_backend, "window_sec": cfg.window_sec, "transcriber_kwargs": self._transcriber_kwargs(), "debug": cfg.debug},
+			daemon=True,
+		)
+		self._proc.start()
+		self._threads = [
+			threading.Thread(
+				target=speech.ring_mic_worker,
+				args=(self._ring, q_hops, hop_samples),
+				kwargs={"mic_blocksize_sam": cfg.mic_blocksize_sam, "mic_device": cfg.mic_device, "stop_event": self.stop_event, "metrics": self.metrics},
+				daemon=True,
+			),
+			threading.Thread(target=self._relay_worker, args=(q_out,), daemon=True),
+		]
+
+	def _relay_worker(self, q_out):
+		"""Move transcripts from the worker process onto the sign stage's queue."""
+		while True:
+			item = q_out.get()
+			if item is None: break
+			chunk_text, t_window_end, decode_sec = item
+			self._h_transcribe.observe(decode_sec)
+			if self.transcript_writer is not None:
+				self.transcript_writer.write_chunk(chunk_text, timestamp=time.time())
+			self._c_dropped_transcripts.inc(speech.put_latest(self.q_transcripts, (chunk_text, t_window_end)))
+		self.q_transcripts.put(None)
+
+	def stop(self):
+		self.stop_event.set()
+		for t in self._threads:
+			t.join(timeout=5.0)
+		if self._proc is not None:
+			self._proc.join(timeout=5.0)
+			if self._proc.is_alive(): self._proc.terminate()
+		if self._ring is not None:
+			self._ring.close()
+		self.transmitter.stop()
+		self._record_tx_events(self.transmitter.drain_events())
+		if isinstance(self.transcriber, VADGatedTranscriber):
+			print(f"[vad] {self.transcriber.stats.summary()}")
+		if self.transcript_writer is not None:
+			self.transcript_writer.close()
+
+	def run(self):
+		"""Run until interrupted or the mic runs out (virtual mics), then play out what was submitted."""
+		self.start()
+		try:
+			self._threads[-1].join()
+			self.transmitter.flush()
+		except KeyboardInterrupt:
+			print("[sign] stopping...")
+		finally:
+			self.stop()
+
+	def _sign_worker(self):
+		while True:
+			item = self.q_transcripts.get()
+			if item is None: break
+			chunk_text, t_window_end = item
+			self._record_tx_events(self.transmitter.drain_events())
+			print(f"[sign] {chunk_text}")
+			t0 = time.monotonic()
+			try:
+				pl_bytes = self.make_payload_bytes(chunk_text)
+			except ValueError as exc:
+				print(f"[sign] not signed: {exc}")
+				continue
+			t_signed = time.monotonic()
+			self._h_sign.observe(t_signed - t0)
+			self._h_to_signature.observe(t_signed - t_window_end)
+			slo = self.cfg.latency_slo_sec
+			if slo is not None and t_signed - t_window_end > slo:
+				self._c_slo.inc()
+				print(f"[sign] speech-to-signature latency {t_signed - t_window_end:.2f}s exceeds SLO of {slo:.2f}s")
+			self.transmitter.submit(pl_bytes, t_submit=t_window_end)
+			if self.lossless: self.transmitter.wait_rendered()
+			self.q_transcripts.task_done()
+
+	def _record_tx_events(self, l_ev):
+		for ev in l_ev:
+			self._h_modulate.observe(ev.render_sec)
+			self._h_playback.observe(ev.playback_sec)
+			self._h_to_air.observe(ev.latency_sec)
+			self._h_jitter.observe(ev.jitter_sec)
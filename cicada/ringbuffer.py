@@ -0,0 +1,72 @@
+"""Single-writer shared-memory audio ring buffer.
+Samples are written twice (at i and i+capacity) into a 2*capacity buffer, so any
+window of up to `capacity` samples is one contiguous slice. Readers in other
+processes get numpy views of the shared block without copying.
+"""
+from multiprocessing import shared_memory
+import numpy as np
+
+_HEADER_BYTES = 64 # int64 total-written counter, padded to a cache line
+
+class SharedAudioRing:
+	def __init__(self, capacity: int, name: str | None = None, create: bool = True):
+		self.capacity = int(capacity)
+		size = _HEADER_BYTES + 2 * self.capacity * np.dtype(np.float32).itemsize
+		self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+		self._owner = create
+		self._count = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+		self._buf = np.ndarray((2 * self.capacity,), dtype=np.float32, buffer=self.shm.buf, offset=_HEADER_BYTES)
+		if create:
+			self._count[0] = 0
+			self._buf[:] = 0.0
+
+	@classmethod
+	def attach(cls, name: str, capacity: int) -> "SharedAudioRing":
+		return cls(capacity, name=name, create=False)
+
+	@property
+	def name(self) -> str:
+		return self.shm.name
+
+	@property
+	def total_written(self) -> int:
+		return int(self._count[0])
+
+	def write(self, block: np.ndarray):
+		"""Append samples. Allocation-free; safe to call from an audio callback."""
+		n = block.shape[0]
+		if n > self.capacity:
+			block = block[-self.capacity:]
+			self._count[0] += n - self.capacity
+			n = self.capacity
+		cap = self.capacity
+		pos = self.total_written % cap
+		n_head = min(n, cap - pos) # before wrapping
+		n_tail = n - n_head
+		for off in (0, cap):
+			self._buf[(off + pos):(off + pos + n_head)] = block[:n_head]
+			if n_tail:
+				self._buf[off:(off + n_tail)] = block[n_head:]
+		self._count[0] += n # publish after the data is in place
+
+	def window(self, end: int, n: int) -> np.ndarray:
+		"""Read-only view of the `n` samples ending at absolute sample index `end`."""
+		if n > self.capacity:
+			raise ValueError(f"Window of {n} samples exceeds ring capacity {self.capacity}.")
+		if not self.is_valid(end, n):
+			raise ValueError(f"Samples [{end - n}, {end}) have been overwritten or not written yet.")
+		start = (end - n) % self.capacity
+		view = self._buf[start:(start + n)]
+		view.flags.writeable = False
+		return view
+
+	def is_valid(self, end: int, n: int) -> bool:
+		"""True if samples [end-n, end) are still in the ring. Check again after using a view to detect overruns."""
+		total = self.total_written
+		return end <= total and (end - n) >= (total - self.capacity)
+
+	def close(self):
+		del self._count, self._buf
+		self.shm.close()
+		if self._owner:
+			self.shm.unlink()
@@ -0,0 +1,132 @@
+"""Deadline-aware transcription scheduling for the signer.
+Every window must be decoded within one hop, or the signer falls behind real
+time. The scheduler times each decode, and when a deadline is missed it steps
+down a ladder of cheaper settings (smaller beam, shorter window, smaller model).
+After a run of comfortably fast decodes it steps back up.
+"""
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+SMALLER_MODELS = { # fallback chain for model-size downgrades
+	"large-v3": "medium",
+	"large-v2": "medium",
+	"medium": "small",
+	"medium.en": "small.en",
+	"small": "base",
+	"small.en": "base.en",
+	"base": "tiny",
+	"base.en": "tiny.en",
+}
+
+@dataclass(frozen=True)
+class TranscriptionSetting:
+	window_sec: float
+	beam_size: int
+	model_size: str
+
+	def describe(self) -> str:
+		return f"window={self.window_sec:.1f}s beam={self.beam_size} model={self.model_size}"
+
+def default_ladder(model_size: str, window_sec: float, hop_sec: float, beam_size: int = 1) -> list[TranscriptionSetting]:
+	"""Settings from best to cheapest: lower beam, then shrink the window (never below one hop), then smaller models."""
+	ladder = [TranscriptionSetting(window_sec, beam_size, model_size)]
+	if beam_size > 1:
+		ladder.append(TranscriptionSetting(window_sec, 1, model_size))
+	short_sec = max(hop_sec, 0.6 * window_sec)
+	if short_sec < window_sec:
+		ladder.append(TranscriptionSetting(short_sec, 1, model_size))
+	size = SMALLER_MODELS.get(model_size)
+	while size is not None:
+		ladder.append(TranscriptionSetting(short_sec, 1, size))
+		size = SMALLER_MODELS.get(size)
+	return ladder
+
+class DeadlineScheduler:
+	"""Signer transcriber (see speech.py) that adapts its settings to meet a per-window deadline.
+	`make_transcriber(model, setting)` builds the underlying transcriber for a level
+	and `load_model(model_size)` loads models on first use (then cached). Decodes are timed with `clock`.
+	On a level switch, transcribers with `take_over` (incremental ones) continue the previous level's
+	committed timeline rather than starting from an empty one.
+	"""
+	def __init__(
+		self,
+		ladder: list[TranscriptionSetting],
+		load_model: Callable[[str], object],
+		make_transcriber: Callable[[object, TranscriptionSetting], object],
+		deadline_sec: float,
+		recover_frac: float = 0.5,
+		recover_after: int = 5,
+		fs_Hz: float = 16000.0,
+		debug: bool = False,
+		clock: Callable[[], float] = time.monotonic,
+	):
+		self.ladder = ladder
+		self.load_model = load_model
+		self.make_transcriber = make_transcriber
+		self.deadline_sec = deadline_sec
+		self.recover_frac = recover_frac
+		self.recover_after = recover_after
+		self.fs_Hz = fs_Hz
+		self.debug = debug
+		self.clock = clock
+		self.level = 0
+		self.n_decodes = 0
+		self.n_missed = 0
+		self.last_rtf = 0.0
+		self._n_fast = 0
+		self._models: dict[str, object] = {}
+		self._transcribers: dict[int, object] = {}
+		self._active = None # transcriber of the last level used
+
+	@property
+	def setting(self) -> TranscriptionSetting:
+		return self.ladder[self.level]
+
+	@property
+	def timeline(self) -> bool:
+		return getattr(self._transcriber(), "timeline", False)
+
+	def _transcriber(self):
+		if self.level not in self._transcribers:
+			size = self.setting.model_size
+			if size not in self._models:
+				self._models[size] = self.load_model(size)
+			self._transcribers[self.level] = self.make_transcriber(self._models[size], self.setting)
+		transcriber = self._transcribers[self.level]
+		if self._active is not None and transcriber is not self._active and hasattr(transcriber, "take_over"):
+			transcriber.take_over(self._active)
+		self._active = transcriber
+		return transcriber
+
+	def reset(self, end_sam: int):
+		self._transcriber().reset(end_sam)
+
+	def transcribe_window(self, window_audio, end_sam: int) -> str:
+		n = min(len(window_audio), int(self.setting.window_sec * self.fs_Hz))
+		audio = window_audio[-n:] if n else window_audio
+		transcriber = self._transcriber()
+		t0 = self.clock()
+		text = transcriber.transcribe_window(audio, end_sam)
+		decode_sec = self.clock() - t0
+		self.n_decodes += 1
+		self.last_rtf = decode_sec / (len(audio) / self.fs_Hz) if len(audio) else 0.0
+		if self.debug:
+			print(f"[scheduler] decoded in {decode_sec:.2f}s (rtf {self.last_rtf:.2f}, deadline {self.deadline_sec:.2f}s) at {self.setting.describe()}")
+		if decode_sec > self.deadline_sec:
+			self.n_missed += 1
+			self._n_fast = 0
+			if self.level + 1 < len(self.ladder):
+				self.level += 1
+				print(f"[scheduler] missed deadline ({decode_sec:.2f}s > {self.deadline_sec:.2f}s, rtf {self.last_rtf:.2f}); stepping down to {self.setting.describe()}")
+			else:
+				print(f"[scheduler] missed deadline ({decode_sec:.2f}s > {self.deadline_sec:.2f}s) at cheapest setting {self.setting.describe()}")
+		elif decode_sec < self.recover_frac * self.deadline_sec and self.level > 0:
+			self._n_fast += 1
+			if self._n_fast >= self.recover_after:
+				self._n_fast = 0
+				self.level -= 1
+				print(f"[scheduler] load dropped (rtf {self.last_rtf:.2f}); stepping up to {self.setting.describe()}")
+		else:
+			self._n_fast = 0
+		return text
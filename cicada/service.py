@@ -0,0 +1,196 @@
+"""Long-running local service for extract and verify jobs (`serve`), so a pipeline submitting
+many recordings pays for imports, LDPC tables, modems, public keys and Whisper models once
+instead of per recording.
+
+Clients POST {"command": "extract" | "verify", "args": [command-line arguments]} to
+http://host:port/jobs and read newline-delimited JSON events back while the job runs:
+
+	{"event": "queued", "job": 3, "ahead": 1}
+	{"event": "started", "job": 3}
+	{"event": "log", "job": 3, "line": "[verification] Matched 6 of 6 payloads"}
+	{"event": "done", "job": 3, "ok": true, "output": "out/rec_transcript.md", "error": null, "sec": 12.3}
+
+Jobs run on a fixed pool of worker threads fed by a bounded queue; when it is full the service
+answers 503 instead of queueing more. What a job prints is routed to its own client, including
+from threads it starts through job_output.carry_output (as the pool ASR engine does). GET /status
+reports the pool and what is resident. Relative paths in job arguments are resolved against the
+service's working directory.
+"""
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+import traceback
+import urllib.request
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import asr, interface
+from .job_output import RoutedStream, route_output
+from .payload.signature import all_verifiers
+
+@dataclass
+class Job:
+	id: int
+	command: str
+	argv: list[str]
+	events: queue.Queue = field(default_factory=queue.Queue)
+	_partial: str = ""
+
+	def emit(self, event: str, **kwargs):
+		self.events.put({"event": event, "job": self.id, **kwargs})
+
+	def write(self, s: str):
+		"""Text the job printed, emitted a line at a time."""
+		l_lines = (self._partial + s).split("\n")
+		self._partial = l_lines.pop()
+		for line in l_lines:
+			self.emit("log", line=line)
+
+class VerificationService:
+	"""Runs `commands[name](argv)` jobs on `workers` threads, at most `max_queued` waiting."""
+	def __init__(self, commands: dict[str, Callable[[list[str]], object]], workers: int = 1, max_queued: int = 8):
+		self.commands = commands
+		self.workers = workers
+		self.queue: queue.Queue[Job] = queue.Queue(maxsize=max_queued)
+		self._ids = itertools.count(1)
+		self._lock = threading.Lock()
+		self.n_running = self.n_done = self.n_failed = self.n_rejected = 0
+		for stream_name in ("stdout", "stderr"):
+			if not isinstance(getattr(sys, stream_name), RoutedStream):
+				setattr(sys, stream_name, RoutedStream(getattr(sys, stream_name)))
+		self._threads = [threading.Thread(target=self._work, name=f"serve-worker-{i}", daemon=True) for i in range(workers)]
+		for thread in self._threads:
+			thread.start()
+
+	def submit(self, command: str, argv: list[str]) -> Job:
+		"""Queue a job. Raises ValueError for an unknown command and queue.Full when the queue is full."""
+		if command not in self.commands:
+			raise ValueError(f"Unknown command {command!r}; expected one of {sorted(self.commands)}.")
+		if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+			raise ValueError("Job args must be a list of strings.")
+		job = Job(next(self._ids), command, argv)
+		job.emit("queued", ahead=self.queue.qsize())
+		try:
+			self.queue.put_nowait(job)
+		except queue.Full:
+			with self._lock:
+				self.n_rejected += 1
+			raise
+		return job
+
+	def shutdown(self):
+		"""Stop the workers once the queued jobs are done, and restore sys.stdout and sys.stderr."""
+		for _ in self._threads:
+			self.queue.put(None)
+		for thread in self._threads:
+			thread.join()
+		for stream_name in ("stdout", "stderr"):
+			stream = getattr(sys, stream_name)
+			if isinstance(stream, RoutedStream):
+				setattr(sys, stream_name, stream.default)
+
+	def _work(self):
+		while True:
+			job = self.queue.get()
+			if job is None:
+				return
+			with self._lock:
+				self.n_running += 1
+			job.emit("started")
+			t0 = time.perf_counter()
+			ok, output, error = False, None, None
+			route_output(job.write)
+			try:
+				output = self.commands[job.command](job.argv)
+				ok = True
+			except SystemExit as exc: # argparse errors, and commands exiting with a status
+				ok = not exc.code
+				error = None if ok else f"exited with status {exc.code}"
+			except Exception as exc:
+				traceback.print_exc()
+				error = f"{type(exc).__name__}: {exc}"
+			finally:
+				route_output(None)
+			if job._partial:
+				job.write("\n")
+			with self._lock:
+				self.n_running -= 1
+				self.n_done += ok
+				self.n_failed += not ok
+			job.emit("done", ok=ok, output=None if output is None else str(output), error=error, sec=round(time.perf_counter() - t0, 3))
+
+	def status(self) -> dict:
+		with self._lock:
+			return {
+				"workers": self.workers,
+				"running": self.n_running,
+				"queued": self.queue.qsize(),
+				"max_queued": self.queue.maxsize,
+				"done": self.n_done,
+				"failed": self.n_failed,
+				"rejected": self.n_rejected,
+				"resident_models": [cfg.describe() for cfg in asr.resident_models()],
+				"resident_modems": interface.resident_modem_count(),
+				"public_keys": len(all_verifiers()),
+			}
+
+def make_server(service: VerificationService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+	"""HTTP front end: POST /jobs streams a job's events, GET /status returns service.status()."""
+	class _Handler(BaseHTTPRequestHandler):
+		def _send_json(self, code: int, obj):
+			body = json.dumps(obj).encode("utf-8")
+			self.send_response(code)
+			self.send_header("Content-Type", "application/json")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def do_GET(self):
+			if self.path.rstrip("/") != "/status":
+				self.send_error(404)
+				return
+			self._send_json(200, service.status())
+
+		def do_POST(self):
+			if self.path.rstrip("/") != "/jobs":
+				self.send_error(404)
+				return
+			try:
+				request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+				job = service.submit(request.get("command"), request.get("args", []))
+			except (ValueError, AttributeError) as exc:
+				self._send_json(400, {"error": str(exc)})
+				return
+			except queue.Full:
+				self._send_json(503, {"error": f"{service.queue.maxsize} jobs already queued; retry later"})
+				return
+			self.send_response(200)
+			self.send_header("Content-Type", "application/x-ndjson")
+			self.end_headers()
+			while True: # close-delimited body, one event per line as it happens
+				event = job.events.get()
+				try:
+					self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+					self.wfile.flush()
+				except (BrokenPipeError, ConnectionResetError): # the job still runs to completion
+					return
+				if event["event"] == "done":
+					return
+
+		def log_message(self, *args): pass
+	return ThreadingHTTPServer((host, port), _Handler)
+
+def submit(url: str, command: str, argv: list[str]) -> Iterator[dict]:
+	"""Send a job to a running service and yield its events as they arrive."""
+	request = urllib.request.Request(
+		url.rstrip("/") + "/jobs",
+		data=json.dumps({"command": command, "args": list(argv)}).encode("utf-8"),
+		headers={"Content-Type": "application/json"},
+	)
+	with urllib.request.urlopen(request) as response:
+		for line in response:
+			yield json.loads(line)
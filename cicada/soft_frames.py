@@ -0,0 +1,106 @@
+"""Binary store of demodulated frames before error correction (`<input>_soft.npz`).
+`extract` writes one next to its frames CSV so that `decode` can re-run FEC and payload parsing
+(another payload type, --no-ldpc, --transport, --keep-duplicates) without the DSP front end.
+
+Per frame it keeps the start sample on the recording's timeline, the frame-search energy score,
+the bit LLRs and the symbol log-likelihoods. LLRs and log-likelihoods are stored as int8 with one
+scale per frame (a step of max|x|/127, well below what moves the LDPC decoder), about 3 kB per
+1024-symbol frame. The waveform and demodulator settings are kept alongside so the modem can be
+rebuilt without repeating them.
+"""
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .fsk.demodulator import FSKDemodulatorResult
+
+FORMAT_VERSION = 1
+
+def quantize(a: np.ndarray) -> tuple[np.ndarray, float]:
+	"""int8 values and the scale that maps them back (a ~= q * scale)."""
+	peak = float(np.max(np.abs(a))) if a.size else 0.0
+	scale = peak / 127 if peak > 0 else 1.0
+	return np.clip(np.round(a / scale), -127, 127).astype(np.int8), scale
+
+@dataclass
+class SoftFrames:
+	start_idx: np.ndarray # (n,) int64, sample index on the recording's timeline
+	pulse_map_idx: np.ndarray # (n,) int64, column of the demodulator's pulse energy map
+	score: np.ndarray # (n,) float32, frame energy at the start found by the frame search
+	bit_llrs_q: np.ndarray # (n, bits) int8; zero columns when the waveform has more than 1 bit per symbol
+	bit_llr_scale: np.ndarray # (n,) float32
+	sym_ll_q: np.ndarray # (n, mod_order, symbols) int8
+	sym_ll_scale: np.ndarray # (n,) float32
+	settings: dict # Waveform/demodulator arguments (wf_*, demod_*) and the input recording
+
+	@classmethod
+	def from_results(cls, l_dr: list[FSKDemodulatorResult], Ef: np.ndarray, settings: dict, n_offset: int = 0) -> "SoftFrames":
+		"""Frames as found by FSKDemodulator.frame_search (l_dr, Ef), with start_idx shifted by n_offset."""
+		has_bits = bool(l_dr) and all(dr.bit_llrs is not None for dr in l_dr)
+		l_bits = [quantize(dr.bit_llrs) for dr in l_dr] if has_bits else []
+		l_syms = [quantize(dr.sym_log_likelihoods) for dr in l_dr]
+		return cls(
+			start_idx=np.array([dr.start_idx + n_offset for dr in l_dr], dtype=np.int64),
+			pulse_map_idx=np.array([dr.pulse_map_idx for dr in l_dr], dtype=np.int64),
+			score=np.array([Ef[dr.pulse_map_idx] for dr in l_dr], dtype=np.float32),
+			bit_llrs_q=np.stack([q for q, _ in l_bits]) if has_bits else np.zeros((len(l_dr), 0), dtype=np.int8),
+			bit_llr_scale=np.array([s for _, s in l_bits] if has_bits else [1.0] * len(l_dr), dtype=np.float32),
+			sym_ll_q=np.stack([q for q, _ in l_syms]) if l_syms else np.zeros((0, 0, 0), dtype=np.int8),
+			sym_ll_scale=np.array([s for _, s in l_syms], dtype=np.float32),
+			settings=dict(settings),
+		)
+
+	def __len__(self) -> int:
+		return len(self.start_idx)
+
+	def bit_llrs(self, i: int) -> np.ndarray | None:
+		if not self.bit_llrs_q.shape[1]:
+			return None
+		return self.bit_llrs_q[i] * np.float64(self.bit_llr_scale[i])
+
+	def results(self) -> list[FSKDemodulatorResult]:
+		"""The frames as demodulator results (dequantized), ready for Modem.decode_results."""
+		l_dr = []
+		for i in range(len(self)):
+			ll = self.sym_ll_q[i] * np.float64(self.sym_ll_scale[i])
+			l_dr.append(FSKDemodulatorResult(
+				syms=np.argmax(ll, axis=0),
+				sym_log_likelihoods=ll,
+				pulse_map_idx=int(self.pulse_map_idx[i]),
+				start_idx=int(self.start_idx[i]),
+				bit_llrs=self.bit_llrs(i),
+			))
+		return l_dr
+
+	def save(self, path: Path | str):
+		with open(path, "wb") as f: # np.savez would append .npz to any other suffix
+			np.savez(
+				f,
+				version=np.int64(FORMAT_VERSION),
+				settings=np.array(json.dumps(self.settings)),
+				start_idx=self.start_idx,
+				pulse_map_idx=self.pulse_map_idx,
+				score=self.score,
+				bit_llrs_q=self.bit_llrs_q,
+				bit_llr_scale=self.bit_llr_scale,
+				sym_ll_q=self.sym_ll_q,
+				sym_ll_scale=self.sym_ll_scale,
+			)
+
+	@classmethod
+	def load(cls, path: Path | str) -> "SoftFrames":
+		with np.load(path, allow_pickle=False) as z:
+			if int(z["version"]) != FORMAT_VERSION:
+				raise ValueError(f"{path}: soft-frame format version {int(z['version'])} is not supported (expected {FORMAT_VERSION}).")
+			return cls(
+				start_idx=z["start_idx"],
+				pulse_map_idx=z["pulse_map_idx"],
+				score=z["score"],
+				bit_llrs_q=z["bit_llrs_q"],
+				bit_llr_scale=z["bit_llr_scale"],
+				sym_ll_q=z["sym_ll_q"],
+				sym_ll_scale=z["sym_ll_scale"],
+				settings=json.loads(str(z["settings"])),
+			)
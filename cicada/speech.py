@@ -1,13 +1,15 @@
 """Speech transcription & transcript regularization utilities."""
-import time, queue, numpy as np, soundfile as sf, sounddevice as sd
+import time, queue, threading, numpy as np
 from dataclasses import dataclass
-from math import gcd
 from collections.abc import Iterator
 from pathlib import Path
 from datetime import datetime, timezone
-from scipy.signal import resample_poly
 from faster_whisper.transcribe import Segment, TranscriptionInfo
 
+from . import audio_io
+from .ingest import ingest
+from .metrics import MetricsRegistry
+
 whisper_model_fs_Hz = 16e3 # All Whisper models are trained on 16 kHz samples
 
 @dataclass
@@ -17,71 +19,326 @@ class WhisperTranscriptionChunk:
 	idx: int = -1 #  (if applicable) Sample index of the .wav file where this chunk started
 
 def load_wav(path):
-	samples_for_model, wav_fs_Hz = sf.read(path)
-	if samples_for_model.ndim > 1: # to mono
-		samples_for_model = samples_for_model.mean(axis=1)
-	if not (wav_fs_Hz == whisper_model_fs_Hz): # resample
-		g = gcd(int(wav_fs_Hz), int(whisper_model_fs_Hz))
-		up = whisper_model_fs_Hz / g
-		down = wav_fs_Hz / g
-		samples_for_model = resample_poly(samples_for_model, up, down)
-	return samples_for_model, wav_fs_Hz
-
-def mic_worker(q_audio, mic_blocksize_sam=1024, mic_device=None): # Microphone sample producer
-	def _callback(indata, frames, time_info, status):
-		if status: print("[mic worker]", status)
-		mono = indata.mean(axis=1).copy()
-		q_audio.put(mono)
+	audio = ingest(path, rates=(whisper_model_fs_Hz,))
+	return audio.at(whisper_model_fs_Hz), audio.fs_Hz
 
-	with sd.InputStream(samplerate=whisper_model_fs_Hz,
-		channels=1,
-		blocksize=mic_blocksize_sam,
-		dtype="float32",
-		callback=_callback,
-		device=mic_device):
-		while True: time.sleep(0.1)
+@dataclass
+class TimedWord:
+	text: str
+	start: float # seconds from the start of the stream/recording
+	end: float
 
-def audio_transcript_worker(model, q_audio, q_tokens, window_sec=10.0, overlap_sec=5.0, debug=True, transcript_writer=None): # Audio transcription producer
-	window_samples = int(window_sec * whisper_model_fs_Hz)
-	overlap_samples = int(overlap_sec * whisper_model_fs_Hz)
-	hop_samples = window_samples - overlap_samples
-	audio_buffer = np.zeros(0, dtype=np.float32)
-	next_decode_at = time.monotonic()
-	while True:
-		try:
-			sam = q_audio.get(timeout=0.1)
-			sam = np.asarray(sam, dtype=np.float32).ravel()
-			audio_buffer = np.concatenate([audio_buffer, sam])
-		except queue.Empty:
-			if audio_buffer.size == 0 and debug:
-				print("[transcript worker] waiting for audio...")
-		if audio_buffer.size < window_samples:
-			continue
+def transcribe_timeline(samples: np.ndarray, model, beam_size: int = 1) -> list[TimedWord]:
+	"""Decode a whole recording (at whisper_model_fs_Hz) once, with word timestamps, into a word timeline."""
+	seg_iter, info = model.transcribe(
+		samples,
+		language="en",
+		beam_size=beam_size,
+		vad_filter=False,
+		word_timestamps=True,
+	)
+	return segment_words(seg_iter)
 
-		if audio_buffer.size > window_samples * 4:
-			audio_buffer = audio_buffer[-window_samples * 4 :]
+def segment_words(seg_iter) -> list[TimedWord]:
+	"""Flatten the word timestamps of Whisper segments into TimedWords."""
+	l_words = []
+	for seg in seg_iter:
+		for w in (seg.words or []):
+			tw = TimedWord(w.word.strip(), w.start, w.end)
+			if tw.text: l_words.append(tw)
+	return l_words
 
-		now = time.monotonic()
-		if now < next_decode_at:
-			continue
-		next_decode_at = now + (hop_samples / whisper_model_fs_Hz)
+class WindowTranscriber:
+	"""Re-decode the whole rolling window on every hop."""
+	timeline = False # Accepts audio cut down to speech regions
 
-		window_audio = audio_buffer[-window_samples:]
-		if debug: print("[transcript worker] decoding latest window...")
-		seg_iter, info = model.transcribe(
+	def __init__(self, model, beam_size: int = 1):
+		self.model = model
+		self.beam_size = beam_size
+
+	def reset(self, end_sam: int):
+		pass
+
+	def transcribe_window(self, window_audio: np.ndarray, end_sam: int) -> str:
+		seg_iter, info = self.model.transcribe(
 			window_audio,
 			language="en",
-			beam_size=1,
+			beam_size=self.beam_size,
 			vad_filter=False,
 		)
-		segments = list(seg_iter)
+		return " ".join(s.text.strip() for s in seg_iter if s.text)
+
+class IncrementalTranscriber:
+	"""Decode only audio that is not yet on the committed word timeline.
+	Each hop decodes from the end of the last committed word, with the preceding
+	committed text as the prompt. Words ending within `commit_margin_sec` of the
+	newest audio may be cut off, so they are shown but re-decoded next hop. The
+	window transcript is assembled from the timeline rather than re-decoded.
+	"""
+	timeline = True # Needs uncut audio so word timestamps line up with the stream
+
+	def __init__(self, model, window_sec: float = 10.0, beam_size: int = 1, commit_margin_sec: float = 1.0, prompt_words: int = 32):
+		self.model = model
+		self.window_sec = window_sec
+		self.beam_size = beam_size
+		self.commit_margin_sec = commit_margin_sec
+		self.prompt_words = prompt_words
+		self.committed: list[TimedWord] = []
+		self.committed_end_sec = 0.0 # Audio before this time is final
+		self.decoded_sec = 0.0 # Total audio seconds sent to the model, for compute accounting
+
+	def take_over(self, other: "IncrementalTranscriber"):
+		"""Continue another transcriber's committed timeline (and so its prompt), e.g. when the
+		deadline scheduler switches levels."""
+		self.committed = list(other.committed)
+		self.committed_end_sec = other.committed_end_sec
+
+	def reset(self, end_sam: int):
+		"""Treat everything up to `end_sam` as final silence."""
+		self.committed.clear()
+		self.committed_end_sec = max(self.committed_end_sec, end_sam / whisper_model_fs_Hz)
+
+	def transcribe_window(self, window_audio: np.ndarray, end_sam: int) -> str:
+		end_sec = end_sam / whisper_model_fs_Hz
+		win_start_sec = end_sec - len(window_audio) / whisper_model_fs_Hz
+		decode_from_sec = max(self.committed_end_sec, win_start_sec)
+		i0 = int(round((decode_from_sec - win_start_sec) * whisper_model_fs_Hz))
+		new_audio = window_audio[i0:]
+		provisional: list[TimedWord] = []
+		if new_audio.size:
+			prompt = " ".join(w.text for w in self.committed[-self.prompt_words:]) or None
+			seg_iter, info = self.model.transcribe(
+				new_audio,
+				language="en",
+				beam_size=self.beam_size,
+				vad_filter=False,
+				word_timestamps=True,
+				initial_prompt=prompt,
+				condition_on_previous_text=False,
+			)
+			self.decoded_sec += new_audio.size / whisper_model_fs_Hz
+			commit_before_sec = end_sec - self.commit_margin_sec
+			for seg in seg_iter:
+				for w in (seg.words or []):
+					tw = TimedWord(w.word.strip(), decode_from_sec + w.start, decode_from_sec + w.end)
+					if not tw.text: continue
+					if tw.end <= commit_before_sec and not provisional:
+						self.committed.append(tw)
+					else:
+						provisional.append(tw)
+			self.committed_end_sec = max(decode_from_sec, self.committed[-1].end if self.committed else 0.0)
+			if not provisional: # nothing pending; silence up to the margin is final too
+				self.committed_end_sec = max(self.committed_end_sec, commit_before_sec)
+		self.committed = [w for w in self.committed if w.start >= win_start_sec]
+		return " ".join(w.text for w in self.committed + provisional)
+
+def build_signer_transcriber(model, model_size="medium.en", load_model=None, window_sec=10.0, overlap_sec=5.0, beam_size=1, incremental=False, vad=False, deadline=False, debug=True):
+	"""Compose the signer's transcriber: full-window or incremental decoding,
+	optionally under a deadline scheduler, optionally gated by VAD.
+	`load_model(model_size)` is needed for the scheduler to fall back to smaller models."""
+	from .scheduler import DeadlineScheduler, default_ladder
+	from .vad import VADGatedTranscriber
+	def make_transcriber(m, setting):
+		if incremental:
+			return IncrementalTranscriber(m, window_sec=setting.window_sec, beam_size=setting.beam_size)
+		return WindowTranscriber(m, beam_size=setting.beam_size)
+	hop_sec = window_sec - overlap_sec
+	ladder = default_ladder(model_size, window_sec, hop_sec, beam_size=beam_size)
+	if deadline:
+		models = {model_size: model} if model is not None else {}
+		def _load(size):
+			if size in models: return models[size]
+			print(f"[scheduler] loading fallback model {size}")
+			return load_model(size)
+		transcriber = DeadlineScheduler(ladder, _load, make_transcriber, deadline_sec=hop_sec, fs_Hz=whisper_model_fs_Hz, debug=debug)
+	else:
+		transcriber = make_transcriber(model, ladder[0])
+	if vad:
+		transcriber = VADGatedTranscriber(transcriber, debug=debug)
+	return transcriber
+
+def put_latest(q: queue.Queue, item) -> int:
+	"""Put `item` on a bounded queue, discarding the oldest entries if it is full.
+	Returns the number of discarded entries. Assumes a single producer."""
+	n_dropped = 0
+	while True:
+		try:
+			q.put_nowait(item)
+			return n_dropped
+		except queue.Full:
+			try:
+				q.get_nowait()
+				n_dropped += 1
+			except queue.Empty:
+				pass
+
+def _capture_metrics(metrics: MetricsRegistry):
+	return (
+		metrics.histogram("stage_latency_seconds", "Per-stage latency", {"stage": "capture"}),
+		metrics.counter("xruns_total", "Audio callback over/underruns", {"stream": "input"}),
+	)
 
-		str_transcript_raw = " ".join(s.text.strip() for s in segments if s.text)
+def mic_worker(q_audio, mic_blocksize_sam=1024, mic_device=None, stop_event: threading.Event | None = None, metrics: MetricsRegistry | None = None): # Microphone sample producer
+	stop_event = stop_event or threading.Event()
+	metrics = metrics or MetricsRegistry()
+	h_capture, c_xruns = _capture_metrics(metrics)
+	c_dropped = metrics.counter("dropped_mic_blocks_total", "Mic blocks dropped because the window stage stalled")
+	blocking = audio_io.is_blocking(mic_device) # virtual mics wait for the pipeline instead of dropping audio
+	def _callback(indata, frames, time_info, status):
+		if status:
+			c_xruns.inc()
+			print("[mic worker]", status)
+		h_capture.observe(max(0.0, time_info.currentTime - time_info.inputBufferAdcTime))
+		mono = indata.mean(axis=1).copy()
+		if blocking:
+			q_audio.put(mono)
+			return
+		try:
+			q_audio.put_nowait(mono)
+		except queue.Full:
+			c_dropped.inc()
+			print("[mic worker] audio queue full; dropping block")
+
+	with audio_io.open_input(mic_device, whisper_model_fs_Hz, mic_blocksize_sam, _callback) as stream:
+		while stream.active and not stop_event.wait(0.1): pass
+	q_audio.put(None)
+
+def window_worker(q_audio, q_windows, window_sec=10.0, overlap_sec=5.0, debug=True, metrics: MetricsRegistry | None = None, lossless=False): # Rolling window producer
+	"""Assemble mic blocks into a rolling window and publish (window, t_end, end_sample) exactly
+	once per hop of new audio. Stale windows waiting on the transcriber are replaced, unless
+	`lossless` is set (then publishing blocks until the transcriber is done with the window)."""
+	metrics = metrics or MetricsRegistry()
+	h_window = metrics.histogram("stage_latency_seconds", "Per-stage latency", {"stage": "window"})
+	c_dropped = metrics.counter("dropped_windows_total", "Windows replaced before the transcriber got to them")
+	assembly_sec = 0.0 # Time spent assembling the current hop
+	window_samples = int(window_sec * whisper_model_fs_Hz)
+	hop_samples = window_samples - int(overlap_sec * whisper_model_fs_Hz)
+	window = np.zeros(window_samples, dtype=np.float32)
+	n_seen = 0
+	n_since_emit = 0
+	while True:
+		sam = q_audio.get()
+		if sam is None: break
+		t0 = time.monotonic()
+		sam = np.asarray(sam, dtype=np.float32).ravel()
+		n = sam.size
+		if n >= window_samples:
+			window[:] = sam[-window_samples:]
+		else:
+			window[:-n] = window[n:]
+			window[-n:] = sam
+		n_seen += n
+		n_since_emit += n
+		if n_seen < window_samples or n_since_emit < hop_samples:
+			assembly_sec += time.monotonic() - t0
+			continue
+		n_since_emit = 0
+		window_copy = window.copy()
+		h_window.observe(assembly_sec + time.monotonic() - t0)
+		assembly_sec = 0.0
+		if lossless:
+			q_windows.put((window_copy, time.monotonic(), n_seen))
+			q_windows.join()
+			continue
+		n_dropped = put_latest(q_windows, (window_copy, time.monotonic(), n_seen))
+		c_dropped.inc(n_dropped)
+		if n_dropped and debug:
+			print("[window worker] transcriber is behind; replaced a stale window")
+	q_windows.put(None)
+
+def transcribe_worker(model, q_windows, q_tokens, debug=True, transcript_writer=None, transcriber=None, metrics: MetricsRegistry | None = None, lossless=False): # Window transcriber
+	"""Transcribe each published window and publish (transcript, t_window_end).
+	`transcriber` defaults to re-decoding the full window with `model`. With `lossless`,
+	publishing blocks until the transcript has been consumed instead of replacing it."""
+	transcriber = transcriber or WindowTranscriber(model)
+	metrics = metrics or MetricsRegistry()
+	h_transcribe = metrics.histogram("stage_latency_seconds", "Per-stage latency", {"stage": "transcribe"})
+	c_dropped = metrics.counter("dropped_transcripts_total", "Transcripts replaced before they were signed")
+	while True:
+		item = q_windows.get()
+		if item is None: break
+		window_audio, t_end, end_sam = item
+		if debug: print("[transcript worker] decoding latest window...")
+		t0 = time.monotonic()
+		str_transcript_raw = transcriber.transcribe_window(window_audio, end_sam)
+		h_transcribe.observe(time.monotonic() - t0)
 		if str_transcript_raw:
 			if transcript_writer is not None:
 				transcript_writer.write_chunk(str_transcript_raw, timestamp=time.time())
-			q_tokens.put(str_transcript_raw)
+			if lossless:
+				q_tokens.put((str_transcript_raw, t_end))
+				q_tokens.join()
+			else:
+				c_dropped.inc(put_latest(q_tokens, (str_transcript_raw, t_end)))
 			if debug: print(f"[transcript worker] published transcript chunk: {str_transcript_raw}")
+		q_windows.task_done()
+	q_tokens.put(None)
+
+def audio_transcript_worker(model, q_audio, q_tokens, window_sec=10.0, overlap_sec=5.0, debug=True, transcript_writer=None, transcriber=None, metrics: MetricsRegistry | None = None): # Audio transcription producer
+	"""Window and transcribe mic audio from q_audio, publishing (transcript, t_window_end) to q_tokens."""
+	q_windows = queue.Queue(maxsize=1)
+	t_window = threading.Thread(
+		target=window_worker,
+		args=(q_audio, q_windows),
+		kwargs={"window_sec": window_sec, "overlap_sec": overlap_sec, "debug": debug, "metrics": metrics},
+		daemon=True,
+	)
+	t_window.start()
+	transcribe_worker(model, q_windows, q_tokens, debug=debug, transcript_writer=transcript_writer, transcriber=transcriber, metrics=metrics)
+
+def ring_mic_worker(ring, q_hops, hop_samples, mic_blocksize_sam=1024, mic_device=None, stop_event: threading.Event | None = None, metrics: MetricsRegistry | None = None): # Shared-memory microphone producer
+	"""Capture straight into a SharedAudioRing and post (end_sample, t_end) to q_hops once per hop.
+	The callback does no allocation besides the hop notification."""
+	stop_event = stop_event or threading.Event()
+	h_capture, c_xruns = _capture_metrics(metrics or MetricsRegistry())
+	n_since_hop = [0]
+	def _callback(indata, frames, time_info, status):
+		if status:
+			c_xruns.inc()
+			print("[mic worker]", status)
+		h_capture.observe(max(0.0, time_info.currentTime - time_info.inputBufferAdcTime))
+		ring.write(indata[:, 0])
+		n_since_hop[0] += frames
+		if n_since_hop[0] >= hop_samples:
+			n_since_hop[0] = 0
+			q_hops.put((ring.total_written, time.monotonic()))
+
+	with audio_io.open_input(mic_device, whisper_model_fs_Hz, mic_blocksize_sam, _callback) as stream:
+		while stream.active and not stop_event.wait(0.1): pass
+	q_hops.put(None)
+
+def ring_transcribe_process(ring_name, ring_capacity, q_hops, q_out, model_size="medium.en", compute_type="float32", backend="faster-whisper", window_sec=10.0, transcriber_kwargs=None, debug=True): # Transcription worker process
+	"""Entry point for a worker process: load Whisper, then transcribe the newest
+	window of the shared ring each time a hop is posted. Publishes (transcript, t_end, decode_sec).
+	`transcriber_kwargs` are forwarded to build_signer_transcriber."""
+	from .asr import ASRConfig, model_loader
+	from .ringbuffer import SharedAudioRing
+	from .vad import VADGatedTranscriber
+	ring = SharedAudioRing.attach(ring_name, ring_capacity)
+	load_model = model_loader(ASRConfig(backend=backend, model_size=model_size, compute_type=compute_type))
+	transcriber = build_signer_transcriber(load_model(model_size), model_size=model_size, load_model=load_model, window_sec=window_sec, debug=debug, **(transcriber_kwargs or {}))
+	window_samples = int(window_sec * whisper_model_fs_Hz)
+	while True:
+		item = q_hops.get()
+		while item is not None and not q_hops.empty(): # skip to the newest hop if we fell behind
+			try: item = q_hops.get_nowait()
+			except queue.Empty: break
+		if item is None: break
+		end, t_end = item
+		if end < window_samples or not ring.is_valid(end, window_samples):
+			continue
+		if debug: print("[transcript process] decoding latest window...")
+		t0 = time.monotonic()
+		str_transcript_raw = transcriber.transcribe_window(ring.window(end, window_samples), end)
+		decode_sec = time.monotonic() - t0
+		if not ring.is_valid(end, window_samples):
+			print("[transcript process] window was overwritten during decode; discarding")
+			continue
+		if str_transcript_raw:
+			q_out.put((str_transcript_raw, t_end, decode_sec))
+	if isinstance(transcriber, VADGatedTranscriber): print(f"[vad] {transcriber.stats.summary()}")
+	ring.close()
+	q_out.put(None)
 
 class TranscriptLogger:
 	"""Append-only markdown transcript logger."""
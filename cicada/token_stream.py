@@ -0,0 +1,200 @@
+"""Merge verify's overlapping chunk transcripts into one deduplicated token stream.
+Overlapping Whisper windows read the same speech several times. TokenStream aligns
+each chunk with the stream so far and keeps one primary reading of every stretch of
+speech: up to a seam near the midpoint between the chunks' centres it keeps the earlier
+chunk's reading, and after it the later chunk's. Each chunk's own reading is kept as well,
+so a payload is matched once against every distinct window of words -- the primary
+stream's, plus the alternate windows where some chunk heard the speech differently --
+and the annotated transcript is rendered from that one match table.
+"""
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+from .payload.signature import EncodedTokens, signed_speech_bounds, token_times, transcript_digest
+
+_RE_WORD = re.compile(r"\S+")
+
+@dataclass
+class StreamToken:
+	text: str # Regularized token
+	start: float # Seconds on the recording's timeline
+	end: float
+	chunk: int # Chunk this reading came from
+	idx: int # Character offset of the token in that chunk's text
+
+@dataclass
+class StreamWindow:
+	"""One distinct run of tokens and where it was heard."""
+	run: bytes # NUL-terminated tokens, as signed after the payload header
+	first: StreamToken # First token of its first occurrence (in the primary stream if it occurs there)
+	alternate: bool # Only some chunk's reading, not the primary stream, contains it
+
+@dataclass
+class StreamMatch:
+	token: StreamToken # First token of the matched window
+	alternate: bool # Matched an alternate reading rather than the primary stream
+	run: bytes # The matched tokens, NUL-terminated
+
+def chunk_stream_tokens(ichunk: int, chunk, tokenize) -> list[StreamToken]:
+	"""Tokenize a TimelineChunk, timing tokens by its words (or spread evenly over the chunk)."""
+	l_tokens = tokenize(chunk.text)
+	l_times = token_times(chunk.text, l_tokens, chunk.words)
+	if l_times is None:
+		dt = (chunk.end_sec - chunk.start_sec) / max(len(l_tokens), 1)
+		l_times = [(chunk.start_sec + i * dt, chunk.start_sec + (i + 1) * dt) for i in range(len(l_tokens))]
+	return [StreamToken(tok.text, s, e, ichunk, tok.idx) for tok, (s, e) in zip(l_tokens, l_times)]
+
+class TokenStream:
+	def __init__(self, overlap_slack_sec: float = 1.0):
+		self.tokens: list[StreamToken] = [] # Primary reading
+		self.chunk_tokens: list[list[StreamToken]] = [] # Every chunk's own reading
+		self.overlap_slack_sec = overlap_slack_sec
+		self._windows = {} # word_count -> (windows, (start, end, window) occurrences by start, their starts)
+		self._digests = {} # word_count -> {transcript_digest: window ids}
+
+	@classmethod
+	def from_chunks(cls, l_chunks, tokenize, **kwargs) -> "TokenStream":
+		stream = cls(**kwargs)
+		prev = None
+		for ichunk, chunk in enumerate(l_chunks):
+			boundary = 0.0 if prev is None else 0.25 * (prev.start_sec + prev.end_sec + chunk.start_sec + chunk.end_sec)
+			stream.append(chunk_stream_tokens(ichunk, chunk, tokenize), boundary)
+			prev = chunk
+		return stream
+
+	def append(self, l_new: list[StreamToken], boundary_sec: float):
+		"""Merge the next chunk's tokens, switching the primary reading to them at the token
+		both readings agree on nearest boundary_sec."""
+		self._windows = {}
+		self._digests = {}
+		self.chunk_tokens.append(l_new)
+		if not self.tokens or not l_new:
+			self.tokens += l_new
+			return
+		i_tail = len(self.tokens)
+		while i_tail > 0 and self.tokens[i_tail - 1].end > l_new[0].start - self.overlap_slack_sec:
+			i_tail -= 1
+		tail = self.tokens[i_tail:]
+		sm = SequenceMatcher(None, [t.text for t in tail], [t.text for t in l_new], autojunk=False)
+		l_pairs = [(blk.a + k, blk.b + k) for blk in sm.get_matching_blocks() for k in range(blk.size)]
+		if not l_pairs: # nothing to stitch on: cut both readings at the boundary
+			keep = [t for t in tail if 0.5 * (t.start + t.end) < boundary_sec]
+			self.tokens = self.tokens[:i_tail] + keep + [t for t in l_new if 0.5 * (t.start + t.end) >= boundary_sec]
+			return
+		def _dist(pair):
+			a, b = tail[pair[0]], l_new[pair[1]]
+			return abs(0.25 * (a.start + a.end + b.start + b.end) - boundary_sec)
+		a_cut, b_cut = min(l_pairs, key=_dist)
+		self.tokens = self.tokens[:(i_tail + a_cut)] + l_new[b_cut:]
+
+	def windows(self, word_count: int) -> list[StreamWindow]:
+		"""Distinct runs of word_count tokens over the primary stream and every chunk's reading."""
+		return self._index(word_count)[0]
+
+	def _index(self, word_count: int):
+		if word_count not in self._windows:
+			d_windows, l_occ = {}, []
+			for ireading, l_toks in enumerate([self.tokens] + self.chunk_tokens):
+				enc = EncodedTokens(l_toks)
+				for idx in range(len(l_toks) - word_count + 1):
+					run = enc.run(idx, word_count)
+					if run not in d_windows:
+						d_windows[run] = len(d_windows), StreamWindow(run, l_toks[idx], ireading > 0)
+					l_occ.append((l_toks[idx].start, l_toks[idx + word_count - 1].end, d_windows[run][0]))
+			l_occ.sort()
+			self._windows[word_count] = ([w for _, w in d_windows.values()], l_occ, [o[0] for o in l_occ])
+		return self._windows[word_count]
+
+	def digest_windows(self, word_count: int) -> dict[bytes, list[int]]:
+		"""transcript_digest -> ids of the windows of word_count tokens with that digest."""
+		if word_count not in self._digests:
+			d = {}
+			for iwin, window in enumerate(self.windows(word_count)):
+				d.setdefault(transcript_digest(window.run), []).append(iwin)
+			self._digests[word_count] = d
+		return self._digests[word_count]
+
+	def candidate_windows(self, word_count: int, time_bounds: tuple[float, float] | None = None) -> list[StreamWindow]:
+		"""Windows to try for a payload signing word_count tokens: each distinct window once,
+		only those heard within time_bounds (seconds) if given. Primary windows come first."""
+		l_windows = self.windows(word_count)
+		return [l_windows[iwin] for iwin in self._candidate_ids(word_count, time_bounds)]
+
+	def _candidate_ids(self, word_count: int, time_bounds: tuple[float, float] | None) -> list[int]:
+		l_windows, l_occ, l_occ_starts = self._index(word_count)
+		if time_bounds is None:
+			return range(len(l_windows))
+		lo, hi = time_bounds
+		return sorted({iwin for s, e, iwin in l_occ[bisect_left(l_occ_starts, lo):bisect_right(l_occ_starts, hi)] if e <= hi})
+
+	def match_window(self, payload, payload_kwargs, frame_sec: float | None = None) -> int:
+		"""Index in windows(word_count) of the window matching a payload, or -1 (localized to
+		frame_sec with payload_kwargs["localize"])."""
+		bounds = None
+		if payload_kwargs.get("localize") and frame_sec is not None:
+			bounds = signed_speech_bounds(frame_sec, payload_kwargs["signer_window_sec"], payload_kwargs["localize_slack_sec"])
+		l_windows = self.windows(payload.header.word_count)
+		l_ids = self._candidate_ids(payload.header.word_count, bounds)
+		if getattr(payload.header, "version", 1) == 2: # pairings only on windows with the header's digest
+			l_hits = self.digest_windows(payload.header.word_count).get(payload.header.digest, [])
+			l_ids = l_hits if bounds is None else sorted(set(l_hits).intersection(l_ids))
+		i = payload.match_runs((l_windows[iwin].run for iwin in l_ids), **payload_kwargs)
+		return l_ids[i] if i >= 0 else -1
+
+	def match(self, payload, payload_kwargs, frame_sec: float | None = None) -> StreamMatch | None:
+		return self.to_match(payload, self.match_window(payload, payload_kwargs, frame_sec))
+
+	def to_match(self, payload, iwin: int) -> StreamMatch | None:
+		"""The StreamMatch for match_window's result."""
+		if iwin < 0:
+			return None
+		window = self.windows(payload.header.word_count)[iwin]
+		return StreamMatch(window.first, window.alternate, window.run)
+
+def match_payloads(stream: TokenStream, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz: float) -> dict[int, StreamMatch]:
+	"""The global match table: payload index -> where it matched."""
+	d_matches = {}
+	for ipl, pl in enumerate(l_payloads):
+		m = stream.match(pl, payload_kwargs, l_payload_start_sam[ipl] / wav_fs_Hz)
+		if m is not None:
+			d_matches[ipl] = m
+	return d_matches
+
+def render_markdown(stream: TokenStream, l_chunks, d_matches: dict[int, StreamMatch], l_payloads, l_payload_start_sam, wav_fs_Hz: float) -> str:
+	"""Deduplicated transcript: one section per run of primary tokens from the same chunk,
+	quoted from that chunk's text, with a footnote marker where each payload's window starts
+	(for alternate readings, at the primary token heard at the same time)."""
+	l_sections = [] # [ichunk, i_first, i_last] over primary tokens
+	for i, t in enumerate(stream.tokens):
+		if l_sections and l_sections[-1][0] == t.chunk:
+			l_sections[-1][2] = i
+		else:
+			l_sections.append([t.chunk, i, i])
+	d_primary = {id(t): i for i, t in enumerate(stream.tokens)}
+	l_starts = [t.start for t in stream.tokens]
+	d_marks = {} # primary token index -> payload indices
+	for ipl, m in d_matches.items():
+		itok = d_primary.get(id(m.token))
+		if itok is None:
+			itok = min(bisect_left(l_starts, m.token.start), len(stream.tokens) - 1)
+		d_marks.setdefault(itok, []).append(ipl)
+	l_md = []
+	for ichunk, i_first, i_last in l_sections:
+		text = l_chunks[ichunk].text
+		last = stream.tokens[i_first].idx
+		l_body, l_notes = [], []
+		for itok in range(i_first, i_last + 1):
+			for ipl in d_marks.get(itok, []):
+				pos = stream.tokens[itok].idx
+				l_body.append(text[last:pos] + f"[{ipl + 1}]")
+				last = pos
+				note = l_payloads[ipl].make_footnote(ipl + 1, l_payload_start_sam[ipl], wav_fs_Hz)
+				l_notes.append(note + (" (Matched another chunk's reading of this passage.)" if d_matches[ipl].alternate else ""))
+		l_body.append(text[last:_RE_WORD.match(text, stream.tokens[i_last].idx).end()])
+		section = f"## {stream.tokens[i_first].start:.2f}-{stream.tokens[i_last].end:.2f} s\n" + "".join(l_body) + "\n\n"
+		if l_notes:
+			section += "\n".join(l_notes) + "\n\n"
+		l_md.append(section)
+	return "".join(l_md)
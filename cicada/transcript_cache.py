@@ -0,0 +1,58 @@
+"""On-disk cache of verify transcriptions.
+Entries are keyed by a hash of the ingested audio (see ingest.py) together with every
+setting that changes the transcript (model size, compute type, window layout,
+decoding mode), so repeat verifications of a recording skip Whisper entirely.
+Least recently used entries are evicted once the cache exceeds its size budget.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+CACHE_FORMAT_VERSION = 3
+
+class TranscriptCache:
+	def __init__(self, cache_dir: Path, max_bytes: int = 512 << 20):
+		self.dir = Path(cache_dir)
+		self.dir.mkdir(parents=True, exist_ok=True)
+		self.max_bytes = max_bytes
+
+	@staticmethod
+	def make_key(audio_digest: str, **settings) -> str:
+		"""Key for an audio digest plus transcription settings (order-independent)."""
+		blob = json.dumps({"v": CACHE_FORMAT_VERSION, "audio": audio_digest, **settings}, sort_keys=True)
+		return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+	def _path(self, key: str) -> Path:
+		return self.dir / f"{key}.json"
+
+	def get(self, key: str) -> dict | None:
+		path = self._path(key)
+		try:
+			entry = json.loads(path.read_text(encoding="utf-8"))
+		except (FileNotFoundError, json.JSONDecodeError):
+			return None
+		os.utime(path) # mark as recently used
+		return entry
+
+	def put(self, key: str, entry: dict):
+		path = self._path(key)
+		tmp = path.with_suffix(".tmp")
+		tmp.write_text(json.dumps(entry), encoding="utf-8")
+		os.replace(tmp, path)
+		self.evict()
+
+	def evict(self):
+		"""Delete least recently used entries until the cache fits in max_bytes."""
+		l_entries = []
+		for p in self.dir.glob("*.json"):
+			try:
+				st = p.stat()
+			except FileNotFoundError:
+				continue
+			l_entries.append((st.st_mtime, st.st_size, p))
+		total = sum(size for _, size, _ in l_entries)
+		for _, size, p in sorted(l_entries):
+			if total <= self.max_bytes: break
+			p.unlink(missing_ok=True)
+			total -= size
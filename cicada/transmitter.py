@@ -0,0 +1,160 @@
+"""Continuous transmit stream.
+Keeps a single output stream open and feeds it from a one-slot frame queue:
+a newer payload replaces any payload that has not started playing yet, and the
+next transmission is rendered on a worker thread while the current one plays.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+import numpy as np
+
+from . import audio_io
+from .modem import Modem
+
+@dataclass
+class _Transmission:
+	samples: np.ndarray
+	t_submit: float # time.monotonic() when the payload was submitted
+	t_ready: float = 0.0 # time.monotonic() when rendering finished
+	render_sec: float = 0.0 # Time spent modulating
+
+@dataclass
+class TxEvent:
+	latency_sec: float # Submission (transcript) to first sample on air
+	jitter_sec: float # Actual start minus earliest possible start (ready time or end of previous transmission)
+	n_dropped: int # Stale payloads replaced before this one went on air
+	render_sec: float = 0.0 # Time spent modulating the payload
+	playback_sec: float = 0.0 # Rendered to first sample on air (waiting for the stream plus output latency)
+
+class StreamTransmitter:
+	"""Modulate payloads into one long-lived output stream without blocking the caller.
+	`render` turns payload bytes into samples, e.g. `modem.modulate_bytes` or
+	`lambda b: transport.modulate_message(b)[0]`. `device` is a sounddevice id/name or
+	a virtual output from audio_io.
+	"""
+	def __init__(self, modem: Modem, render=None, blocksize: int = 1024, device=None):
+		self.fs_Hz = modem.wf.fs_Hz
+		self.render = render or modem.modulate_bytes
+		self.blocksize = blocksize
+		self.device = device
+		self.n_dropped = 0
+		self.n_xruns = 0
+		self.events: deque[TxEvent] = deque(maxlen=1024)
+		self._cv = threading.Condition()
+		self._pending: tuple[bytes, float] | None = None # submitted, not yet rendered
+		self._ready: _Transmission | None = None # rendered, not yet on air
+		self._cur: _Transmission | None = None # on air
+		self._cur_pos = 0
+		self._prev_end = None # monotonic time the previous transmission's last sample was handed to the stream
+		self._n_dropped_since_tx = 0
+		self._stop = threading.Event()
+		self._stream = None
+		self._t_render = None
+		self._rendering = False
+
+	def start(self):
+		self._stream = audio_io.open_output(self.device, self.fs_Hz, self.blocksize, self._callback)
+		self._t_render = threading.Thread(target=self._render_worker, daemon=True)
+		self._t_render.start()
+		self._stream.start()
+		return self
+
+	def stop(self):
+		self._stop.set()
+		with self._cv:
+			self._cv.notify_all()
+		if self._stream is not None:
+			self._stream.stop()
+			self._stream.close()
+
+	def __enter__(self): return self.start()
+	def __exit__(self, *exc): self.stop()
+
+	def submit(self, pl_bytes: bytes, t_submit: float | None = None):
+		"""Queue a payload for transmission; replaces any payload still waiting."""
+		t_submit = time.monotonic() if t_submit is None else t_submit
+		with self._cv:
+			if self._pending is not None:
+				self._drop()
+			self._pending = (pl_bytes, t_submit)
+			self._cv.notify_all()
+
+	@property
+	def busy(self) -> bool:
+		return self._cur is not None or self._ready is not None or self._pending is not None or self._rendering
+
+	def wait_rendered(self, timeout: float = 60.0) -> bool:
+		"""Wait until everything submitted has been modulated (or dropped). Returns False on timeout."""
+		with self._cv:
+			return self._cv.wait_for(lambda: self._pending is None and not self._rendering, timeout)
+
+	def flush(self, timeout: float = 60.0) -> bool:
+		"""Wait until everything submitted has been played (or dropped). Returns False on timeout."""
+		t_end = time.monotonic() + timeout
+		while self.busy:
+			if time.monotonic() > t_end: return False
+			time.sleep(0.02)
+		return True
+
+	def _drop(self):
+		self.n_dropped += 1
+		self._n_dropped_since_tx += 1
+
+	def _render_worker(self):
+		while not self._stop.is_set():
+			with self._cv:
+				while self._pending is None and not self._stop.is_set():
+					self._cv.wait()
+				if self._stop.is_set(): return
+				pl_bytes, t_submit = self._pending
+				self._pending = None
+				self._rendering = True
+			t0 = time.monotonic()
+			samples = np.ascontiguousarray(self.render(pl_bytes), dtype=np.float32)
+			t_ready = time.monotonic()
+			with self._cv:
+				self._rendering = False
+				self._cv.notify_all()
+				if self._pending is not None: # a newer payload arrived while rendering
+					self._drop()
+					continue
+				if self._ready is not None:
+					self._drop()
+				self._ready = _Transmission(samples, t_submit, t_ready, t_ready - t0)
+
+	def _callback(self, outdata, frames, time_info, status):
+		if status: self.n_xruns += 1
+		out = outdata[:, 0]
+		now = time.monotonic()
+		dac_delay = max(0.0, time_info.outputBufferDacTime - time_info.currentTime)
+		n = 0
+		while n < frames:
+			if self._cur is None:
+				with self._cv:
+					self._cur, self._ready = self._ready, None
+					n_dropped, self._n_dropped_since_tx = self._n_dropped_since_tx, 0
+				if self._cur is None:
+					out[n:] = 0.0
+					return
+				self._cur_pos = 0
+				t_write = now + n / self.fs_Hz
+				t_earliest = max(self._cur.t_ready, self._prev_end) if self._prev_end is not None else self._cur.t_ready
+				t_air = t_write + dac_delay
+				self.events.append(TxEvent(t_air - self._cur.t_submit, max(0.0, t_write - t_earliest), n_dropped, self._cur.render_sec, t_air - self._cur.t_ready))
+			take = min(frames - n, len(self._cur.samples) - self._cur_pos)
+			out[n:(n + take)] = self._cur.samples[self._cur_pos:(self._cur_pos + take)]
+			n += take
+			self._cur_pos += take
+			if self._cur_pos >= len(self._cur.samples):
+				self._cur = None
+				self._prev_end = now + n / self.fs_Hz
+
+	def drain_events(self) -> list[TxEvent]:
+		"""Pop transmission events logged by the audio callback (printed outside of it)."""
+		l_ev = []
+		while self.events:
+			l_ev.append(self.events.popleft())
+		for ev in l_ev:
+			print(f"[tx] on air {ev.latency_sec*1e3:.0f} ms after transcript; jitter {ev.jitter_sec*1e3:.1f} ms; {ev.n_dropped} stale payloads dropped")
+		return l_ev
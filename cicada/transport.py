@@ -0,0 +1,218 @@
+"""Transport layer: carry byte messages longer than one modem frame.
+Messages are split into fragments, each prefixed with a small header
+(message id, sequence number, fragment count, length, CRC-16) and sent
+as back-to-back frames. On receive, fragments are reassembled in any order
+and incomplete messages are given up on after a bounded amount of audio.
+"""
+
+import binascii
+import os
+import struct
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+import numpy as np
+
+from .modem import Modem
+
+FRAGMENT_HEADER_FMT = ">HBBBH" # msg_id, seq, n_frags, n_bytes, crc16
+FRAGMENT_HEADER_LEN = struct.calcsize(FRAGMENT_HEADER_FMT)
+
+@dataclass
+class Fragment:
+	msg_id: int
+	seq: int
+	n_frags: int
+	data: bytes
+
+	def to_bytes(self, bytes_per_frame: int) -> bytes:
+		crc = binascii.crc_hqx(self._crc_input(), 0xFFFF)
+		hdr = struct.pack(FRAGMENT_HEADER_FMT, self.msg_id, self.seq, self.n_frags, len(self.data), crc)
+		return (hdr + self.data).ljust(bytes_per_frame, b"\x00")
+
+	@classmethod
+	def from_bytes(cls, frame_bytes: bytes) -> "Fragment | None":
+		"""Parse a frame; returns None if the header is inconsistent or the CRC fails."""
+		if len(frame_bytes) < FRAGMENT_HEADER_LEN:
+			return None
+		msg_id, seq, n_frags, n_bytes, crc = struct.unpack(FRAGMENT_HEADER_FMT, frame_bytes[:FRAGMENT_HEADER_LEN])
+		if n_frags == 0 or seq >= n_frags or FRAGMENT_HEADER_LEN + n_bytes > len(frame_bytes):
+			return None
+		frag = cls(msg_id, seq, n_frags, bytes(frame_bytes[FRAGMENT_HEADER_LEN:(FRAGMENT_HEADER_LEN + n_bytes)]))
+		if binascii.crc_hqx(frag._crc_input(), 0xFFFF) != crc:
+			return None
+		return frag
+
+	def _crc_input(self) -> bytes:
+		return struct.pack(">HBBB", self.msg_id, self.seq, self.n_frags, len(self.data)) + self.data
+
+@dataclass
+class TransportMessage:
+	msg_id: int
+	data: bytes
+	start_sam: int # Start sample of the earliest received fragment
+	end_sam: int # End sample of the latest received fragment
+	n_frags: int
+
+@dataclass
+class TransportStats:
+	frames_sent: int = 0
+	frames_received: int = 0
+	frames_rejected: int = 0 # CRC or header failures
+	messages_delivered: int = 0
+	messages_dropped: int = 0 # Incomplete messages that were given up on or replaced by a newer message with their id
+	bytes_delivered: int = 0
+	first_sam: int | None = None
+	last_sam: int | None = None
+	fs_Hz: float = 44100.0
+
+	@property
+	def airtime_sec(self) -> float:
+		if self.first_sam is None or self.last_sam is None:
+			return 0.0
+		return (self.last_sam - self.first_sam) / self.fs_Hz
+
+	@property
+	def goodput_Bps(self) -> float:
+		"""Delivered message bytes per second of received audio."""
+		t = self.airtime_sec
+		return self.bytes_delivered / t if t > 0 else 0.0
+
+	def summary(self) -> str:
+		return (
+			f"{self.messages_delivered} messages ({self.bytes_delivered} B) from {self.frames_received} frames "
+			f"({self.frames_rejected} rejected, {self.messages_dropped} messages incomplete) "
+			f"over {self.airtime_sec:.2f} s; goodput {self.goodput_Bps:.1f} B/s"
+		)
+
+@dataclass
+class _PendingMessage:
+	n_frags: int
+	fragments: dict = field(default_factory=dict) # seq -> bytes
+	start_sam: int = 0
+	end_sam: int = 0
+
+class Reassembler:
+	"""Streaming fragment reassembly, tolerant to loss, duplication and reordering.
+	Fragments are pushed with the sample index their frame started at. A message
+	is dropped once `max_age_frames` frames of audio have passed since its latest
+	fragment, when more than `max_pending` messages are incomplete, or when a fragment
+	with its id but a different fragment count arrives (a newer message reusing the id,
+	e.g. from a restarted sender), which replaces it.
+	"""
+	def __init__(self, samples_per_frame: int, fs_Hz: float = 44100.0, max_age_frames: int = 8, max_pending: int = 16):
+		self.samples_per_frame = samples_per_frame
+		self.max_age_sam = max_age_frames * samples_per_frame
+		self.max_pending = max_pending
+		self.stats = TransportStats(fs_Hz=fs_Hz)
+		self._pending: dict[int, _PendingMessage] = {}
+		self._recent_ids = deque(maxlen=64) # ids already delivered, to ignore late duplicates
+
+	def push(self, frame_bytes: bytes, start_sam: int) -> list[TransportMessage]:
+		st = self.stats
+		st.frames_received += 1
+		end_sam = start_sam + self.samples_per_frame
+		st.first_sam = start_sam if st.first_sam is None else min(st.first_sam, start_sam)
+		st.last_sam = end_sam if st.last_sam is None else max(st.last_sam, end_sam)
+		self._expire(start_sam)
+		l_done = []
+
+		frag = Fragment.from_bytes(frame_bytes)
+		if frag is None:
+			st.frames_rejected += 1
+			return l_done
+		if frag.msg_id in self._recent_ids:
+			return l_done
+		pm = self._pending.get(frag.msg_id)
+		if pm is not None and pm.n_frags != frag.n_frags:
+			st.messages_dropped += 1
+			pm = None
+		if pm is None:
+			pm = _PendingMessage(n_frags=frag.n_frags, start_sam=start_sam, end_sam=end_sam)
+			self._pending[frag.msg_id] = pm
+		pm.fragments.setdefault(frag.seq, frag.data)
+		pm.start_sam = min(pm.start_sam, start_sam)
+		pm.end_sam = max(pm.end_sam, end_sam)
+
+		if len(pm.fragments) == pm.n_frags:
+			del self._pending[frag.msg_id]
+			self._recent_ids.append(frag.msg_id)
+			data = b"".join(pm.fragments[i] for i in range(pm.n_frags))
+			st.messages_delivered += 1
+			st.bytes_delivered += len(data)
+			l_done.append(TransportMessage(frag.msg_id, data, pm.start_sam, pm.end_sam, pm.n_frags))
+		elif len(self._pending) > self.max_pending:
+			oldest = min(self._pending, key=lambda k: self._pending[k].end_sam)
+			del self._pending[oldest]
+			st.messages_dropped += 1
+		return l_done
+
+	def flush(self) -> int:
+		"""Give up on all incomplete messages; returns how many were dropped."""
+		n = len(self._pending)
+		self._pending.clear()
+		self.stats.messages_dropped += n
+		return n
+
+	def _expire(self, now_sam: int):
+		for msg_id in [k for k, pm in self._pending.items() if now_sam - pm.end_sam > self.max_age_sam]:
+			del self._pending[msg_id]
+			self.stats.messages_dropped += 1
+
+class Transport:
+	"""Fragmenting sender and reassembling receiver on top of a Modem."""
+	def __init__(self, modem: Modem, max_age_frames: int = 8, max_pending: int = 16):
+		self.modem = modem
+		self.bytes_per_frame = modem.bytes_per_frame
+		self.bytes_per_fragment = modem.bytes_per_frame - FRAGMENT_HEADER_LEN
+		if self.bytes_per_fragment <= 0:
+			raise ValueError(f"Frames of {modem.bytes_per_frame} bytes are too small for the {FRAGMENT_HEADER_LEN}-byte fragment header.")
+		self.max_message_bytes = 255 * self.bytes_per_fragment
+		self.max_age_frames = max_age_frames
+		self.max_pending = max_pending
+		self.stats = TransportStats(fs_Hz=modem.wf.fs_Hz)
+		self._next_msg_id = int.from_bytes(os.urandom(2), "big") # random start so restarted senders don't collide with recent ids
+
+	def fragment(self, data: bytes, msg_id: int | None = None) -> list[bytes]:
+		"""Split `data` into frame-sized byte strings."""
+		if len(data) > self.max_message_bytes:
+			raise ValueError(f"Message of {len(data)} bytes exceeds transport limit of {self.max_message_bytes} bytes.")
+		if msg_id is None:
+			msg_id = self._next_msg_id
+			self._next_msg_id = (self._next_msg_id + 1) & 0xFFFF
+		n = self.bytes_per_fragment
+		l_chunks = [data[i:(i + n)] for i in range(0, len(data), n)] or [b""]
+		return [Fragment(msg_id, seq, len(l_chunks), chunk).to_bytes(self.bytes_per_frame) for seq, chunk in enumerate(l_chunks)]
+
+	def iter_frame_samples(self, data: bytes, msg_id: int | None = None) -> Iterator[np.ndarray]:
+		"""Yield modulated frames one at a time so a player can render the next frame while one plays."""
+		for fb in self.fragment(data, msg_id=msg_id):
+			self.stats.frames_sent += 1
+			yield self.modem.modulate_bytes(fb)
+
+	def modulate_message(self, data: bytes, msg_id: int | None = None) -> tuple[np.ndarray, list[int]]:
+		"""Modulate a whole message as back-to-back frames with no gaps.
+		Returns the samples and the start sample of each frame."""
+		l_frames = self.fragment(data, msg_id=msg_id)
+		spf = self.modem.samples_per_frame
+		out = np.empty(len(l_frames) * spf, dtype=np.float32)
+		for i, fb in enumerate(l_frames):
+			out[(i * spf):((i + 1) * spf)] = self.modem.modulate_bytes(fb)
+		self.stats.frames_sent += len(l_frames)
+		return out, [i * spf for i in range(len(l_frames))]
+
+	def new_reassembler(self) -> Reassembler:
+		return Reassembler(self.modem.samples_per_frame, fs_Hz=self.modem.wf.fs_Hz, max_age_frames=self.max_age_frames, max_pending=self.max_pending)
+
+	def reassemble(self, l_frame_bytes: list[bytes], l_start_idx: list[int]) -> tuple[list[TransportMessage], TransportStats]:
+		"""Reassemble already-demodulated frames (in recording order) into messages."""
+		ra = self.new_reassembler()
+		l_msgs = []
+		for fb, start in sorted(zip(l_frame_bytes, l_start_idx), key=lambda t: t[1]):
+			l_msgs.extend(ra.push(fb, start))
+		ra.flush()
+		return l_msgs, ra.stats
+
+	def recover_messages(self, v_samples: np.ndarray) -> tuple[list[TransportMessage], TransportStats]:
+		l_frame_bytes, l_start_idx = self.modem.recover_bytes(v_samples)
+		return self.reassemble(l_frame_bytes, l_start_idx)
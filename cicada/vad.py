@@ -0,0 +1,122 @@
+"""Lightweight streaming voice-activity detection for the signer.
+Frame energies are compared against a tracked noise floor; frames well above
+the floor are speech. Used to skip Whisper on silent windows (where it tends to
+hallucinate text we would then sign) and to cut decode input down to speech.
+"""
+from collections import deque
+from dataclasses import dataclass
+import numpy as np
+
+@dataclass
+class VADParameters:
+	fs_Hz: float = 16000.0
+	frame_sec: float = 0.03
+	threshold_db: float = 9.0 # Speech if frame energy exceeds the noise floor by this much
+	min_level_db: float = -60.0 # Frames quieter than this (dBFS) are never speech
+	floor_rise_db_per_sec: float = 2.0 # How fast the noise floor may climb after dropping
+	pad_sec: float = 0.2 # Keep this much audio either side of detected speech
+	min_speech_sec: float = 0.15 # Drop speech bursts shorter than this (clicks, taps)
+	history_sec: float = 60.0
+
+@dataclass
+class VADStats:
+	n_in: int = 0 # Samples seen by the VAD
+	n_speech: int = 0 # Of those, samples in (padded) speech
+	windows: int = 0
+	windows_skipped: int = 0
+
+	@property
+	def skipped_ratio(self) -> float:
+		"""Fraction of incoming audio classified as non-speech."""
+		return 1.0 - self.n_speech / self.n_in if self.n_in else 0.0
+
+	def summary(self) -> str:
+		return f"skipped {self.windows_skipped}/{self.windows} windows; {100*self.skipped_ratio:.0f}% of audio was non-speech"
+
+class StreamingVAD:
+	def __init__(self, cfg: VADParameters = VADParameters()):
+		self.cfg = cfg
+		self.frame_sam = max(1, int(round(cfg.frame_sec * cfg.fs_Hz)))
+		self._rise_db = cfg.floor_rise_db_per_sec * self.frame_sam / cfg.fs_Hz
+		self._floor_db = None
+		self._rem = np.zeros(0, dtype=np.float32) # Samples not yet forming a full frame
+		self._n_frames = 0 # Absolute index of the next frame
+		self._flags: deque[bool] = deque(maxlen=int(cfg.history_sec * cfg.fs_Hz / self.frame_sam))
+
+	def update(self, samples: np.ndarray):
+		"""Classify newly captured samples frame by frame."""
+		x = np.concatenate([self._rem, np.asarray(samples, dtype=np.float32).ravel()])
+		n_full = len(x) // self.frame_sam
+		self._rem = x[(n_full * self.frame_sam):]
+		if not n_full: return
+		frames = x[:(n_full * self.frame_sam)].reshape(n_full, self.frame_sam)
+		frames = frames - frames.mean(axis=1, keepdims=True)
+		e_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+		for e in e_db:
+			self._floor_db = e if self._floor_db is None else min(self._floor_db + self._rise_db, e)
+			self._flags.append(bool(e > self._floor_db + self.cfg.threshold_db and e > self.cfg.min_level_db))
+		self._n_frames += n_full
+
+	def skip(self, n_samples: int):
+		"""Account for samples that were never seen (e.g. dropped windows) as non-speech."""
+		n = len(self._rem) + n_samples
+		n_frames = n // self.frame_sam
+		self._rem = np.zeros(n % self.frame_sam, dtype=np.float32) # keeps later frames on the absolute grid
+		self._flags.extend([False] * min(n_frames, self._flags.maxlen))
+		self._n_frames += n_frames
+
+	def speech_regions(self, start_sam: int, end_sam: int) -> list[tuple[int, int]]:
+		"""Padded speech regions within [start_sam, end_sam), as absolute sample ranges."""
+		fs = self.cfg.fs_Hz
+		f0 = max(start_sam // self.frame_sam, self._n_frames - len(self._flags))
+		f1 = min(-(-end_sam // self.frame_sam), self._n_frames)
+		if f1 <= f0: return []
+		flags = np.fromiter((self._flags[f - (self._n_frames - len(self._flags))] for f in range(f0, f1)), dtype=bool, count=f1 - f0)
+		min_frames = int(round(self.cfg.min_speech_sec * fs / self.frame_sam))
+		pad = int(round(self.cfg.pad_sec * fs))
+		l_regions = []
+		edges = np.flatnonzero(np.diff(np.concatenate([[0], flags.astype(np.int8), [0]])))
+		for a, b in zip(edges[::2], edges[1::2]):
+			if b - a < min_frames: continue
+			r0 = max(start_sam, int(f0 + a) * self.frame_sam - pad)
+			r1 = min(end_sam, int(f0 + b) * self.frame_sam + pad)
+			if l_regions and r0 <= l_regions[-1][1]:
+				l_regions[-1] = (l_regions[-1][0], r1)
+			else:
+				l_regions.append((r0, r1))
+		return l_regions
+
+class VADGatedTranscriber:
+	"""Wrap a signer transcriber (see speech.py) so silent windows skip Whisper.
+	For full-window transcribers the decode input is also cut down to the speech
+	regions; timeline-based transcribers get the uncut window, since their word
+	timestamps must line up with the stream."""
+	def __init__(self, inner, vad: StreamingVAD | None = None, debug: bool = False):
+		self.inner = inner
+		self.vad = vad or StreamingVAD()
+		self.stats = VADStats()
+		self.debug = debug
+		self._last_end = 0
+
+	def transcribe_window(self, window_audio: np.ndarray, end_sam: int) -> str:
+		n_new = min(len(window_audio), end_sam - self._last_end)
+		if end_sam - self._last_end > n_new:
+			self.vad.skip(end_sam - self._last_end - n_new)
+		self._last_end = end_sam
+		if n_new > 0:
+			self.vad.update(window_audio[-n_new:])
+			l_new = self.vad.speech_regions(end_sam - n_new, end_sam)
+			self.stats.n_in += n_new
+			self.stats.n_speech += sum(b - a for a, b in l_new)
+		start_sam = end_sam - len(window_audio)
+		l_regions = self.vad.speech_regions(start_sam, end_sam)
+		self.stats.windows += 1
+		if not l_regions:
+			self.stats.windows_skipped += 1
+			self.inner.reset(end_sam)
+			if self.debug: print(f"[vad] no speech in window; {self.stats.summary()}")
+			return ""
+		if getattr(self.inner, "timeline", False):
+			return self.inner.transcribe_window(window_audio, end_sam)
+		speech_audio = np.concatenate([window_audio[(a - start_sam):(b - start_sam)] for a, b in l_regions])
+		return self.inner.transcribe_window(speech_audio, end_sam)
@@ -1,15 +1,24 @@
 """Utilities for comparing transcription wav or text to Payloads."""
 import argparse, shlex, sys, numpy as np, re
+from bisect import bisect_left
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from cicada import speech
-from cicada.speech import WhisperTranscriptionChunk
+from cicada.speech import WhisperTranscriptionChunk, TimedWord
 from cicada import interface
+from cicada.ingest import IngestedAudio, ingest
+from cicada.transcript_cache import TranscriptCache
+from cicada.payload.signature import CheckCounts, count_checks, get_verifier
+from cicada.keyring import Keyring, normalize_header_message
+from cicada.token_stream import TokenStream, render_markdown
+from cicada import match_pool
+from cicada.offline_asr import OfflineASRParameters, OfflineTranscriber
 
 def wav_to_transcript_chunks(in_wav, model, window_sec = 12.0, overlap_sec = 8.0): 
 	''' Transcribe a .wav (filename) to chunks of text '''
-	samples, wav_fs_Hz = speech.load_wav(in_wav)
-	n_window_sam = int(window_sec * wav_fs_Hz)
-	n_overlap_sam = int(overlap_sec * wav_fs_Hz)
+	samples, wav_fs_Hz = speech.load_wav(in_wav) # samples are at the model rate
+	n_window_sam = int(window_sec * speech.whisper_model_fs_Hz)
+	n_overlap_sam = int(overlap_sec * speech.whisper_model_fs_Hz)
 	n_shift_sam = n_window_sam - n_overlap_sam
 	n_total_sam = len(samples)
 	win_start_idx = 0
@@ -26,16 +35,118 @@ def wav_to_transcript_chunks(in_wav, model, window_sec = 12.0, overlap_sec = 8.0
 			beam_size=1,
 			vad_filter=False,
 		)
-		l_chunks.append(WhisperTranscriptionChunk(seg_iter=seg_iter, info=info, idx=win_start_idx))
+		l_chunks.append(WhisperTranscriptionChunk(seg_iter=seg_iter, info=info, idx=int(win_start_idx * wav_fs_Hz / speech.whisper_model_fs_Hz)))
 		win_start_idx += n_shift_sam
 	return l_chunks, wav_fs_Hz
 
-def write_appendix_md(l_payloads, l_payload_start_sam=None, wav_fs_Hz: float = 44100.0) -> str:
+@dataclass
+class TimelineChunk:
+	text: str
+	start_sec: float
+	end_sec: float
+	words: list[TimedWord] = field(default_factory=list) # Timed words of `text`, when known
+
+	def shifted(self, offset_sec: float) -> "TimelineChunk":
+		return replace(self, start_sec=self.start_sec + offset_sec, end_sec=self.end_sec + offset_sec,
+			words=[TimedWord(w.text, w.start + offset_sec, w.end + offset_sec) for w in self.words])
+
+def segment_timed_words(segments) -> list[TimedWord]:
+	''' Spread each (start_sec, end_sec, text) segment's time over its words in proportion to their length. '''
+	l_words = []
+	for start, end, text in segments:
+		l_text = text.split()
+		n_chars = sum(len(w) for w in l_text)
+		t = start
+		for w in l_text:
+			dt = (end - start) * len(w) / n_chars
+			l_words.append(TimedWord(w, t, t + dt))
+			t += dt
+	return l_words
+
+def cut_timeline_chunks(l_words: list[TimedWord], duration_sec: float, window_sec = 12.0, overlap_sec = 8.0) -> list[TimelineChunk]:
+	''' Cut overlapping windows (same layout as wav_to_transcript_chunks) out of a word timeline.
+	A word belongs to a window if its midpoint does. '''
+	l_mid = [0.5 * (w.start + w.end) for w in l_words]
+	shift_sec = window_sec - overlap_sec
+	l_chunks = []
+	start_sec = 0.0
+	while start_sec < duration_sec:
+		end_sec = start_sec + window_sec
+		i0, i1 = bisect_left(l_mid, start_sec), bisect_left(l_mid, end_sec)
+		l_chunks.append(TimelineChunk(" ".join(w.text for w in l_words[i0:i1]), start_sec, min(end_sec, duration_sec), l_words[i0:i1]))
+		start_sec += shift_sec
+	return l_chunks
+
+def wav_to_timeline_chunks(in_wav, model, window_sec = 12.0, overlap_sec = 8.0):
+	''' Transcribe a .wav (filename) once with word timestamps, then cut it into chunks of text '''
+	samples, wav_fs_Hz = speech.load_wav(in_wav)
+	l_words = speech.transcribe_timeline(samples, model)
+	duration_sec = len(samples) / speech.whisper_model_fs_Hz
+	return cut_timeline_chunks(l_words, duration_sec, window_sec, overlap_sec), wav_fs_Hz
+
+def transcribe_for_verification(args: argparse.Namespace, audio: IngestedAudio | None = None) -> list[TimelineChunk]:
+	''' Transcribe args.input_wav (or its already ingested `audio`) into verify's overlapping chunks,
+	going through the transcript cache (args.transcript_cache) so the model is only loaded on a miss.
+	Chunk times are on the whole file's timeline. '''
+	if audio is None:
+		audio = ingest(args.input_wav, rates=(speech.whisper_model_fs_Hz,), start_sec=args.start, end_sec=args.end)
+	settings = {
+		"model_size": args.model_size,
+		"compute_type": args.compute_type,
+		"backend": args.asr_backend,
+		"window_sec": args.window_sec,
+		"overlap_sec": args.overlap_sec,
+		"single_pass": args.single_pass,
+		"engine": args.asr_engine,
+		"beam_size": 1,
+	}
+	cache = key = None
+	if args.transcript_cache is not None:
+		cache = TranscriptCache(interface.resolve_output_path(Path(args.out_dir), args.transcript_cache), max_bytes=int(args.transcript_cache_mb * (1 << 20)))
+		key = cache.make_key(audio.digest, **settings)
+		entry = cache.get(key)
+		if entry is not None:
+			print(f"[verification] Transcript cache hit for {args.input_wav}; skipping Whisper")
+			return [TimelineChunk(c[0], c[1], c[2], [TimedWord(*w) for w in c[3]]).shifted(audio.start_sec) for c in entry["chunks"]]
+
+	print("[verification] Loading Whisper model...")
+	asr = OfflineTranscriber(OfflineASRParameters(
+		model_size=args.model_size,
+		compute_type=args.compute_type,
+		backend=args.asr_backend,
+		engine=args.asr_engine,
+		batch_size=args.batch_size,
+		cpu_threads=args.cpu_threads,
+		num_workers=args.num_workers,
+	))
+	print(f"[verification] Transcribing {args.input_wav}{' in a single pass' if args.single_pass else ''}")
+	samples = audio.at(speech.whisper_model_fs_Hz)
+	entry = {"settings": settings}
+	if args.single_pass:
+		l_words = asr.transcribe_timeline(samples)
+		l_chunks = cut_timeline_chunks(l_words, len(samples) / speech.whisper_model_fs_Hz, args.window_sec, args.overlap_sec)
+		entry["words"] = [[w.text, w.start, w.end] for w in l_words]
+	else:
+		l_windows = asr.transcribe_windows(samples, args.window_sec, args.overlap_sec)
+		l_chunks = [TimelineChunk(w.text, w.start_sec, w.end_sec, segment_timed_words(w.segments)) for w in l_windows]
+		entry["segments"] = [w.segments for w in l_windows]
+	recording_sec = len(samples) / speech.whisper_model_fs_Hz
+	print(f"[verification] {asr.summary()}; {recording_sec / asr.wall_sec if asr.wall_sec else 0.0:.2f} recording-s per wall-s")
+	entry["chunks"] = [[c.text, c.start_sec, c.end_sec, [[w.text, w.start, w.end] for w in c.words]] for c in l_chunks] # relative to the ingested span
+	if cache is not None:
+		cache.put(key, entry)
+	return [c.shifted(audio.start_sec) for c in l_chunks]
+
+def write_appendix_md(l_payloads, l_payload_start_sam=None, wav_fs_Hz: float = 44100.0, l_rejected=()) -> str:
 	appendix_md = "# Appendix: All Detected Payloads\n"
 	lines = []
 	for idxpl, pl in enumerate(l_payloads):
 		lines.append(f"[{idxpl+1}]: {pl.describe(l_payload_start_sam[idxpl], wav_fs_Hz)}")
-	return appendix_md + "\n".join(lines) 
+	appendix_md += "\n".join(lines)
+	if l_rejected:
+		appendix_md += "\n\n# Appendix: Payloads Failing Timestamp Checks (not matched)\n"
+		appendix_md += "\n".join(f"- {pl.describe(start, wav_fs_Hz)} Problem: {issue}." for pl, start, issue in l_rejected)
+	return appendix_md
 
 def load_markdown_transcript(path: Path):
 	raw = path.read_text(encoding="utf-8")
@@ -48,7 +159,69 @@ def load_markdown_transcript(path: Path):
 	lines.append(line)
 	return "\n".join(lines)
 
-def run_verification(payload_cls, args: argparse.Namespace, frames_csv: Path, output_md: Path):
+def attribute_signers(l_payloads, d_signed_tokens, payload_kwargs):
+	"""Name each matched payload's signer from the keyring, where matching ran in a worker
+	process and could not record it (one check per candidate key)."""
+	keyring = payload_kwargs.get("bls_keyring")
+	if keyring is None:
+		return
+	for ipl, l_tokens in d_signed_tokens.items():
+		pl = l_payloads[ipl]
+		if pl.signer is not None:
+			continue
+		entry = keyring.identify(bytes(pl.bls_signature), pl.signed_message(l_tokens), pl.header.message)
+		pl.signer = entry.name if entry is not None else None
+
+def signer_groups(l_payloads, payload_kwargs) -> dict[bytes, list[int]]:
+	"""Payload indices grouped by the public key that signed them."""
+	keyring = payload_kwargs.get("bls_keyring")
+	d_groups = {}
+	for i, pl in enumerate(l_payloads):
+		if keyring is not None:
+			entry = keyring.by_name.get(pl.signer) or keyring.candidates(pl.header.message)[0]
+			pk = entry.pubkey_bytes
+		else:
+			pk = bytes(payload_kwargs["bls_pubkey_bytes"])
+		d_groups.setdefault(pk, []).append(i)
+	return d_groups
+
+def timestamp_issues(payload_cls, l_payloads, l_payload_start_sam, payload_kwargs) -> list[str]:
+	"""payload_cls.check_timestamps run once per signer, as each signer stamps its payloads with its
+	own clock. With a keyring, payloads go to the key their header message hints at, or else are
+	grouped by header message."""
+	keyring = payload_kwargs.get("bls_keyring")
+	d_groups = {}
+	for i, pl in enumerate(l_payloads):
+		key = None
+		if keyring is not None:
+			message = normalize_header_message(pl.header.message)
+			l_hinted = keyring.by_header.get(message)
+			key = ("key", keyring.candidates(message)[0].name) if l_hinted else ("header", message)
+		d_groups.setdefault(key, []).append(i)
+	l_issues = [""] * len(l_payloads)
+	for l_group in d_groups.values():
+		l_group_issues = payload_cls.check_timestamps([l_payloads[i] for i in l_group], [l_payload_start_sam[i] for i in l_group], payload_kwargs["wf_fs"], payload_kwargs["timestamp_tolerance_sec"])
+		for i, issue in zip(l_group, l_group_issues):
+			l_issues[i] = issue
+	return l_issues
+
+def write_matches(payload_cls, l_payloads, l_payload_start_sam, d_signed_tokens, matches_csv: Path, payload_kwargs):
+	"""Archive the matched payloads with the tokens they signed (see `recheck`), confirming them with one batch check."""
+	l_ipl = sorted(d_signed_tokens)
+	l_matched = [l_payloads[ipl] for ipl in l_ipl]
+	payload_cls.write_matches_csv(l_matched, [l_payload_start_sam[ipl] for ipl in l_ipl], [d_signed_tokens[ipl] for ipl in l_ipl], matches_csv)
+	l_bad = []
+	for pk, l_group in signer_groups(l_matched, payload_kwargs).items():
+		l_pairs = [(bytes(l_matched[i].bls_signature), l_matched[i].signed_message(d_signed_tokens[l_ipl[i]])) for i in l_group]
+		l_bad += [l_group[i] for i in get_verifier(pk).find_invalid(l_pairs)]
+	print(f"[verification] Wrote {len(l_ipl)} matches to {matches_csv}; batch re-check: {'all valid' if not l_bad else f'{len(l_bad)} invalid'}")
+
+def run_verification(payload_cls, args: argparse.Namespace, frames_csv: Path, output_md: Path, audio: IngestedAudio | None = None, command: list[str] | None = None):
+	''' `command` is the command line recorded in the annotated transcript (default sys.argv; jobs run by `serve` or `batch` pass their own). '''
+	with count_checks() as checks: # this run's checks only (verifiers are shared by the jobs of `serve`)
+		_run_verification(payload_cls, args, frames_csv, output_md, audio, checks, sys.argv if command is None else command)
+
+def _run_verification(payload_cls, args: argparse.Namespace, frames_csv: Path, output_md: Path, audio: IngestedAudio | None, checks: CheckCounts, command: list[str]):
 	print(f"[verification] Loading payloads from {frames_csv}")
 	l_payloads, l_payload_start_sam = payload_cls.load_csv(frames_csv)
 	l_payloads, l_payload_start_sam = payload_cls.filter_payloads(
@@ -61,45 +234,75 @@ def run_verification(payload_cls, args: argparse.Namespace, frames_csv: Path, ou
 		return
 
 	payload_kwargs = vars(args)
-	if payload_cls.requires_bls_keys and "bls_pubkey" in payload_kwargs:
+	if payload_cls.requires_bls_keys and getattr(args, "keyring", None) is not None:
+		payload_kwargs["bls_keyring"] = Keyring.load(args.keyring)
+		print(f"[verification] Keyring of {len(payload_kwargs['bls_keyring'])} keys from {args.keyring}")
+	elif payload_cls.requires_bls_keys and "bls_pubkey" in payload_kwargs:
 		payload_kwargs["bls_pubkey_bytes"] = interface.load_bls_pubkey(args.bls_pubkey)
 
+	l_rejected = []
+	if args.localize:
+		l_issues = timestamp_issues(payload_cls, l_payloads, l_payload_start_sam, payload_kwargs)
+		l_rejected = [(pl, start, issue) for pl, start, issue in zip(l_payloads, l_payload_start_sam, l_issues) if issue]
+		l_payloads = [pl for pl, issue in zip(l_payloads, l_issues) if not issue]
+		l_payload_start_sam = [start for start, issue in zip(l_payload_start_sam, l_issues) if not issue]
+		for _, start, issue in l_rejected:
+			print(f"[verification] Payload at {start / args.wf_fs:.2f} s fails timestamp checks: {issue}")
+
 	try:
-		cmd = shlex.join(sys.argv)
+		cmd = shlex.join(command)
 	except AttributeError:
-		cmd = " ".join(shlex.quote(a) for a in sys.argv)
+		cmd = " ".join(shlex.quote(a) for a in command)
 
 	annotated_md = "This file was generated with the following command:\n\n```\n" + cmd + "\n```\n\n"
+	d_signed_tokens = {} # payload index -> the regularized tokens it matched
 	if args.input_md:
 		transcript_text = load_markdown_transcript(args.input_md)
-		chunk_md = payload_cls.annotate_chunk(transcript_text, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz=44100.0)
+		match_kwargs = {}
+		if payload_cls.needs_transcript:
+			l_tokens = payload_cls.tokenize_text(transcript_text)
+			d = payload_cls.match_chunk(transcript_text, l_payloads, l_payload_start_sam, payload_kwargs, args.wf_fs, l_tokens=l_tokens)
+			match_kwargs = {"l_tokens": l_tokens, "d_matches": d}
+			d_signed_tokens = {ipl: [t.text for t in l_tokens[idx:(idx + l_payloads[ipl].header.word_count)]] for ipl, idx in d.items()}
+			attribute_signers(l_payloads, d_signed_tokens, payload_kwargs)
+		chunk_md = payload_cls.annotate_chunk(transcript_text, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz=args.wf_fs, **match_kwargs)
 		chunk_md = "# Transcript (markdown input)\n\n" + chunk_md
 		print(chunk_md, end="")
 		annotated_md += chunk_md
 	else:
-		from faster_whisper import WhisperModel
-
-		print("[verification] Loading Whisper model...")
-		model = WhisperModel(args.model_size, compute_type="float32")
-		print(f"[verification] Loaded {len(l_payloads)} payloads, transcribing {args.input_wav}")
-		l_chunks, wav_fs_Hz = wav_to_transcript_chunks(
-			args.input_wav,
-			model,
-			window_sec=args.window_sec,
-			overlap_sec=args.overlap_sec,
-		)
+		print(f"[verification] Loaded {len(l_payloads)} payloads")
+		l_chunks = transcribe_for_verification(args, audio)
 		annotated_md = f"# Transcript of {Path(args.input_wav).name}\n\n"
 		n_chunks = len(l_chunks)
-		for ichunk, chunk in enumerate(l_chunks, start=1):
-			segments = list(chunk.seg_iter)
-			chunk_text = "".join(seg.text for seg in segments).lstrip()
-			chunk_md = payload_cls.annotate_chunk(chunk_text, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz)
-			start_sec = chunk.idx / wav_fs_Hz
-			end_sec = start_sec + chunk.info.duration
-			chunk_md = f"## Chunk {ichunk} of {n_chunks}; ({start_sec:.2f}-{end_sec:.2f} s)\n" + chunk_md
+		if args.merge_chunks and payload_cls.needs_transcript:
+			stream = TokenStream.from_chunks(l_chunks, payload_cls.tokenize_text)
+			print(f"[verification] Merged {n_chunks} chunks into a stream of {len(stream.tokens)} tokens")
+			d_matches = match_pool.match_stream(stream, l_payloads, l_payload_start_sam, payload_kwargs, args.wf_fs, args.jobs)
+			print(f"[verification] Matched {len(d_matches)} of {len(l_payloads)} payloads")
+			d_signed_tokens = {ipl: m.run.decode("utf-8").split("\x00")[:-1] for ipl, m in d_matches.items()}
+			attribute_signers(l_payloads, d_signed_tokens, payload_kwargs)
+			chunk_md = render_markdown(stream, l_chunks, d_matches, l_payloads, l_payload_start_sam, args.wf_fs)
 			print(chunk_md, end="")
 			annotated_md += chunk_md
+		else:
+			l_match_kwargs = [{} for _ in l_chunks]
+			if payload_cls.needs_transcript:
+				l_chunk_tokens, l_d_matches = match_pool.match_chunks(payload_cls, l_chunks, l_payloads, l_payload_start_sam, payload_kwargs, args.wf_fs, args.jobs)
+				l_match_kwargs = [{"l_tokens": l_tokens, "d_matches": d} for l_tokens, d in zip(l_chunk_tokens, l_d_matches)]
+				for l_tokens, d in zip(l_chunk_tokens, l_d_matches):
+					for ipl, idx in d.items():
+						d_signed_tokens.setdefault(ipl, [t.text for t in l_tokens[idx:(idx + l_payloads[ipl].header.word_count)]])
+				attribute_signers(l_payloads, d_signed_tokens, payload_kwargs)
+			for ichunk, (chunk, match_kwargs) in enumerate(zip(l_chunks, l_match_kwargs), start=1):
+				chunk_md = payload_cls.annotate_chunk(chunk.text, l_payloads, l_payload_start_sam, payload_kwargs, args.wf_fs, chunk_words=chunk.words, **match_kwargs) # payload positions are at the modem rate
+				chunk_md = f"## Chunk {ichunk} of {n_chunks}; ({chunk.start_sec:.2f}-{chunk.end_sec:.2f} s)\n" + chunk_md
+				print(chunk_md, end="")
+				annotated_md += chunk_md
 
-	annotated_md += write_appendix_md(l_payloads, l_payload_start_sam, 44100.0)
+	if payload_cls.requires_bls_keys:
+		print(f"[verification] {checks.n_final_exps} signature checks")
+	if d_signed_tokens:
+		write_matches(payload_cls, l_payloads, l_payload_start_sam, d_signed_tokens, output_md.with_name(f"{Path(args.input).stem}_matches.csv"), payload_kwargs)
+	annotated_md += write_appendix_md(l_payloads, l_payload_start_sam, args.wf_fs, l_rejected)
 	output_md.write_text(annotated_md, encoding="utf-8")
 	print(f"[verification] Wrote {output_md}")
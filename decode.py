@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Decode payload frames from a soft-frame store written by extract (see cicada/soft_frames.py)."""
+import argparse
+from pathlib import Path
+
+import extract
+from cicada import interface
+from cicada.fsk.waveform import FSKWaveform
+from cicada.modem import Modem
+from cicada.soft_frames import SoftFrames
+
+def decode_soft_frames(args) -> Path:
+	out_dir = interface.ensure_output_dir(args.out_dir)
+	soft = SoftFrames.load(args.input_npz)
+	stem = Path(args.input_npz).stem.removesuffix("_soft")
+	output_csv = interface.resolve_output_path(out_dir, args.output_csv or f"{stem}_frames.csv")
+	print(f"[decode] loaded {len(soft)} soft frames from {args.input_npz} (recorded from {soft.settings.get('input')})")
+
+	wf = FSKWaveform(interface.build_waveform_parameters(argparse.Namespace(**soft.settings)))
+	modem = Modem(wf, discard_duplicate_frames=args.discard_duplicate_frames, use_ldpc=args.use_ldpc, use_bit_mask=False)
+	l_frames, l_frame_start_idx = modem.decode_results(soft.results())
+	print(f"[decode] recovered {len(l_frames)} frames")
+	return extract.write_payloads(args, modem, l_frames, l_frame_start_idx, output_csv, tag="decode")
+
+def main(argv: list[str] | None = None):
+	parser = interface.build_decode_parser()
+	args = parser.parse_args(argv)
+	if not args.input_npz.exists():
+		parser.error(f"{args.input_npz} does not exist.")
+	return decode_soft_frames(args)
+
+if __name__ == "__main__":
+	main()
@@ -2,18 +2,14 @@
 """Extract payload frames from a recording."""
 from pathlib import Path
 
-import numpy as np
-import soundfile as sf
-
 from cicada import payload, interface
+from cicada.ingest import IngestedAudio, ingest
+from cicada.modem import Modem
+from cicada.soft_frames import SoftFrames
+from cicada.transport import Transport
 
-def load_audio(path: Path) -> tuple[np.ndarray, int]:
-	samples, fs = sf.read(path, dtype="float32", always_2d=False)
-	if samples.ndim > 1:
-		samples = samples.mean(axis=1)
-	return samples.astype(np.float32, copy=False), int(fs)
-
-def extract_payloads(args) -> Path:
+def extract_payloads(args, audio: IngestedAudio | None = None) -> Path:
+	"""Demodulate args.input_wav (or an already ingested `audio` containing the modem's rate)."""
 	out_dir = interface.ensure_output_dir(args.out_dir)
 	if args.output_csv is None:
 		default_name = f"{Path(args.input_wav).stem}_frames.csv"
@@ -21,15 +17,34 @@ def extract_payloads(args) -> Path:
 	else:
 		output_csv = interface.resolve_output_path(out_dir, args.output_csv)
 
-	print(f"[extract] loading waveform from {args.input_wav}")
-	in_sam, fs = load_audio(args.input_wav)
-
 	modem, wf, demod = interface.build_modem(args, out_dir)
+	if audio is None:
+		print(f"[extract] loading waveform from {args.input_wav}")
+		audio = ingest(args.input_wav, rates=(wf.fs_Hz,), start_sec=args.start, end_sec=args.end)
+	if audio.fs_Hz != int(wf.fs_Hz):
+		print(f"[extract] resampled {audio.fs_Hz} Hz recording to {int(wf.fs_Hz)} Hz")
 
-	payload_cls = payload.Payload.get_class(args.payload_type)
-	l_frames, l_frame_start_idx = modem.recover_bytes(in_sam)
+	l_dr, Ef, _ = demod.frame_search(audio.at(wf.fs_Hz))
+	n_offset = int(round(audio.start_sec * wf.fs_Hz)) # report positions on the whole file's timeline
+	if args.write_soft_frames:
+		soft_path = interface.resolve_output_path(out_dir, args.soft_frames or f"{Path(args.input_wav).stem}_soft.npz")
+		settings = {k: getattr(args, k) for k in interface.SOFT_FRAME_SETTINGS}
+		SoftFrames.from_results(l_dr, Ef, {**settings, "input": str(args.input_wav)}, n_offset).save(soft_path)
+		print(f"[extract] wrote {len(l_dr)} soft frames to {soft_path}")
+	l_frames, l_frame_start_idx = modem.decode_results(l_dr)
+	l_frame_start_idx = [idx + n_offset for idx in l_frame_start_idx]
 	print(f"[extract] recovered {len(l_frames)} frames")
+	return write_payloads(args, modem, l_frames, l_frame_start_idx, output_csv)
+
+def write_payloads(args, modem: Modem, l_frames: list[bytes], l_frame_start_idx: list[int], output_csv: Path, tag: str = "extract") -> Path:
+	"""Reassemble (--transport), parse and write the payloads in recovered frames."""
+	if args.use_transport:
+		l_msgs, stats = Transport(modem).reassemble(l_frames, l_frame_start_idx)
+		l_frames = [msg.data for msg in l_msgs]
+		l_frame_start_idx = [msg.start_sam for msg in l_msgs]
+		print(f"[{tag}] transport: {stats.summary()}")
 
+	payload_cls = payload.Payload.get_class(args.payload_type)
 	l_payloads, l_payload_start = payload_cls.decode_frames(
 		l_frames,
 		l_frame_start_idx,
@@ -37,13 +52,13 @@ def extract_payloads(args) -> Path:
 	)
 	payload_cls.write_csv(l_payloads, l_sam_idx=l_payload_start, out_csv=str(output_csv))
 
-	print(f"[extract] wrote {len(l_payloads)} payload entries to {output_csv}")
+	print(f"[{tag}] wrote {len(l_payloads)} payload entries to {output_csv}")
 	return output_csv
 
 def main(argv: list[str] | None = None):
 	parser = interface.build_extract_parser()
 	args = parser.parse_args(argv)
-	extract_payloads(args)
+	return extract_payloads(args)
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Re-verify archived matches of SignaturePayloads against the tokens they signed."""
+import sys
+import time
+from pathlib import Path
+from cicada import interface
+from cicada.ingest import DEMOD_FS_HZ
+from cicada.keyring import Keyring
+from cicada.payload.signature import SignaturePayload, all_verifiers, get_verifier
+
+def find_matches_csvs(l_paths: list[Path]) -> list[Path]:
+	l_csvs = []
+	for path in l_paths:
+		l_csvs += sorted(path.rglob("*_matches.csv")) if path.is_dir() else [path]
+	return l_csvs
+
+def run(args) -> list[tuple[Path, SignaturePayload, int]]:
+	"""Check every archived match; returns the (file, payload, frame start) entries that fail."""
+	if args.keyring is not None:
+		keyring = Keyring.load(args.keyring)
+	else:
+		keyring = Keyring.single(interface.load_bls_pubkey(args.bls_pubkey))
+	l_entries, l_pairs = [], []
+	for csv_path in find_matches_csvs(args.matches):
+		l_payloads, l_sam_idx, l_signed_tokens = SignaturePayload.load_matches_csv(csv_path)
+		for pl, sam_idx, l_tokens in zip(l_payloads, l_sam_idx, l_signed_tokens):
+			l_entries.append((csv_path, pl, sam_idx))
+			l_pairs.append((bytes(pl.bls_signature), pl.signed_message(l_tokens)))
+	print(f"[recheck] {len(l_pairs)} matches in {len({e[0] for e in l_entries})} files")
+	t0 = time.perf_counter()
+	d_groups = {} # each match is checked against the key of its archived signer, else its best candidate
+	for i, (_, pl, _) in enumerate(l_entries):
+		entry = keyring.by_name.get(pl.signer) or keyring.candidates(pl.header.message)[0]
+		d_groups.setdefault(entry.pubkey_bytes, []).append(i)
+	l_bad = []
+	for pk, l_group in d_groups.items():
+		verifier = get_verifier(pk)
+		if args.individual:
+			l_bad += [i for i in l_group if not verifier.verify(*l_pairs[i])]
+		else:
+			l_bad += [l_group[j] for j in verifier.find_invalid([l_pairs[i] for i in l_group])]
+	if len(keyring) > 1: # a match attributed to the wrong signer still verifies if another key made it
+		l_bad = [i for i in l_bad if keyring.identify(*l_pairs[i], l_entries[i][1].header.message) is None]
+	l_bad.sort()
+	dt = time.perf_counter() - t0
+	n_miller = sum(v.n_miller_loops for v in all_verifiers().values())
+	n_final = sum(v.n_final_exps for v in all_verifiers().values())
+	print(f"[recheck] {n_miller} Miller loops, {n_final} final exponentiations in {dt:.2f} s")
+	for i in l_bad:
+		csv_path, pl, sam_idx = l_entries[i]
+		print(f"[recheck] INVALID in {csv_path}: {pl.describe(sam_idx, DEMOD_FS_HZ)}")
+	print(f"[recheck] {len(l_pairs) - len(l_bad)} valid, {len(l_bad)} invalid")
+	return [l_entries[i] for i in l_bad]
+
+def main(argv: list[str] | None = None):
+	parser = interface.build_recheck_parser()
+	args = parser.parse_args(argv)
+	if args.keyring is None and not args.bls_pubkey.exists():
+		parser.error("BLS pubkey or keyring required to re-check matches.")
+	if run(args):
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
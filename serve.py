@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Run extract and verify jobs in a long-running local service with models kept warm (see cicada/service.py)."""
+import extract
+import verify
+from cicada import asr, interface, service
+from cicada.keyring import Keyring
+from cicada.payload.signature import get_verifier
+
+def _without_plots(parser, argv: list[str]) -> list[str]:
+	"""argv with demodulator plots off: jobs sharing an out-dir would overwrite each other's plots."""
+	if "--demod-plot" in argv:
+		parser.error("--demod-plot is not available in serve jobs; run the command directly to plot.")
+	return argv + ["--demod-no-plot"]
+
+def _extract_job(argv: list[str]):
+	return extract.main(_without_plots(interface.build_extract_parser(), argv))
+
+def _verify_job(argv: list[str]):
+	"""verify.main, refusing --jobs: forking the multithreaded daemon could copy locks other jobs hold."""
+	parser = interface.build_verify_parser()
+	argv = _without_plots(parser, argv)
+	if parser.parse_args(argv).jobs > 1:
+		parser.error("--jobs is not available in serve jobs; run verify directly, or use batch --workers.")
+	return verify.main(argv)
+
+def main(argv: list[str] | None = None):
+	parser = interface.build_serve_parser()
+	args = parser.parse_args(argv)
+	asr.keep_models_resident()
+	interface.keep_modems_resident()
+	if args.preload:
+		cfg = asr.ASRConfig(backend=args.asr_backend, model_size=args.model_size, compute_type=args.compute_type, cpu_threads=args.cpu_threads)
+		print(f"[serve] loading {cfg.describe()}")
+		asr.load_model(cfg)
+		defaults = interface.build_extract_parser().parse_args(["recording.wav", "--demod-no-plot"]) # the modem jobs get unless they set waveform or demod flags
+		interface.build_modem(defaults, interface.ensure_output_dir(defaults.out_dir))
+	if args.bls_pubkey.exists():
+		get_verifier(interface.load_bls_pubkey(args.bls_pubkey))
+	if args.keyring is not None:
+		print(f"[serve] keyring of {len(Keyring.load(args.keyring))} keys from {args.keyring}")
+	svc = service.VerificationService({"extract": _extract_job, "verify": _verify_job}, workers=args.workers, max_queued=args.max_queued)
+	server = service.make_server(svc, args.host, args.port)
+	print(f"[serve] accepting jobs at http://{args.host}:{server.server_address[1]}/jobs ({args.workers} workers, up to {args.max_queued} queued)")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		svc.shutdown()
+
+if __name__ == "__main__":
+	main()
@@ -1,78 +1,82 @@
 #!/usr/bin/env python3
 """Live signer/transmitter CLI."""
 import argparse
-import queue
 import threading
 
-import sounddevice as sd
-from faster_whisper import WhisperModel
-
-from cicada import payload, speech
+from cicada import asr, audio_io, payload, speech
 from cicada import interface
+from cicada.transport import Transport
+from cicada.transmitter import StreamTransmitter
+from cicada.pipeline import SignerPipeline, SignerPipelineParameters
+from cicada.metrics import MetricsRegistry, serve_metrics, json_metrics_writer
 
 def run(args: argparse.Namespace):
 	out_dir = interface.ensure_output_dir(args.out_dir)
 	modem, wf, demod = interface.build_modem(args, out_dir)
+	transport = Transport(modem) if args.use_transport else None
+	render = (lambda b: transport.modulate_message(b)[0]) if transport is not None else modem.modulate_bytes
+	mic_device = audio_io.WavInput(args.mic_wav, speed=args.mic_speed) if args.mic_wav else args.mic_device
+	speaker_device = args.speaker_device
+	if args.speaker_wav:
+		clock = mic_device if isinstance(mic_device, audio_io.ArrayInput) else None
+		speaker_device = audio_io.WavOutput(interface.resolve_output_path(out_dir, args.speaker_wav), clock=clock)
+	transmitter = StreamTransmitter(modem, render=render, blocksize=args.tx_blocksize, device=speaker_device)
 
 	payload_cls = payload.Payload.get_class(args.payload_type)
-	model = WhisperModel(args.model_size, compute_type="float32")
+	asr_cfg = interface.build_asr_config(args, out_dir)
+	model = None if args.transcribe_process else asr.load_model(asr_cfg)
 
 	bls_privkey = None
 	bls_pubkey_bytes = None
 	if payload_cls.requires_bls_keys:
 		bls_privkey, bls_pubkey_bytes = interface.load_bls_keypair(args.bls_privkey, args.bls_pubkey)
 
-	q_mic = queue.Queue()
-	q_transcripts = queue.Queue()
-	t_mic = threading.Thread(
-		target=speech.mic_worker,
-		args=(q_mic,),
-		kwargs={"mic_blocksize_sam": args.mic_blocksize, "mic_device": args.mic_device},
-		daemon=True,
-	)
-	transcript_writer = None
-	if args.signer_transcript:
-		transcript_path = interface.resolve_output_path(out_dir, args.signer_transcript)
-		transcript_writer = speech.TranscriptLogger(transcript_path)
-	t_transcriber = threading.Thread(
-		target=speech.audio_transcript_worker,
-		args=(model, q_mic, q_transcripts),
-		kwargs={
-			"window_sec": args.window_sec,
-			"overlap_sec": args.overlap_sec,
-			"debug": args.debug,
-			"transcript_writer": transcript_writer,
-		},
-		daemon=True,
-	)
-	t_mic.start()
-	t_transcriber.start()
-
-	print(f"[sign] transmitting {args.payload_type} payloads (LDPC={'on' if args.use_ldpc else 'off'})")
-	while True:
-		chunk_text = None
-		try:
-			while True:
-				chunk_text = q_transcripts.get_nowait()
-		except queue.Empty:
-			pass
-		if chunk_text is None:
-			chunk_text = q_transcripts.get()
-		print(f"[sign] {chunk_text}")
-
+	def make_payload_bytes(chunk_text: str) -> bytes:
 		payload_kwargs = {}
 		if payload_cls.requires_bls_keys:
 			payload_kwargs.update(
 				header_message=args.header_message,
+				payload_version=args.payload_version,
 				bls_privkey=bls_privkey,
 				bls_pubkey_bytes=bls_pubkey_bytes,
 			)
-		pl = payload_cls.from_transcript(chunk_text, **payload_kwargs)
-		pl_bytes = pl.to_bytes()
+		return payload_cls.from_transcript(chunk_text, **payload_kwargs).to_bytes()
 
-		sam = modem.modulate_bytes(pl_bytes)
-		sd.play(sam, wf.fs_Hz)
-		sd.wait()
+	transcript_writer = None
+	if args.signer_transcript:
+		transcript_path = interface.resolve_output_path(out_dir, args.signer_transcript)
+		transcript_writer = speech.TranscriptLogger(transcript_path)
+	cfg = SignerPipelineParameters(
+		window_sec=args.window_sec,
+		overlap_sec=args.overlap_sec,
+		mic_blocksize_sam=args.mic_blocksize,
+		mic_device=mic_device,
+		transcribe_process=args.transcribe_process,
+		incremental=args.incremental,
+		vad=args.vad,
+		deadline=args.deadline,
+		beam_size=args.beam_size,
+		latency_slo_sec=args.latency_slo,
+		model_size=asr_cfg.model_size,
+		compute_type=asr_cfg.compute_type,
+		asr_backend=asr_cfg.backend,
+		debug=args.debug,
+	)
+	load_model = asr.model_loader(asr_cfg)
+	metrics = MetricsRegistry()
+	pipeline = SignerPipeline(cfg, model, make_payload_bytes, transmitter, transcript_writer=transcript_writer, load_model=load_model, metrics=metrics)
+	if args.metrics_port is not None:
+		serve_metrics(metrics, args.metrics_port)
+	t_metrics_json = None
+	if args.metrics_json:
+		metrics_path = interface.resolve_output_path(out_dir, args.metrics_json)
+		t_metrics_json = threading.Thread(target=json_metrics_writer, args=(metrics, metrics_path, args.metrics_interval, pipeline.stop_event), daemon=True)
+		t_metrics_json.start()
+		print(f"[metrics] writing {metrics_path} every {args.metrics_interval:g}s")
+	print(f"[sign] transmitting {args.payload_type} payloads (LDPC={'on' if args.use_ldpc else 'off'}, transport={'on' if args.use_transport else 'off'})")
+	pipeline.run()
+	if t_metrics_json is not None:
+		t_metrics_json.join(timeout=5.0)
 
 def main(argv: list[str] | None = None):
 	parser = interface.build_sign_parser()
@@ -80,6 +84,8 @@ def main(argv: list[str] | None = None):
 	payload_cls = payload.Payload.get_class(args.payload_type)
 	if payload_cls.requires_bls_keys and (not args.bls_privkey.exists() or not args.bls_pubkey.exists()):
 		parser.error("BLS key paths must exist when payload-type=signature.")
+	if args.mic_wav and args.transcribe_process and args.mic_speed is None:
+		parser.error("--transcribe-process with --mic-wav needs --mic-speed.")
 	run(args)
 
 if __name__ == "__main__":
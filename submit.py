@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Send an extract or verify job to a running `serve` and print its output as it streams back."""
+import sys
+import urllib.error
+from cicada import interface, service
+
+def main(argv: list[str] | None = None):
+	parser = interface.build_submit_parser()
+	args = parser.parse_args(argv)
+	job_args = args.args[1:] if args.args[:1] == ["--"] else args.args
+	done = None
+	try:
+		for event in service.submit(args.url, args.command, job_args):
+			if event["event"] == "log":
+				print(event["line"])
+			elif event["event"] == "queued":
+				print(f"[submit] job {event['job']} queued ({event['ahead']} ahead)")
+			elif event["event"] == "done":
+				done = event
+	except urllib.error.HTTPError as exc:
+		sys.exit(f"[submit] {args.url} refused the job: {exc.code} {exc.read().decode('utf-8', errors='replace')}")
+	except urllib.error.URLError as exc:
+		sys.exit(f"[submit] cannot reach {args.url}: {exc.reason}")
+	if done is None:
+		sys.exit("[submit] connection closed before the job finished")
+	error = f": {done['error']}" if done["error"] else ""
+	print(f"[submit] job {done['job']} {'finished' if done['ok'] else 'failed'} in {done['sec']:.1f} s{error}")
+	if not done["ok"]:
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Tests for the ASR benchmark: word agreement, RTF measurement and budgeted selection."""
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from cicada import asr
+
+class _FakeClock:
+	def __init__(self): self.t = 0.0
+	def __call__(self) -> float: return self.t
+
+class FakeModel:
+	"""Decodes at a fixed cost per audio second on the fake clock; drops words to mimic a less accurate model."""
+	def __init__(self, sec_per_audio_sec: float, n_drop: int, clock: _FakeClock):
+		self.sec_per_audio_sec, self.n_drop, self.clock = sec_per_audio_sec, n_drop, clock
+
+	def transcribe(self, audio, **kwargs):
+		self.clock.t += self.sec_per_audio_sec * len(audio) / 16e3
+		words = "the quick brown fox jumps over the lazy dog".split()[self.n_drop:]
+		return iter([SimpleNamespace(text=" " + " ".join(words))]), None
+
+FAKE_MODELS = {("tiny.en", "int8"): (0.002, 3), ("base.en", "int8"): (0.004, 1), ("base.en", "float32"): (0.01, 0)}
+
+def test_word_agreement():
+	assert asr.word_agreement("The quick brown fox.", "the quick brown fox") == 1.0
+	assert asr.word_agreement("a b c d", "a b x d") == 0.75
+	assert asr.word_agreement("", "") == 1.0
+
+def test_benchmark_and_selection():
+	l_configs = [asr.ASRConfig(model_size=size, compute_type=ct) for size, ct in FAKE_MODELS]
+	clock = _FakeClock()
+	load = lambda cfg: FakeModel(*FAKE_MODELS[(cfg.model_size, cfg.compute_type)], clock)
+	l_results = asr.run_benchmark(np.zeros(int(4 * 16e3), dtype=np.float32), l_configs, window_sec=1.0, load=load, clock=clock)
+	assert [r.audio_sec for r in l_results] == [4.0, 4.0, 4.0]
+	assert all(abs(r.rtf - FAKE_MODELS[(r.model_size, r.compute_type)][0]) < 1e-9 for r in l_results)
+	assert all(abs(r.load_sec - FAKE_MODELS[(r.model_size, r.compute_type)][0]) < 1e-9 for r in l_results) # the 1 s warm-up decode
+	assert l_results[2].word_agreement == 1.0 and l_results[0].word_agreement < 0.9 < l_results[1].word_agreement
+	assert asr.pick_config(l_results, rtf_budget=1.0, min_agreement=0.9).model_size == "base.en" # tiny is too inaccurate
+	assert asr.pick_config(l_results, rtf_budget=1.0, min_agreement=0.0).model_size == "tiny.en"
+	assert asr.pick_config(l_results, rtf_budget=1e-6) is None
+	with tempfile.TemporaryDirectory() as d:
+		path = Path(d) / "bench.json"
+		asr.save_results(path, l_results, clip="fake")
+		base = asr.ASRConfig(model_size="medium.en", cpu_threads=4)
+		cfg = asr.select_config(base, path, rtf_budget=1.0, min_agreement=0.9)
+		assert (cfg.model_size, cfg.compute_type, cfg.cpu_threads) == ("base.en", "int8", 4)
+		assert asr.select_config(base, path, rtf_budget=1e-6) == base
+		assert asr.select_config(base, Path(d) / "missing.json", rtf_budget=1.0) == base
+
+if __name__ == "__main__":
+	test_word_agreement()
+	test_benchmark_and_selection()
+	print("ASR bench test success")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Batch runs must find recordings in directories and globs, skip those whose outputs are up to
+date, survive failing runs and summarize frames and matches per recording."""
+import sys
+import os
+import tempfile
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import csv
+import numpy as np
+import soundfile as sf
+from cicada import batch, interface
+
+def fake_verify(argv):
+	"""Stands in for verify.main: frames and matches CSVs named after the recording."""
+	path = Path(argv[0])
+	out_dir = Path(argv[argv.index("--out-dir") + 1])
+	if path.stem == "broken":
+		raise RuntimeError("cannot demodulate")
+	n = int(path.stem[-1])
+	(out_dir / f"{path.stem}_frames.csv").write_text("frame_start_sam\n" + "0\n" * n)
+	if n > 1:
+		(out_dir / f"{path.stem}_matches.csv").write_text("frame_start_sam\n" + "0\n" * (n - 1))
+	(out_dir / f"{path.stem}_transcript.md").write_text("# Transcript\n")
+	print(f"[fake] {n} frames")
+
+def test_batch_verify():
+	with tempfile.TemporaryDirectory() as tmp:
+		tmp = Path(tmp)
+		(tmp / "a" / "b").mkdir(parents=True)
+		for rel, sec in (("a/r1.wav", 1.0), ("a/b/r3.flac", 2.0), ("x2.wav", 0.5), ("broken.wav", 0.5)):
+			sf.write(tmp / rel, np.zeros(int(sec * 16000), dtype=np.float32), 16000)
+		(tmp / "a" / "notes.txt").write_text("not a recording")
+		l_recordings = batch.find_recordings([str(tmp / "a"), str(tmp / "*.wav"), str(tmp / "a" / "r1.wav")])
+		assert [p.relative_to(tmp).as_posix() for p in l_recordings] == ["a/b/r3.flac", "a/r1.wav", "broken.wav", "x2.wav"]
+		out_dir = tmp / "out"
+		out_dir.mkdir()
+		l_tasks = batch.plan_tasks("verify", l_recordings, ["--out-dir", str(out_dir)])
+		assert [t.audio_sec for t in l_tasks] == [2.0, 1.0, 0.5, 0.5]
+		assert l_tasks[1].matches_csv == out_dir / "r1_matches.csv"
+		assert interface.build_verify_parser().parse_args(l_tasks[0].argv).demod_plot is False
+		for job_args in (["--output-md", "x.md"], ["--out-dir", str(out_dir), "--jobs", "4"], ["--demod-plot"]):
+			try:
+				batch.plan_tasks("verify", l_recordings, job_args, workers=2)
+				raise AssertionError(f"{job_args} accepted")
+			except ValueError:
+				pass
+		try:
+			batch.plan_tasks("extract", l_recordings + [tmp / "r1.wav"], [])
+			raise AssertionError("recordings with the same name accepted")
+		except ValueError as exc:
+			assert "r1.wav" in str(exc)
+
+		l_rows = batch.run(l_tasks, fake_verify, workers=2)
+		assert [r["status"] for r in l_rows] == ["done", "done", "failed", "done"]
+		assert [(r["frames"], r["matched"]) for r in l_rows] == [(3, 2), (1, 0), (None, None), (2, 1)]
+		assert l_rows[2]["error"] == "RuntimeError: cannot demodulate"
+		assert "[fake] 3 frames" in (out_dir / "r3_verify.log").read_text()
+
+		os.utime(tmp / "x2.wav") # newer than its outputs
+		l_rows = batch.run(l_tasks, fake_verify)
+		assert [r["status"] for r in l_rows] == ["up to date", "up to date", "failed", "done"]
+		assert [(r["frames"], r["matched"]) for r in l_rows] == [(3, 2), (1, 0), (None, None), (2, 1)]
+		summary = batch.write_summary(l_rows, out_dir / "batch_summary.csv", wall_sec=2.0)
+		assert summary.startswith("4 recordings (1 processed, 2 up to date, 1 failed): 6 frames, 3 matched; 1 s of audio")
+		with open(out_dir / "batch_summary.csv", newline="") as f:
+			l_summary = list(csv.DictReader(f))
+		assert [r["input"] for r in l_summary] == [str(p) for p in l_recordings]
+		assert l_summary[0]["x_realtime"] == "" and l_summary[3]["matched"] == "1"
+
+if __name__ == "__main__":
+	test_batch_verify()
+	print("Batch test success")
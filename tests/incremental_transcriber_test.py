@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""The signer's incremental transcriber must decode only audio after its committed words,
+prompt with them, keep words near the newest audio tentative until a later hop re-decodes
+them, and assemble each window's text without repeating words."""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from cicada.speech import IncrementalTranscriber
+
+FS = 16000
+WORDS = [
+	"alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet",
+	"kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango",
+]
+TIMELINE = [(w, i + 0.2, i + 0.7) for i, w in enumerate(WORDS)] # one word a second...
+TIMELINE[5] = ("foxtrot", 5.6, 6.4) # ...but foxtrot is still being said at the 6 s hop
+
+class _ScriptedModel:
+	"""Hears the words of TIMELINE that start in the audio it is given, which ends at `end_sec`.
+	A word still being spoken at the end comes back cut short."""
+	def __init__(self):
+		self.end_sec = 0.0
+		self.l_calls = [] # (audio start, prompt)
+
+	def transcribe(self, audio, initial_prompt=None, **kwargs):
+		start = self.end_sec - len(audio) / FS
+		self.l_calls.append((round(start, 6), initial_prompt))
+		l_words = []
+		for text, t0, t1 in TIMELINE:
+			if not start <= t0 < self.end_sec:
+				continue
+			if t1 > self.end_sec:
+				text, t1 = text[:3], self.end_sec
+			l_words.append(SimpleNamespace(word=" " + text, start=t0 - start, end=t1 - start))
+		return iter([SimpleNamespace(text=" ".join(w.word for w in l_words), words=l_words)]), None
+
+def _hop(transcriber, model, end_sec: float, window_sec: float = 10.0) -> str:
+	model.end_sec = end_sec
+	window = np.zeros(int(min(end_sec, window_sec) * FS), dtype=np.float32)
+	return transcriber.transcribe_window(window, int(end_sec * FS))
+
+def test_incremental_windows():
+	model = _ScriptedModel()
+	transcriber = IncrementalTranscriber(model, window_sec=10.0, commit_margin_sec=1.0, prompt_words=3)
+	d_texts = {end: _hop(transcriber, model, end) for end in range(2, 21, 2)}
+	assert d_texts[2] == "alpha bravo" # bravo ends within the margin: tentative
+	assert d_texts[6] == "alpha bravo charlie delta echo fox" # a cut-off word is shown...
+	assert d_texts[8] == "alpha bravo charlie delta echo foxtrot golf hotel" # ...and decoded whole next hop
+	assert d_texts[20] == " ".join(WORDS[10:]) # committed words before the window are dropped
+	for end, text in d_texts.items(): # no word is repeated where decodes overlap
+		l_words = text.split()
+		assert len(l_words) == len(set(l_words)), (end, text)
+		assert [w[:3] for w in l_words] == [w[:3] for w in WORDS[max(0, end - 10):][:len(l_words)]] # in order (the last maybe cut off)
+	# Each hop decodes from the end of the last committed word, prompted with the last prompt_words of them
+	assert [start for start, _ in model.l_calls] == [0.0, 0.7] + [round(end - 3.3, 6) for end in range(6, 21, 2)]
+	assert model.l_calls[1][1] == "alpha" and model.l_calls[5][1] == "golf hotel india"
+	assert abs(transcriber.decoded_sec - (2.0 + 3.3 * 9)) < 1e-6 # not 10 s a hop
+
+	transcriber.reset(22 * FS) # e.g. the VAD found no speech
+	assert _hop(transcriber, model, 24.0) == ""
+	assert model.l_calls[-1][0] == 22.0 and transcriber.committed_end_sec == 23.0
+
+if __name__ == "__main__":
+	test_incremental_windows()
+	print("Incremental transcriber test success")
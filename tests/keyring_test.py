@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""A keyring of several signers must load from a directory or CSV, route payloads to the keys
+their header messages hint at, match a multi-signer transcript in one pass, and have each signer's
+header timestamps checked against its own clock."""
+import base64
+import sys
+import tempfile
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import blst
+import make_bls_keys
+from cicada.keyring import Keyring, KeyringEntry, normalize_header_message
+from cicada.payload.signature import SignaturePayload, SignaturePayloadHeader
+from cicada.verification import timestamp_issues
+
+WORDS = "we hold these truths to be self evident that all men are created equal that they are endowed".split()
+
+def _keypair(seed: bytes):
+	privkey = blst.SecretKey()
+	privkey.keygen(seed * 32)
+	return privkey, blst.P2(privkey).serialize()
+
+def test_load_and_candidates():
+	d_keys = {name: _keypair(name[:1].encode()) for name in ("alice", "bob", "carol")}
+	with tempfile.TemporaryDirectory() as tmp:
+		key_dir = Path(tmp) / "keys"
+		key_dir.mkdir()
+		for name, (_, pubkey_bytes) in d_keys.items():
+			(key_dir / f"{name}.b64").write_text(base64.b64encode(pubkey_bytes).decode())
+		(key_dir / "alice.headers").write_text("alice.net\n\n")
+		(key_dir / "carol.b64").write_text(base64.b64encode(blst.P2(_keypair(b"c")[0]).compress()).decode()) # compressed
+		make_bls_keys.save_keypair(str(key_dir / "bls_privkey.b64"), str(key_dir / "dave.b64")) # the private key is skipped
+		keyring_csv = Path(tmp) / "keyring.csv"
+		keyring_csv.write_text(
+			"name,bls_pubkey,header_message\n"
+			+ "".join(f"{name},{base64.b64encode(pubkey_bytes).decode()},{name}.org\n" for name, (_, pubkey_bytes) in d_keys.items())
+			+ f"bob,{base64.b64encode(d_keys['bob'][1]).decode()},bob.example.com\n"
+		)
+		from_dir, from_csv = Keyring.load(key_dir), Keyring.load(keyring_csv)
+		bad_csv = Path(tmp) / "bad.csv"
+		bad_csv.write_text("name,bls_pubkey,header_message\nmallory," + base64.b64encode(bytes(96)).decode() + ",\n")
+		try:
+			Keyring.load(bad_csv)
+			raise AssertionError("invalid public key accepted")
+		except ValueError as exc:
+			assert "mallory" in str(exc)
+	assert [e.name for e in from_dir.entries] == ["alice", "bob", "carol", "dave"]
+	assert [len(e.pubkey_bytes) for e in from_dir.entries] == [192, 192, 96, 192]
+	assert [e.name for e in from_dir.candidates("alice.net")] == ["alice", "bob", "carol", "dave"]
+	assert [e.name for e in from_dir.candidates("bob.org")] == ["alice", "bob", "carol", "dave"] # no hint: every key, in order
+	assert [e.name for e in from_csv.candidates("carol.org")] == ["carol", "alice", "bob"]
+	assert [e.name for e in from_csv.candidates("carol.o")] == ["carol", "alice", "bob"] # as cut short in version 2 headers
+	assert from_csv.by_name["bob"].header_messages == ["bob.org", "bob.example"] # as truncated in headers
+	assert [e.name for e in from_csv.candidates("bob.example.com\x00")] == ["bob", "alice", "carol"]
+	assert normalize_header_message("q3q.net\x00\x00\x00\x00") == "q3q.net"
+
+def test_multi_signer_matching():
+	d_keys = {name: _keypair(name[:1].encode()) for name in ("alice", "bob")}
+	keyring = Keyring([KeyringEntry("alice", d_keys["alice"][1], ["alice.net"]), KeyringEntry("bob", d_keys["bob"][1], ["bob.org"])])
+	l_payloads = [
+		SignaturePayload.from_transcript(" ".join(WORDS[2:9]), header_message="bob.org", bls_privkey=d_keys["bob"][0], bls_pubkey_bytes=d_keys["bob"][1], timestamp=1700000000),
+		SignaturePayload.from_transcript(" ".join(WORDS[6:14]), header_message="unsigned", bls_privkey=d_keys["alice"][0], bls_pubkey_bytes=d_keys["alice"][1], timestamp=1700000005),
+	]
+	d = SignaturePayload.match_chunk(" ".join(WORDS), l_payloads, [0, 44100], {"bls_keyring": keyring}, 44100)
+	assert d == {0: 2, 1: 6}
+	assert [pl.signer for pl in l_payloads] == ["bob", "alice"]
+	assert "Signed by bob" in l_payloads[0].make_footnote(0, 44100)
+	with tempfile.TemporaryDirectory() as tmp:
+		matches_csv = Path(tmp) / "x_matches.csv"
+		SignaturePayload.write_matches_csv(l_payloads, [0, 44100], [WORDS[2:9], WORDS[6:14]], matches_csv)
+		l_loaded, _, l_signed_tokens = SignaturePayload.load_matches_csv(matches_csv)
+	assert [pl.signer for pl in l_loaded] == ["bob", "alice"]
+	entry = keyring.identify(bytes(l_loaded[1].bls_signature), l_loaded[1].signed_message(l_signed_tokens[1]), l_loaded[1].header.message)
+	assert entry.name == "alice"
+
+def test_timestamps_per_signer():
+	d_keys = {name: _keypair(name[:1].encode()) for name in ("alice", "bob")}
+	keyring = Keyring([KeyringEntry("alice", d_keys["alice"][1], ["alice.net"]), KeyringEntry("bob", d_keys["bob"][1], ["bob.org"])])
+	l_payloads = []
+	for message, t in [("alice.net", 1700000010), ("bob.org", 1700000300), ("alice.n", 1700000017), ("bob.org", 1700000307), ("eve", 1700005000), ("alice.net", 1700000024)]:
+		pl = SignaturePayload.__new__(SignaturePayload)
+		pl.header, pl.bls_signature = SignaturePayloadHeader(t, 5, message), bytes(48)
+		l_payloads.append(pl)
+	l_starts = [sec * 44100 for sec in (10, 12, 17, 19, 20, 60)] # bob's clock runs 288 s ahead of alice's, eve's further still
+	payload_kwargs = {"bls_keyring": keyring, "wf_fs": 44100, "timestamp_tolerance_sec": 10.0}
+	l_issues = timestamp_issues(SignaturePayload, l_payloads, l_starts, payload_kwargs)
+	assert l_issues[:5] == [""] * 5 and "off the recording's clock" in l_issues[5] # alice's last payload is replayed 36 s late
+	assert all(SignaturePayload.check_timestamps(l_payloads[:4], l_starts[:4], 44100)[1::2]) # checked together, bob's look forged
+
+if __name__ == "__main__":
+	test_load_and_candidates()
+	test_multi_signer_matching()
+	test_timestamps_per_signer()
+	print("Keyring test success")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Tests for time-localized matching helpers: token timing, signed-speech bounds and header timestamp checks."""
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+from cicada.payload.signature import SignaturePayload, SignaturePayloadHeader, regularize_transcript, signed_speech_bounds, token_times
+from cicada.speech import TimedWord
+from cicada.verification import segment_timed_words
+
+FS = 44100
+
+def _payload(timestamp: float) -> SignaturePayload:
+	pl = SignaturePayload.__new__(SignaturePayload)
+	pl.header = SignaturePayloadHeader(timestamp, 5, "q3q.net")
+	pl.bls_signature = bytes(48)
+	return pl
+
+def test_token_times():
+	l_words = segment_timed_words([(10.0, 12.0, " Hello there"), (12.0, 13.0, " well-known")])
+	assert [w.text for w in l_words] == ["Hello", "there", "well-known"]
+	assert abs(l_words[1].start - 11.0) < 1e-9 and l_words[2].end == 13.0
+	text = " ".join(w.text for w in l_words)
+	l_times = token_times(text, regularize_transcript(text), l_words)
+	assert l_times == [(10.0, 11.0), (11.0, 12.0), (12.0, 13.0), (12.0, 13.0)] # "well-known" is two tokens of one word
+	assert token_times("one two", regularize_transcript("one two"), [TimedWord("one two", 0.0, 1.0)]) is None
+	assert signed_speech_bounds(30.0, 10.0, 4.0) == (16.0, 34.0)
+
+def test_check_timestamps():
+	t0 = 1700000000
+	l_tx_sec = [12, 19, 26, 33, 40]
+	l_payloads = [_payload(t0 + t + (1 if i % 2 else 0)) for i, t in enumerate(l_tx_sec)] # 1 s latency jitter
+	l_starts = [t * FS for t in l_tx_sec]
+	assert SignaturePayload.check_timestamps(l_payloads, l_starts, FS) == [""] * 5
+	l_payloads.append(_payload(t0 + 12)) # payload from 12 s replayed at 60 s
+	l_starts.append(60 * FS)
+	l_issues = SignaturePayload.check_timestamps(l_payloads, l_starts, FS)
+	assert l_issues[:5] == [""] * 5 and "off the recording's clock" in l_issues[5]
+	l_issues = SignaturePayload.check_timestamps(l_payloads, l_starts, FS, tolerance_sec=100.0)
+	assert "goes back" in l_issues[5]
+
+if __name__ == "__main__":
+	test_token_times()
+	test_check_timestamps()
+	print("Localized matching test success")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""verify --jobs: sharded matching on forked workers must give the serial match table."""
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+from cicada import match_pool
+from cicada.payload.signature import EncodedTokens, regularize_transcript
+from cicada.speech import TimedWord
+from cicada.token_stream import TokenStream
+from cicada.verification import TimelineChunk
+
+WORDS = [f"word{chr(ord('a') + i % 26)}{chr(ord('a') + i // 26)}" for i in range(120)]
+FS = 100
+
+class FakePayload:
+	"""Matches the run of its signed tokens."""
+	def __init__(self, l_signed):
+		self.run = b"".join(w.encode("utf-8") + b"\x00" for w in l_signed)
+		self.header = SimpleNamespace(word_count=len(l_signed))
+
+	def match_runs(self, runs, **kwargs):
+		return next((i for i, run in enumerate(runs) if run == self.run), -1)
+
+	def match_to_chunk(self, chunk_text, encoded_tokens=None, **kwargs):
+		return self.match_runs(encoded_tokens.run(i, self.header.word_count) for i in range(len(encoded_tokens) - self.header.word_count + 1))
+
+class FakePayloadClass:
+	tokenize_text = staticmethod(regularize_transcript)
+
+	@classmethod
+	def match_chunk(cls, chunk_text, l_payloads, l_payload_start_sam, payload_kwargs, wav_fs_Hz=FS, chunk_words=None, l_tokens=None, l_payload_idx=None):
+		enc = EncodedTokens(l_tokens)
+		d = {ipl: l_payloads[ipl].match_to_chunk(chunk_text, encoded_tokens=enc) for ipl in l_payload_idx}
+		return {ipl: idx for ipl, idx in d.items() if idx >= 0}
+
+def _setup():
+	l_chunks = []
+	for i0 in range(0, len(WORDS) - 10, 5):
+		l_words = [TimedWord(WORDS[i], 0.4 * i, 0.4 * (i + 1)) for i in range(i0, min(i0 + 20, len(WORDS)))]
+		l_chunks.append(TimelineChunk(" ".join(w.text for w in l_words), l_words[0].start, l_words[-1].end, l_words))
+	l_payloads = [FakePayload(WORDS[i:(i + 6)]) for i in range(0, len(WORDS) - 6, 7)] + [FakePayload(["nowhere"] * 6)]
+	l_starts = [FS * 0.4 * (i + 6) for i in range(0, len(WORDS) - 6, 7)] + [0]
+	return l_chunks, l_payloads, l_starts
+
+def test_jobs_match_serial():
+	l_chunks, l_payloads, l_starts = _setup()
+	stream = TokenStream.from_chunks(l_chunks, regularize_transcript)
+	d_serial = match_pool.match_stream(stream, l_payloads, l_starts, {}, FS, jobs=1)
+	assert len(d_serial) == len(l_payloads) - 1
+	l_tokens, l_d_serial = match_pool.match_chunks(FakePayloadClass, l_chunks, l_payloads, l_starts, {}, FS, jobs=1)
+	assert sum(len(d) for d in l_d_serial) > len(d_serial) # overlapping chunks match the same payload repeatedly
+	if not match_pool.can_fork():
+		return
+	assert match_pool.match_stream(stream, l_payloads, l_starts, {}, FS, jobs=3) == d_serial
+	assert match_pool.match_chunks(FakePayloadClass, l_chunks, l_payloads, l_starts, {}, FS, jobs=4) == (l_tokens, l_d_serial)
+	assert not match_pool._SHARED # nothing left behind for the next run
+
+if __name__ == "__main__":
+	test_jobs_match_serial()
+	print(f"Match pool test success ({os.cpu_count()} CPUs)")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Tests for the signer metrics registry."""
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import json
+from cicada.metrics import MetricsRegistry
+
+def test_histogram_and_exposition():
+	m = MetricsRegistry()
+	h = m.histogram("stage_latency_seconds", "Per-stage latency", {"stage": "transcribe"})
+	assert m.histogram("stage_latency_seconds", labels={"stage": "transcribe"}) is h
+	for v in (0.02, 0.2, 0.3, 7.0):
+		h.observe(v)
+	m.counter("dropped_transcripts_total").inc(3)
+	depth = [5]
+	m.gauge("queue_depth", labels={"queue": "mic"}, fn=lambda: depth[0])
+	depth[0] = 2
+	text = m.to_prometheus()
+	assert text.count("# TYPE cicada_stage_latency_seconds histogram") == 1
+	assert 'cicada_stage_latency_seconds_bucket{stage="transcribe",le="0.25"} 2' in text
+	assert 'cicada_stage_latency_seconds_bucket{stage="transcribe",le="+Inf"} 4' in text
+	assert 'cicada_stage_latency_seconds_count{stage="transcribe"} 4' in text
+	assert "cicada_dropped_transcripts_total 3.0" in text
+	assert 'cicada_queue_depth{queue="mic"} 2.0' in text
+	xruns = [0]
+	m.counter("xruns_total", "Audio callback over/underruns", {"stream": "output"}, fn=lambda: xruns[0])
+	m.counter("xruns_total", "Audio callback over/underruns", {"stream": "input"}).inc()
+	xruns[0] = 4
+	text = m.to_prometheus()
+	assert text.count("# TYPE cicada_xruns_total") == 1 and "# TYPE cicada_xruns_total counter" in text
+	assert 'cicada_xruns_total{stream="output"} 4.0' in text and 'cicada_xruns_total{stream="input"} 1.0' in text
+	try:
+		m.gauge("xruns_total", labels={"stream": "other"})
+		raise AssertionError("metric registered as two kinds")
+	except ValueError:
+		pass
+	d = json.loads(json.dumps(m.to_dict()))
+	assert d['cicada_stage_latency_seconds{stage="transcribe"}']["p50"] == 0.25
+	assert d['cicada_stage_latency_seconds{stage="transcribe"}']["p99"] == 10.0
+
+if __name__ == "__main__":
+	test_histogram_and_exposition()
+	print("Metrics test success")
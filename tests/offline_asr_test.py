@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Verify's offline ASR engines must cover a recording with overlapping windows, decode them
+serially, concurrently (pool) or in one batched call, and report every segment on the recording's
+timeline in the window it came from."""
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from cicada.interface import build_verify_parser
+from cicada.offline_asr import OfflineASRParameters, OfflineTranscriber, window_starts
+
+FS = 16000
+REC_SEC = 20
+WORDS = [
+	"alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet",
+	"kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango",
+]
+TIMELINE = [(w, i + 0.2, i + 0.7) for i, w in enumerate(WORDS)] # one word a second...
+TIMELINE[9] = ("juliet", 9.6, 10.4) # ...but juliet straddles the end of the first window
+
+def _recording() -> np.ndarray:
+	"""Each sample holds its own time, so the fake model can tell where its audio came from."""
+	return (np.arange(REC_SEC * FS) / FS).astype(np.float32)
+
+def _heard(t0: float, t1: float) -> list[tuple[str, float, float]]:
+	return [(w, a, b) for w, a, b in TIMELINE if t0 <= a and b <= t1]
+
+class _FakeModel:
+	"""Hears the words of TIMELINE that lie wholly within its audio."""
+	frames_per_second = 100
+
+	def __init__(self, barrier: threading.Barrier | None = None):
+		self.barrier = barrier
+		self.l_kwargs = []
+
+	def transcribe(self, audio, **kwargs):
+		self.l_kwargs.append(kwargs)
+		if self.barrier is not None:
+			self.barrier.wait() # every worker has to be decoding at once
+		t0 = round(float(audio[0]), 3)
+		n_rec = min(len(audio), REC_SEC * FS - int(t0 * FS)) # the rest is padding
+		l_segs = [
+			SimpleNamespace(text=" " + w, start=a - t0, end=b - t0, words=[SimpleNamespace(word=" " + w, start=a - t0, end=b - t0)])
+			for w, a, b in _heard(t0, t0 + n_rec / FS)
+		]
+		return iter(l_segs), SimpleNamespace(duration=len(audio) / FS)
+
+class _FakePipeline:
+	"""Decodes clips like faster-whisper's BatchedInferencePipeline: segment times are on the
+	recording's timeline and `seek` holds the clip's offset in model frames."""
+	l_calls = []
+
+	def __init__(self, model):
+		self.model = model
+
+	def transcribe(self, audio, clip_timestamps=None, batch_size=8, **kwargs):
+		_FakePipeline.l_calls.append((clip_timestamps, batch_size))
+		l_clips = clip_timestamps or [{"start": 0.0, "end": len(audio) / FS}]
+		l_segs = [
+			SimpleNamespace(seek=int(c["start"] * self.model.frames_per_second), text=" " + w, start=a, end=b, words=[SimpleNamespace(word=" " + w, start=a, end=b)])
+			for c in l_clips for w, a, b in _heard(c["start"], c["end"])
+		]
+		return iter(l_segs), SimpleNamespace(duration=len(audio) / FS)
+
+def test_window_starts():
+	assert window_starts(REC_SEC * FS, 10.0, 2.0) == [0, 8 * FS, 16 * FS]
+	assert window_starts(8 * FS, 10.0, 2.0) == [0]
+	assert window_starts(8 * FS + 1, 10.0, 2.0) == [0, 8 * FS] # one sample past the shift needs another window
+	assert window_starts(10000, 3.5, 0.25, fs_Hz=1000) == [0, 3250, 6500, 9750]
+
+def _check_windows(l_windows):
+	assert [(w.start_sec, w.end_sec) for w in l_windows] == [(0.0, 10.0), (8.0, 18.0), (16.0, 26.0)]
+	assert l_windows[0].text == " ".join(WORDS[:9]) # juliet is cut off by the first window...
+	assert l_windows[1].text == " ".join(WORDS[8:18]) # ...and heard whole in the next
+	assert l_windows[2].text == " ".join(WORDS[16:])
+	for w in l_windows: # on the recording's timeline, not the window's
+		assert [(t0, t1) for t0, t1, _ in w.segments] == [(a, b) for _, a, b in _heard(w.start_sec, w.end_sec)]
+	assert (9.6, 10.4, " juliet") in l_windows[1].segments
+
+def test_serial_and_pool_engines():
+	for engine, num_workers in (("serial", 1), ("pool", 3)):
+		model = _FakeModel(threading.Barrier(3, timeout=5.0) if num_workers > 1 else None)
+		asr = OfflineTranscriber(OfflineASRParameters(engine=engine, num_workers=num_workers), model=model)
+		_check_windows(asr.transcribe_windows(_recording(), 10.0, 2.0))
+		assert len(model.l_kwargs) == 3 and not any(kw["vad_filter"] for kw in model.l_kwargs)
+		assert asr.audio_sec == 30.0
+
+def test_batched_engine():
+	_FakePipeline.l_calls.clear()
+	asr = OfflineTranscriber(OfflineASRParameters(engine="batched", batch_size=2), model=_FakeModel(), batched_pipeline=_FakePipeline)
+	_check_windows(asr.transcribe_windows(_recording(), 10.0, 2.0))
+	l_clips, batch_size = _FakePipeline.l_calls[0]
+	assert batch_size == 2 and len(_FakePipeline.l_calls) == 1 # one call for the whole recording
+	assert l_clips == [{"start": 0.0, "end": 10.0}, {"start": 8.0, "end": 18.0}, {"start": 16.0, "end": 20.0}] # the last clip stops at the end
+
+	l_words = asr.transcribe_timeline(_recording())
+	assert [(w.text, w.start, w.end) for w in l_words] == TIMELINE
+	assert _FakePipeline.l_calls[-1][0] is None # the pipeline splits the recording itself
+	assert asr.audio_sec == 30.0 + REC_SEC
+
+def test_serial_timeline():
+	assert OfflineASRParameters().engine == build_verify_parser().parse_args(["x.wav"]).asr_engine == "serial" # others are opt-in
+	asr = OfflineTranscriber(OfflineASRParameters(engine="serial"), model=_FakeModel())
+	l_words = asr.transcribe_timeline(_recording())
+	assert [(w.text, w.start, w.end) for w in l_words] == TIMELINE
+	assert asr.model.l_kwargs[0]["word_timestamps"]
+
+if __name__ == "__main__":
+	test_window_starts()
+	test_serial_and_pool_engines()
+	test_batched_engine()
+	test_serial_timeline()
+	print("Offline ASR test success")
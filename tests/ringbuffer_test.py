@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Tests for the shared-memory audio ring buffer."""
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from cicada.ringbuffer import SharedAudioRing
+
+def test_windows_are_contiguous_across_wrap():
+	ring = SharedAudioRing(1000)
+	try:
+		reader = SharedAudioRing.attach(ring.name, 1000)
+		x = np.arange(3700, dtype=np.float32)
+		for i in range(0, len(x), 300):
+			ring.write(x[i:(i + 300)])
+		assert reader.total_written == len(x)
+		for end, n in ((3700, 1000), (3650, 900), (3000, 300)):
+			w = reader.window(end, n)
+			assert np.array_equal(w, x[(end - n):end]), (end, n)
+			assert not w.flags.writeable
+		assert not reader.is_valid(2600, 1000) # already overwritten
+		del w
+		reader.close()
+	finally:
+		ring.close()
+
+if __name__ == "__main__":
+	test_windows_are_contiguous_across_wrap()
+	print("Ring buffer test success")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""The deadline scheduler must order its ladder from best to cheapest, step down when a decode
+misses the deadline, stay at the cheapest setting, and step back up only after a run of fast
+decodes, carrying incremental transcribers' committed words across level switches. Decode times
+come from a fake clock."""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from cicada.scheduler import DeadlineScheduler, TranscriptionSetting, default_ladder
+from cicada.speech import IncrementalTranscriber
+
+FS = 16000
+
+class _FakeClock:
+	def __init__(self): self.t = 0.0
+	def __call__(self) -> float: return self.t
+
+class _FakeTranscriber:
+	"""Takes the next scripted decode time on the fake clock."""
+	def __init__(self, model, setting, clock, l_decode_sec, l_calls):
+		self.model, self.setting, self.clock = model, setting, clock
+		self.l_decode_sec, self.l_calls = l_decode_sec, l_calls
+
+	def transcribe_window(self, window_audio, end_sam):
+		self.l_calls.append((self.setting, len(window_audio), end_sam))
+		self.clock.t += self.l_decode_sec.pop(0)
+		return self.model
+
+	def reset(self, end_sam): pass
+
+def test_default_ladder():
+	ladder = default_ladder("small.en", window_sec=10.0, hop_sec=3.0, beam_size=5)
+	assert ladder == [
+		TranscriptionSetting(10.0, 5, "small.en"),
+		TranscriptionSetting(10.0, 1, "small.en"),
+		TranscriptionSetting(6.0, 1, "small.en"),
+		TranscriptionSetting(6.0, 1, "base.en"),
+		TranscriptionSetting(6.0, 1, "tiny.en"),
+	]
+	assert [s.window_sec for s in default_ladder("tiny", window_sec=4.0, hop_sec=3.0)] == [4.0, 3.0] # never below one hop
+	assert default_ladder("tiny", window_sec=3.0, hop_sec=3.0) == [TranscriptionSetting(3.0, 1, "tiny")]
+
+def test_deadline_steps():
+	clock = _FakeClock()
+	l_loads, l_calls = [], []
+	l_decode_sec = [1.0, 2.5, 3.5, 2.9, 9.0, 9.0] + [1.0] * 3 + [2.0] + [1.0] * 3 + [0.5]
+	sched = DeadlineScheduler(
+		default_ladder("base.en", window_sec=10.0, hop_sec=3.0, beam_size=2),
+		load_model=lambda size: l_loads.append(size) or size,
+		make_transcriber=lambda model, setting: _FakeTranscriber(model, setting, clock, l_decode_sec, l_calls),
+		deadline_sec=3.0,
+		recover_frac=0.5,
+		recover_after=3,
+		fs_Hz=FS,
+		clock=clock,
+	)
+	n_decodes = len(l_decode_sec)
+	window = np.zeros(12 * FS, dtype=np.float32)
+	l_levels, l_texts = [], []
+	for i in range(n_decodes):
+		l_texts.append(sched.transcribe_window(window, (i + 12) * FS))
+		l_levels.append(sched.level)
+	assert l_levels == [
+		0, 0, 1, 1, # 3.5 s misses the deadline; 2.9 s does not
+		2, 3, # two more misses, down to tiny.en
+		3, 3, 2, # three decodes under half the deadline step back up one level
+		2, 2, 2, 1, # a 2.0 s decode restarts the run
+		1,
+	]
+	assert sched.n_missed == 3 and sched.n_decodes == n_decodes
+	assert l_texts == ["base.en"] * 6 + ["tiny.en"] * 3 + ["base.en"] * 5
+	assert l_loads == ["base.en", "tiny.en"] # each model loaded once
+	l_settings = [(s.window_sec, s.beam_size) for s, _, _ in l_calls[:6]]
+	assert l_settings == [(10.0, 2)] * 3 + [(10.0, 1)] * 2 + [(6.0, 1)]
+	assert [n for _, n, _ in l_calls[:6]] == [10 * FS] * 5 + [6 * FS] # the window is cut to the setting's length
+	assert abs(sched.last_rtf - 0.5 / 10.0) < 1e-9 # last decode: 0.5 s for a 10 s window
+
+def test_cheapest_setting_holds():
+	clock = _FakeClock()
+	l_calls = []
+	sched = DeadlineScheduler(
+		[TranscriptionSetting(3.0, 1, "tiny")],
+		load_model=lambda size: size,
+		make_transcriber=lambda model, setting: _FakeTranscriber(model, setting, clock, [5.0] * 3, l_calls),
+		deadline_sec=3.0,
+		fs_Hz=FS,
+		clock=clock,
+	)
+	for i in range(3):
+		sched.transcribe_window(np.zeros(FS, dtype=np.float32), (i + 1) * FS) # shorter than the setting's window
+	assert sched.level == 0 and sched.n_missed == 3
+	assert [n for _, n, _ in l_calls] == [FS] * 3
+
+class _WordModel:
+	"""Hears the next word of `l_words` 0.2-0.7 s into the audio it is given, which ends at
+	`stream.end_sec`, taking the next scripted decode time on the fake clock."""
+	def __init__(self, clock, stream, l_decode_sec, l_words, l_calls):
+		self.clock, self.stream = clock, stream
+		self.l_decode_sec, self.l_words, self.l_calls = l_decode_sec, l_words, l_calls
+
+	def transcribe(self, audio, initial_prompt=None, **kwargs):
+		self.l_calls.append((round(self.stream.end_sec - len(audio) / FS, 6), initial_prompt))
+		self.clock.t += self.l_decode_sec.pop(0)
+		words = [SimpleNamespace(word=" " + self.l_words.pop(0), start=0.2, end=0.7)]
+		return iter([SimpleNamespace(text=words[0].word, words=words)]), None
+
+def test_level_switch_keeps_timeline():
+	clock, stream = _FakeClock(), SimpleNamespace(end_sec=0.0)
+	l_calls = []
+	l_decode_sec, l_words = [5.0, 1.0, 1.0], ["one", "two", "three"]
+	sched = DeadlineScheduler(
+		[TranscriptionSetting(10.0, 1, "base.en"), TranscriptionSetting(6.0, 1, "tiny.en")],
+		load_model=lambda size: _WordModel(clock, stream, l_decode_sec, l_words, l_calls),
+		make_transcriber=lambda model, setting: IncrementalTranscriber(model, window_sec=setting.window_sec),
+		deadline_sec=3.0,
+		recover_after=1,
+		fs_Hz=FS,
+		clock=clock,
+	)
+	l_texts = []
+	for end_sec in (2, 4, 6):
+		stream.end_sec = end_sec
+		l_texts.append(sched.transcribe_window(np.zeros(end_sec * FS, dtype=np.float32), end_sec * FS))
+	assert [sched.level, sched.n_missed] == [0, 1]
+	assert l_texts == ["one", "one two", "one two three"] # down a level and back up, without losing words
+	assert l_calls == [(0.0, None), (1.0, "one"), (3.0, "one two")] # each level decodes on from the last committed word
+
+if __name__ == "__main__":
+	test_default_ladder()
+	test_deadline_steps()
+	test_cheapest_setting_holds()
+	test_level_switch_keeps_timeline()
+	print("Scheduler test success")
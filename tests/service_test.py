@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""The serve daemon must stream each job's output back to its own client, refuse jobs beyond
+its queue bound, and keep models loaded between jobs."""
+import sys
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import json
+from cicada import asr, interface, job_output, service
+
+def test_jobs_stream_and_queue_bound():
+	release = threading.Event()
+	def _echo(argv):
+		for a in argv:
+			print(f"[echo] {a}")
+		return Path("out") / "echo.md"
+	def _wait(argv):
+		print("[wait] started")
+		release.wait(10.0)
+	def _fail(argv):
+		print("partial line", end="")
+		raise RuntimeError("bad recording")
+	def _threads(argv): # prints from threads the job starts
+		with ThreadPoolExecutor(max_workers=2) as pool:
+			list(pool.map(job_output.carry_output(lambda a: print(f"[thread] {a}")), argv))
+	svc = service.VerificationService({"echo": _echo, "wait": _wait, "fail": _fail, "threads": _threads}, workers=1, max_queued=1)
+	server = service.make_server(svc, port=0)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	url = f"http://127.0.0.1:{server.server_address[1]}"
+	try:
+		l_events = list(service.submit(url, "echo", ["a", "b"]))
+		assert [e["event"] for e in l_events] == ["queued", "started", "log", "log", "done"]
+		assert [e["line"] for e in l_events if e["event"] == "log"] == ["[echo] a", "[echo] b"]
+		assert l_events[-1]["ok"] and l_events[-1]["output"] == str(Path("out") / "echo.md")
+		l_events = list(service.submit(url, "threads", ["x", "y"]))
+		assert sorted(e["line"] for e in l_events if e["event"] == "log") == ["[thread] x", "[thread] y"]
+
+		l_waiting = []
+		waiter = threading.Thread(target=lambda: l_waiting.extend(service.submit(url, "wait", [])))
+		waiter.start()
+		while svc.status()["running"] == 0:
+			release.wait(0.01)
+		queued = service.submit(url, "echo", ["c"]) # fills the queue of 1
+		assert next(queued)["ahead"] == 0
+		try:
+			list(service.submit(url, "echo", ["d"]))
+			raise AssertionError("job beyond the queue bound accepted")
+		except urllib.error.HTTPError as exc:
+			assert exc.code == 503
+		release.set()
+		waiter.join()
+		assert [e["line"] for e in queued if e["event"] == "log"] == ["[echo] c"]
+		assert [e["line"] for e in l_waiting if e["event"] == "log"] == ["[wait] started"]
+
+		l_events = list(service.submit(url, "fail", []))
+		assert not l_events[-1]["ok"] and l_events[-1]["error"] == "RuntimeError: bad recording"
+		l_lines = [e["line"] for e in l_events if e["event"] == "log"]
+		assert l_lines[0].startswith("partial lineTraceback") and l_lines[-1] == "RuntimeError: bad recording"
+		try:
+			list(service.submit(url, "sign", []))
+			raise AssertionError("unknown command accepted")
+		except urllib.error.HTTPError as exc:
+			assert exc.code == 400
+		with urllib.request.urlopen(f"{url}/status") as response:
+			status = json.loads(response.read())
+		assert (status["done"], status["failed"], status["rejected"], status["queued"]) == (4, 1, 1, 0)
+	finally:
+		server.shutdown()
+		server.server_close()
+		svc.shutdown()
+	assert not isinstance(sys.stdout, job_output.RoutedStream)
+
+def test_resident_models():
+	l_loads = []
+	asr.register_backend("counting-test")(lambda cfg: l_loads.append(cfg) or object())
+	cfg = asr.ASRConfig(backend="counting-test", model_size="tiny.en")
+	try:
+		asr.keep_models_resident()
+		assert asr.load_model(cfg) is asr.load_model(cfg)
+		assert asr.load_model(asr.ASRConfig(backend="counting-test", model_size="base.en")) is not asr.load_model(cfg)
+		assert len(l_loads) == 2
+		assert [c.model_size for c in asr.resident_models()] == ["tiny.en", "base.en"]
+	finally:
+		asr._RESIDENT_MODELS = None
+		del asr._BACKENDS["counting-test"]
+
+def test_verify_jobs_do_not_fork():
+	import serve
+	try:
+		serve._verify_job(["recording.wav", "--jobs", "2"])
+		raise AssertionError("verify --jobs accepted in a serve job")
+	except SystemExit as exc:
+		assert exc.code == 2
+
+def test_jobs_do_not_plot():
+	import serve
+	l_argv = []
+	main, serve.extract.main = serve.extract.main, l_argv.append
+	try:
+		serve._extract_job(["recording.wav"])
+		assert interface.build_extract_parser().parse_args(l_argv[0]).demod_plot is False # shared out-dirs, figures held per job
+		for job in (serve._extract_job, serve._verify_job):
+			try:
+				job(["recording.wav", "--demod-plot"])
+				raise AssertionError("--demod-plot accepted in a serve job")
+			except SystemExit as exc:
+				assert exc.code == 2
+	finally:
+		serve.extract.main = main
+
+if __name__ == "__main__":
+	test_jobs_stream_and_queue_bound()
+	test_resident_models()
+	test_verify_jobs_do_not_fork()
+	test_jobs_do_not_plot()
+	print("Service test success")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Headless sign → mix → extract → verify loop using virtual audio devices.
+Usage: tests/sign_loopback.py speech.wav [out_dir]
+Signs speech.wav as if it were the mic (as fast as Whisper allows), mixes the
+transmissions back into the speech as a recording would, then extracts and
+verifies the mix. Needs a BLS keypair (make_bls_keys.py) in the working directory.
+"""
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import time
+import sign as sign_cli
+import verify as verify_cli
+from cicada import audio_io
+
+MODEL_SIZE = "base.en"
+WINDOW_SEC = 10.0
+OVERLAP_SEC = 3.0
+TX_GAIN = 0.3 # transmissions relative to the speech in the mix
+
+def main():
+	speech_wav = Path(sys.argv[1])
+	out_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path("out")
+	out_dir.mkdir(parents=True, exist_ok=True)
+	tx_wav = (out_dir / f"{speech_wav.stem}_tx.wav").resolve()
+	mix_wav = out_dir / f"{speech_wav.stem}_loopback.wav"
+
+	t0 = time.monotonic()
+	sign_cli.main([
+		"--out-dir", str(out_dir),
+		"--mic-wav", str(speech_wav),
+		"--speaker-wav", str(tx_wav),
+		"--model-size", MODEL_SIZE,
+		"--window-sec", str(WINDOW_SEC),
+		"--overlap-sec", str(OVERLAP_SEC),
+	])
+	t_sign = time.monotonic() - t0
+	mix = audio_io.mix_wavs([speech_wav, tx_wav], mix_wav, gains=[1.0, TX_GAIN])
+	print(f"[loopback] signed {len(mix)/44100:.1f}s of audio in {t_sign:.1f}s; mixed into {mix_wav}")
+
+	verify_cli.main([
+		str(mix_wav),
+		"--out-dir", str(out_dir),
+		"--model-size", MODEL_SIZE,
+	])
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""SignatureVerifier must agree with a fresh blst.Pairing per check, run one Miller loop per
+signature and per distinct window instead of two per check, batch-check archived matches with
+N + 1 Miller loops, bisecting to find bad entries, and only run pairings on windows with a
+version 2 header's digest. Run as a script for a checks/s benchmark against blst.Pairing."""
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import blst
+from cicada.payload.signature import DST, SignaturePayload, SignaturePayloadHeader, SignatureVerifier, count_checks, get_verifier, regularize_transcript, window_messages
+
+WORDS = "we hold these truths to be self evident that all men are created equal that they are endowed".split()
+
+def _keypair():
+	privkey = blst.SecretKey()
+	privkey.keygen(b"*" * 32)
+	return privkey, blst.P2(privkey).serialize()
+
+def _pairing_verify(sig_bytes, msg, pubkey_bytes) -> bool:
+	ctx = blst.Pairing(True, DST)
+	ctx.aggregate(blst.P2_Affine(pubkey_bytes), blst.P1_Affine(bytearray(sig_bytes)), msg, pubkey_bytes)
+	ctx.commit()
+	return ctx.finalverify()
+
+def test_verifier_matches_pairing():
+	privkey, pubkey_bytes = _keypair()
+	pl = SignaturePayload.from_transcript(" ".join(WORDS[3:11]), header_message="q3q.net", bls_privkey=privkey, bls_pubkey_bytes=pubkey_bytes, timestamp=1700000000)
+	verifier = SignatureVerifier(pubkey_bytes)
+	l_tokens = regularize_transcript(" ".join(WORDS))
+	l_windows = list(window_messages(pl.header.to_bytes(), l_tokens, pl.header.word_count))
+	assert [verifier.verify(pl.bls_signature, msg) for _, msg in l_windows] == [_pairing_verify(pl.bls_signature, msg, pubkey_bytes) for _, msg in l_windows]
+	assert [idx for idx, msg in l_windows if verifier.verify(pl.bls_signature, msg)] == [3]
+	assert pl.match_to_chunk(" ".join(WORDS), bls_pubkey_bytes=pubkey_bytes) == 3
+	assert not verifier.verify(b"\x00" * 48, l_windows[3][1]) # malformed signature
+	try:
+		SignatureVerifier(b"\x00" * 96)
+		raise AssertionError("invalid public key accepted")
+	except ValueError:
+		pass
+
+def _unrelated_windows():
+	privkey, pubkey_bytes = _keypair()
+	pl = SignaturePayload.from_transcript("unrelated words", header_message="q3q.net", bls_privkey=privkey, bls_pubkey_bytes=pubkey_bytes, timestamp=1700000000)
+	l_msgs = [msg for _, msg in window_messages(pl.header.to_bytes(), regularize_transcript(" ".join(WORDS)), 2)]
+	return pl, pubkey_bytes, l_msgs
+
+def test_verifier_reuses_miller_loops():
+	pl, pubkey_bytes, l_msgs = _unrelated_windows()
+	verifier = SignatureVerifier(pubkey_bytes)
+	assert not any(verifier.verify(pl.bls_signature, msg) for msg in l_msgs)
+	n_distinct = len(set(l_msgs))
+	assert (verifier.n_miller_loops, verifier.n_final_exps) == (1 + n_distinct, len(l_msgs)) # a fresh Pairing runs 2 per check
+	n_rounds = 4 # overlapping chunks check the same windows repeatedly
+	for _ in range(n_rounds):
+		for msg in l_msgs: verifier.verify(pl.bls_signature, msg)
+	assert (verifier.n_miller_loops, verifier.n_final_exps) == (1 + n_distinct, (n_rounds + 1) * len(l_msgs))
+
+def benchmark(n_rounds: int = 5):
+	pl, pubkey_bytes, l_msgs = _unrelated_windows()
+	t0 = time.perf_counter()
+	for _ in range(n_rounds):
+		for msg in l_msgs: _pairing_verify(pl.bls_signature, msg, pubkey_bytes)
+	t_pairing = time.perf_counter() - t0
+	verifier = SignatureVerifier(pubkey_bytes)
+	t0 = time.perf_counter()
+	for _ in range(n_rounds):
+		for msg in l_msgs: verifier.verify(pl.bls_signature, msg)
+	t_verifier = time.perf_counter() - t0
+	n = n_rounds * len(l_msgs)
+	print(f"checks/s: Pairing {n / t_pairing:.0f}, SignatureVerifier {n / t_verifier:.0f}")
+
+def test_shared_between_threads():
+	privkey, pubkey_bytes = _keypair()
+	pl = SignaturePayload.from_transcript(" ".join(WORDS[3:11]), header_message="q3q.net", bls_privkey=privkey, bls_pubkey_bytes=pubkey_bytes, timestamp=1700000000)
+	l_msgs = [msg for _, msg in window_messages(pl.header.to_bytes(), regularize_transcript(" ".join(WORDS)), pl.header.word_count)]
+	verifier = SignatureVerifier(pubkey_bytes, max_cached_messages=3) # constant eviction
+	d_results = {}
+	def _job(name, n_rounds):
+		with count_checks() as checks:
+			l_valid = [verifier.verify(pl.bls_signature, msg) for _ in range(n_rounds) for msg in l_msgs]
+		d_results[name] = (l_valid.count(True), checks.n_final_exps)
+	l_threads = [threading.Thread(target=_job, args=(i, 20 + i)) for i in range(4)]
+	for thread in l_threads:
+		thread.start()
+	for thread in l_threads:
+		thread.join()
+	assert d_results == {i: (20 + i, (20 + i) * len(l_msgs)) for i in range(4)} # each job counts its own checks
+	assert verifier.n_final_exps == sum(n for _, n in d_results.values())
+	assert len(verifier._msg_gt) <= 3
+
+def test_batch_verification():
+	privkey, pubkey_bytes = _keypair()
+	l_payloads, l_signed_tokens = [], []
+	for i in range(8):
+		l_tokens = [t.text for t in regularize_transcript(" ".join(WORDS[i:(i + 6)]))]
+		l_payloads.append(SignaturePayload.from_transcript(" ".join(l_tokens), header_message="q3q.net", bls_privkey=privkey, bls_pubkey_bytes=pubkey_bytes, timestamp=1700000000 + i))
+		l_signed_tokens.append(l_tokens)
+	with tempfile.TemporaryDirectory() as d:
+		path = Path(d) / "rec_matches.csv"
+		SignaturePayload.write_matches_csv(l_payloads, list(range(8)), l_signed_tokens, path)
+		l_payloads, l_sam_idx, l_signed_tokens = SignaturePayload.load_matches_csv(path)
+	assert l_sam_idx == list(range(8)) and l_signed_tokens[2] == WORDS[2:8]
+	l_pairs = [(bytes(pl.bls_signature), pl.signed_message(l_tokens)) for pl, l_tokens in zip(l_payloads, l_signed_tokens)]
+	verifier = SignatureVerifier(pubkey_bytes)
+	assert verifier.find_invalid(l_pairs) == []
+	assert (verifier.n_miller_loops, verifier.n_final_exps) == (len(l_pairs) + 1, 1)
+	l_pairs[3] = (l_pairs[3][0], l_pairs[4][1]) # signature over other words
+	l_pairs[6] = (b"\x00" * 48, l_pairs[6][1]) # malformed signature
+	assert verifier.find_invalid(l_pairs) == [3, 6]
+	assert [i for i, (sig, msg) in enumerate(l_pairs) if not verifier.verify(sig, msg)] == [3, 6]
+
+def test_payload_version_2():
+	privkey, pubkey_bytes = _keypair()
+	chunk_text = " ".join(WORDS)
+	pl_v1 = SignaturePayload.from_transcript(" ".join(WORDS[3:11]), header_message="q3q.net", bls_privkey=privkey, bls_pubkey_bytes=pubkey_bytes, timestamp=1700000000)
+	pl_v2 = SignaturePayload.from_transcript(" ".join(WORDS[3:11]), header_message="example.org", bls_privkey=privkey, bls_pubkey_bytes=pubkey_bytes, timestamp=1700000000, payload_version=2)
+	frame_v1, frame_v2 = pl_v1.to_bytes(), pl_v2.to_bytes()
+	assert len(frame_v1) == len(frame_v2) == 64
+	assert frame_v1[4] == 8 and (frame_v2[4], frame_v2[5]) == (0, 8)
+	rx_v1, rx_v2 = SignaturePayload.from_bytes(frame_v1), SignaturePayload.from_bytes(frame_v2)
+	assert (rx_v1.header.version, rx_v1.header.message) == (1, "q3q.net")
+	assert (rx_v2.header.version, rx_v2.header.word_count, rx_v2.header.message) == (2, 8, "example") # message cut to 7 characters
+	assert rx_v2.header.digest == pl_v2.header.digest and len(rx_v2.header.digest) == 3
+	verifier = get_verifier(pubkey_bytes)
+	n0 = verifier.n_final_exps
+	assert rx_v1.match_to_chunk(chunk_text, bls_pubkey_bytes=pubkey_bytes) == 3
+	n1 = verifier.n_final_exps
+	assert rx_v2.match_to_chunk(chunk_text, bls_pubkey_bytes=pubkey_bytes) == 3
+	assert n1 - n0 == 4 and verifier.n_final_exps - n1 == 1 # only the window with the digest is paired
+	assert rx_v2.match_to_chunk(" ".join(WORDS[:10] + ["x"] + WORDS[11:]), bls_pubkey_bytes=pubkey_bytes) == -1
+	with tempfile.TemporaryDirectory() as tmp:
+		SignaturePayload.write_csv([rx_v1, rx_v2], [0, 1], Path(tmp) / "frames.csv")
+		l_payloads, _ = SignaturePayload.load_csv(Path(tmp) / "frames.csv")
+	assert [pl.to_bytes() for pl in l_payloads] == [frame_v1, frame_v2]
+
+	for word_count in (1, 127, 128, 130, 255): # every version 1 word count reads back as version 1
+		hdr = SignaturePayloadHeader.from_bytes(SignaturePayloadHeader(1700000000, word_count, "q3q.net").to_bytes())
+		assert (hdr.version, hdr.word_count, hdr.message) == (1, word_count, "q3q.net")
+	long_text = " ".join(f"w{i}" for i in range(200))
+	pl_long = SignaturePayload.from_transcript(long_text, header_message="q3q.net", bls_privkey=privkey, bls_pubkey_bytes=pubkey_bytes, timestamp=1700000000, payload_version=2)
+	rx_long = SignaturePayload.from_bytes(pl_long.to_bytes())
+	assert (rx_long.header.version, rx_long.header.word_count) == (2, 200)
+	assert rx_long.match_to_chunk("x " + long_text, bls_pubkey_bytes=pubkey_bytes) == 1
+	for text in ("", "...", " ".join(["w"] * 256)):
+		try:
+			SignaturePayload.from_transcript(text, header_message="q3q.net", bls_privkey=privkey, bls_pubkey_bytes=pubkey_bytes)
+			raise AssertionError(f"{len(text.split())} words signed")
+		except ValueError:
+			pass
+
+if __name__ == "__main__":
+	test_verifier_matches_pairing()
+	test_verifier_reuses_miller_loops()
+	test_shared_between_threads()
+	test_batch_verification()
+	test_payload_version_2()
+	benchmark()
+	print("Signature verifier test success")
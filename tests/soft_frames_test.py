@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""The soft frames extract stores must decode to the same payloads as the recording did, and
+decode must re-run FEC and payload parsing from them alone."""
+import sys
+import tempfile
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import soundfile as sf
+import decode
+import extract
+from cicada import interface, payload
+from cicada.soft_frames import SoftFrames, quantize
+
+PLAINTEXT_CLASS = payload.Payload.get_class("plaintext")
+
+def test_quantize():
+	a = np.array([-3.0, 0.0, 0.01, 2.5])
+	q, scale = quantize(a)
+	assert q.dtype == np.int8 and q[0] == -127
+	assert np.max(np.abs(q * scale - a)) <= scale / 2
+	assert quantize(np.zeros(4))[1] == 1.0
+
+def test_extract_then_decode():
+	with tempfile.TemporaryDirectory() as tmp:
+		tmp = Path(tmp)
+		modem, wf, _ = interface.build_modem(interface.build_extract_parser().parse_args(["x.wav", "--demod-no-plot"]), tmp)
+		l_texts = [f"soft frame {i} of three" for i in range(3)]
+		l_segments = [np.zeros(4410, dtype=np.float32)]
+		for text in l_texts:
+			l_segments += [modem.modulate_bytes(PLAINTEXT_CLASS.from_transcript(text).to_bytes()), np.zeros(5000, dtype=np.float32)]
+		signal = np.concatenate(l_segments)
+		rng = np.random.default_rng(0)
+		noise = rng.normal(0.0, np.sqrt(np.mean(signal[signal != 0] ** 2) * 10 ** 0.9), signal.shape) # -9 dB
+		sf.write(tmp / "rec.wav", (signal + noise).astype(np.float32), int(wf.fs_Hz))
+
+		frames_csv = extract.main([str(tmp / "rec.wav"), "--payload-type", "plaintext", "--out-dir", str(tmp), "--demod-no-plot", "--start", "0.05"])
+		soft = SoftFrames.load(tmp / "rec_soft.npz")
+		assert len(soft) >= 3 and soft.bit_llrs_q.dtype == np.int8 and soft.bit_llrs_q.shape[1] == 1024
+		assert soft.settings["wf_fs"] == wf.fs_Hz and soft.settings["input"] == str(tmp / "rec.wav")
+		assert np.all(soft.start_idx >= int(0.05 * wf.fs_Hz)) # on the whole recording's timeline
+
+		decoded_csv = decode.main([str(tmp / "rec_soft.npz"), "--payload-type", "plaintext", "--out-dir", str(tmp), "--output-csv", "again.csv"])
+		assert decoded_csv.read_text() == frames_csv.read_text()
+		l_payloads = PLAINTEXT_CLASS.load_csv(decoded_csv)[0]
+		assert [pl.content.rstrip("\x00") for pl in l_payloads] == l_texts
+
+if __name__ == "__main__":
+	test_quantize()
+	test_extract_then_decode()
+	print("Soft frames test success")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Tests for cutting verify's overlapping transcript chunks from a single-pass word timeline."""
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from scipy.io import wavfile
+from cicada.speech import TimedWord
+from cicada.verification import cut_timeline_chunks, wav_to_timeline_chunks
+
+def test_chunks_follow_window_layout():
+	l_words = [TimedWord(f"w{i}", i + 0.1, i + 0.6) for i in range(30)] # one word per second
+	l_chunks = cut_timeline_chunks(l_words, duration_sec=30.0, window_sec=10.0, overlap_sec=6.0)
+	assert [c.start_sec for c in l_chunks] == [0.0, 4.0, 8.0, 12.0, 16.0, 20.0, 24.0, 28.0]
+	assert l_chunks[0].text == " ".join(f"w{i}" for i in range(10))
+	assert l_chunks[1].text.split()[0] == "w4" and l_chunks[1].text.split()[-1] == "w13"
+	assert l_chunks[-1].text == "w28 w29" and l_chunks[-1].end_sec == 30.0
+	for c in l_chunks: # every word lands in each window covering its midpoint
+		assert all(c.start_sec <= int(w[1:]) + 0.35 < c.start_sec + 10.0 for w in c.text.split())
+
+class _TimelineModel:
+	"""Hears one word a second, with word timestamps."""
+	def transcribe(self, audio, word_timestamps=False, **kwargs):
+		assert word_timestamps
+		l_words = [SimpleNamespace(word=f" w{i}", start=i + 0.1, end=i + 0.6) for i in range(int(len(audio) / 16000))]
+		return iter([SimpleNamespace(text="".join(w.word for w in l_words), words=l_words)]), None
+
+def test_wav_to_timeline_chunks():
+	with tempfile.TemporaryDirectory() as d:
+		path = Path(d) / "rec.wav"
+		wavfile.write(path, 44100, np.zeros(20 * 44100, dtype=np.int16))
+		l_chunks, wav_fs_Hz = wav_to_timeline_chunks(path, _TimelineModel(), window_sec=10.0, overlap_sec=6.0)
+	assert wav_fs_Hz == 44100
+	assert [c.start_sec for c in l_chunks] == [0.0, 4.0, 8.0, 12.0, 16.0] and l_chunks[-1].end_sec == 20.0
+	assert l_chunks[2].text == " ".join(f"w{i}" for i in range(8, 18)) and l_chunks[2].words[0] == TimedWord("w8", 8.1, 8.6)
+
+if __name__ == "__main__":
+	test_chunks_follow_window_layout()
+	test_wav_to_timeline_chunks()
+	print("Timeline chunks test success")
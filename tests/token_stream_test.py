@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Merging overlapping chunk transcripts into one token stream, and matching payloads against it once."""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+from cicada.payload.signature import regularize_transcript
+from cicada.speech import TimedWord
+from cicada.token_stream import TokenStream, match_payloads, render_markdown
+from cicada.verification import TimelineChunk
+
+WORD_SEC = 0.4
+WORDS = [f"word{chr(ord('a') + i % 26)}{chr(ord('a') + i // 26)}" for i in range(60)]
+
+class FakePayload:
+	"""Matches the window of its signed tokens; counts window checks."""
+	n_checks = 0
+
+	def __init__(self, l_signed):
+		self.l_signed = l_signed
+		self.header = SimpleNamespace(word_count=len(l_signed))
+
+	def match_runs(self, runs, **kwargs):
+		msg = b"".join(w.encode("utf-8") + b"\x00" for w in self.l_signed)
+		for i, run in enumerate(runs):
+			FakePayload.n_checks += 1
+			if run == msg:
+				return i
+		return -1
+
+	def make_footnote(self, slug, start_sam, wav_fs_Hz=44100.0):
+		return f"[{slug}]: payload at {start_sam / wav_fs_Hz:.2f} s"
+
+def _chunks(n_window=20, n_shift=5, misread=(4, 32, "wordmisread")):
+	l_chunks = []
+	for ichunk, i0 in enumerate(range(0, len(WORDS) - n_window + n_shift, n_shift)):
+		l_words = []
+		for i in range(i0, min(i0 + n_window, len(WORDS))):
+			text = misread[2] if (ichunk, i) == misread[:2] else WORDS[i]
+			l_words.append(TimedWord(text, i * WORD_SEC, (i + 1) * WORD_SEC))
+		l_chunks.append(TimelineChunk(" ".join(w.text for w in l_words), l_words[0].start, l_words[-1].end, l_words))
+	return l_chunks
+
+def test_merge_deduplicates_and_keeps_alternates():
+	l_chunks = _chunks()
+	stream = TokenStream.from_chunks(l_chunks, regularize_transcript)
+	assert [t.text for t in stream.tokens] == WORDS # every word once, the majority reading at the misread word
+	assert all(a.start <= b.start for a, b in zip(stream.tokens, stream.tokens[1:]))
+	l_windows = stream.windows(5)
+	assert len(l_windows) == (len(WORDS) - 5 + 1) + 5 # the stream's windows, plus the five covering the misread word
+	assert all(w.alternate == (b"wordmisread" in w.run) for w in l_windows)
+	l_near = stream.candidate_windows(5, (12.0, 14.4))
+	assert [w.first.start for w in l_near] == [12.0, 12.4, 12.0, 12.4] and sum(w.alternate for w in l_near) == 2
+
+def test_match_once_and_render():
+	l_chunks = _chunks()
+	stream = TokenStream.from_chunks(l_chunks, regularize_transcript)
+	fs = 100
+	l_payloads = [FakePayload(WORDS[10:15]), FakePayload(WORDS[30:32] + ["wordmisread"] + WORDS[33:35]), FakePayload(["wordzz"] * 5)]
+	l_starts = [6 * fs, 14 * fs, 20 * fs]
+	FakePayload.n_checks = 0
+	kwargs = {"localize": False}
+	d_matches = match_payloads(stream, l_payloads, l_starts, kwargs, fs)
+	assert sorted(d_matches) == [0, 1]
+	assert d_matches[0].token.text == WORDS[10] and not d_matches[0].alternate
+	assert d_matches[1].token.text == WORDS[30] and d_matches[1].alternate
+	n_per_chunk = sum(len(c.words) - 5 + 1 for c in l_chunks)
+	assert FakePayload.n_checks <= 3 * len(stream.windows(5)) and 2 * len(stream.windows(5)) < n_per_chunk # each distinct window once, not once per chunk it appears in
+	md = render_markdown(stream, l_chunks, d_matches, l_payloads, l_starts, fs)
+	assert md.count("[1]") == 2 and md.count("[2]") == 2 and "[3]" not in md
+	assert sum(md.count(w) for w in WORDS) == len(WORDS) # deduplicated transcript
+	assert "another chunk's reading" in md
+
+	FakePayload.n_checks = 0
+	kwargs = {"localize": True, "signer_window_sec": 3.0, "localize_slack_sec": 1.0}
+	assert sorted(match_payloads(stream, l_payloads, l_starts, kwargs, fs)) == [0, 1]
+	assert FakePayload.n_checks < 30
+
+if __name__ == "__main__":
+	test_merge_deduplicates_and_keeps_alternates()
+	test_match_once_and_render()
+	print("Token stream test success")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Memoized transcript regularization must match the original token by token.
+Run as a script for a microbenchmark on a one-hour transcript."""
+import sys
+import random
+import re
+import time
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import number_parser
+from cicada.payload.signature import EncodedTokens, regularize_token, regularize_transcript, window_messages
+
+VOCAB = (
+	"the of and to a in that is was he for it with as his on be at by i this had not are but from or have an they which one you were "
+	"her all she there would their we him been has when who will more no if out so said what up its about into than them can only "
+	"other new some could time these two may then do first any my now such like our over man me even most made after also did many "
+	"before must through back years where much your way well down should because each just those people mr how too little state good "
+	"very make world still own see men work long get here between both life being under never day same another know while last might "
+	"us great old year off come since against go came right used take three twenty-five forty self-evident o'clock don't it's U.S."
+).split()
+WORDS_PER_SEC = 2.5
+
+def make_transcript(n_words: int, seed: int = 0) -> str:
+	rng = random.Random(seed)
+	l_words = []
+	for i in range(n_words):
+		w = rng.choice(VOCAB)
+		if rng.random() < 0.1: w = w.capitalize()
+		if rng.random() < 0.08: w += rng.choice(".,?!—")
+		l_words.append(w)
+	return " ".join(l_words)
+
+def reference_regularize(s):
+	"""The original, unmemoized regularize_transcript: (token, index) pairs."""
+	for dash in ("-", "–", "—"): s = s.replace(dash, " ")
+	l_out = []
+	for m in re.finditer(r"\S+", s):
+		tok = re.sub(r"[^a-z0-9]", "", number_parser.parser.parse(m.group().lower()))
+		if len(tok) > 0: l_out.append((tok, m.start()))
+	return l_out
+
+def reference_message(header_bytes: bytes, l_tokens, idx: int, word_count: int) -> bytes:
+	msg = bytearray(header_bytes)
+	for tok in l_tokens[idx:(idx + word_count)]:
+		msg += (tok.text.encode("utf-8") + b"\x00")
+	return bytes(msg)
+
+def test_memoized_regularization_matches_reference():
+	text = make_transcript(300, seed=1)
+	l_tokens = regularize_transcript(text)
+	assert [(t.text, t.idx) for t in l_tokens] == reference_regularize(text)
+	assert regularize_token("Twenty") == "20" and regularize_token("U.S.") == "us"
+	header = b"\x65\x00\x00\x00\x19q3q.net\x00\x00\x00\x00"
+	enc = EncodedTokens(l_tokens)
+	for idx, msg in window_messages(header, enc, 25):
+		assert msg == reference_message(header, l_tokens, idx, 25)
+
+def benchmark(duration_sec: float = 3600.0, window_sec: float = 20.0, overlap_sec: float = 16.0, tx_every_sec: float = 7.0, word_count: int = 25):
+	n_words = int(duration_sec * WORDS_PER_SEC)
+	l_text = make_transcript(n_words).split()
+	n_chunk_words = int(window_sec * WORDS_PER_SEC)
+	n_shift = int((window_sec - overlap_sec) * WORDS_PER_SEC)
+	l_chunks = [" ".join(l_text[i:(i + n_chunk_words)]) for i in range(0, n_words, n_shift)]
+	n_payloads = int(duration_sec / tx_every_sec)
+	print(f"{duration_sec / 60:.0f} min transcript: {n_words} words, {len(l_chunks)} chunks, {n_payloads} payloads")
+
+	l_sample = l_chunks[:20] # the original path is far too slow to run in full
+	t0 = time.perf_counter()
+	for chunk in l_sample: reference_regularize(chunk)
+	t_ref_chunk = (time.perf_counter() - t0) / len(l_sample)
+	print(f"original: {1e3 * t_ref_chunk:.1f} ms per chunk tokenization, re-tokenized per payload: ~{t_ref_chunk * len(l_chunks) * n_payloads / 3600:.1f} h")
+
+	regularize_token.cache_clear()
+	t0 = time.perf_counter()
+	l_tokenized = [regularize_transcript(chunk) for chunk in l_chunks]
+	t_new = time.perf_counter() - t0
+	info = regularize_token.cache_info()
+	print(f"memoized: every chunk once in {t_new:.2f} s ({1e3 * t_new / len(l_chunks):.2f} ms per chunk; {info.hits} hits, {info.misses} misses)")
+
+	header = b"\x65\x00\x00\x00\x19q3q.net\x00\x00\x00\x00"
+	t0 = time.perf_counter()
+	n_msgs = 0
+	for l_tokens in l_tokenized:
+		for idx in range(len(l_tokens) - word_count + 1):
+			reference_message(header, l_tokens, idx, word_count)
+			n_msgs += 1
+	t_bytearray = time.perf_counter() - t0
+	t0 = time.perf_counter()
+	for l_tokens in l_tokenized:
+		for _ in window_messages(header, EncodedTokens(l_tokens), word_count): pass
+	t_prefix = time.perf_counter() - t0
+	print(f"window messages ({n_msgs}, per payload pass): bytearray += {1e6 * t_bytearray / n_msgs:.2f} us, prefix slices {1e6 * t_prefix / n_msgs:.2f} us")
+
+if __name__ == "__main__":
+	test_memoized_regularization_matches_reference()
+	benchmark()
+	print("Tokenize benchmark test success")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Tests for the on-disk verify transcript cache."""
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import os
+import tempfile
+from cicada.transcript_cache import TranscriptCache
+
+def test_keys_and_lru_eviction():
+	with tempfile.TemporaryDirectory() as d:
+		cache = TranscriptCache(Path(d), max_bytes=3500) # room for three entries
+		k1 = cache.make_key("aa", model_size="base", window_sec=20.0)
+		assert k1 == cache.make_key("aa", window_sec=20.0, model_size="base")
+		assert k1 != cache.make_key("aa", model_size="small", window_sec=20.0)
+		assert k1 != cache.make_key("ab", model_size="base", window_sec=20.0)
+		assert cache.get(k1) is None
+		entry = {"chunks": [["x" * 1000, 0.0, 20.0]]}
+		l_keys = [cache.make_key(f"{i}") for i in range(3)]
+		for i, k in enumerate(l_keys): # ~1 kB each, oldest first
+			cache.put(k, entry)
+			os.utime(cache._path(k), (1000 + i, 1000 + i))
+		assert cache.get(l_keys[0]) == entry # touching makes it the most recent
+		cache.put(k1, entry) # over budget: evicts the least recently used (l_keys[1])
+		assert cache.get(l_keys[1]) is None
+		assert cache.get(l_keys[0]) == entry and cache.get(k1) == entry
+
+if __name__ == "__main__":
+	test_keys_and_lru_eviction()
+	print("Transcript cache test success")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""StreamTransmitter must keep only the newest payload waiting (replacing one not yet rendered or
+not yet on air and counting it dropped), play transmissions whole across callbacks with silence
+in between, and count the stream's xruns. Runs the audio callback by hand, without a device."""
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from cicada import audio_io
+from cicada.transmitter import StreamTransmitter
+
+FS = 1000.0
+BLOCK = 100
+N_SAM = 250 # samples per transmission: 2.5 blocks
+
+class _ManualStream:
+	def __init__(self, callback):
+		self.callback = callback
+		self.t = 0.0
+
+	def start(self): pass
+	def stop(self): pass
+	def close(self): pass
+
+	def pull(self, status=None) -> np.ndarray:
+		outdata = np.full((BLOCK, 1), np.nan, dtype=np.float32)
+		self.callback(outdata, BLOCK, SimpleNamespace(currentTime=self.t, outputBufferDacTime=self.t + 0.05), status)
+		self.t += BLOCK / FS
+		return outdata[:, 0]
+
+class _ManualOutput(audio_io.ArrayOutput):
+	"""An output whose callback the test calls."""
+	def open(self, samplerate, blocksize, callback, channels=1):
+		self.stream = _ManualStream(callback)
+		return self.stream
+
+class _GatedRender:
+	"""Renders payload byte b as N_SAM samples of b / 100, once `gate` is set."""
+	def __init__(self):
+		self.gate = threading.Event()
+		self.started = threading.Semaphore(0)
+		self.l_rendered = []
+
+	def __call__(self, pl_bytes: bytes) -> np.ndarray:
+		self.started.release()
+		assert self.gate.wait(5.0)
+		self.l_rendered.append(pl_bytes)
+		return np.full(N_SAM, pl_bytes[0] / 100)
+
+def _transmitter():
+	render = _GatedRender()
+	device = _ManualOutput()
+	tx = StreamTransmitter(SimpleNamespace(wf=SimpleNamespace(fs_Hz=FS)), render=render, blocksize=BLOCK, device=device).start()
+	return tx, render, device.stream
+
+def test_newest_payload_wins():
+	tx, render, stream = _transmitter()
+	try:
+		tx.submit(b"\x01")
+		assert render.started.acquire(timeout=5.0) # 1 is rendering...
+		tx.submit(b"\x02")
+		tx.submit(b"\x03") # ...2 is replaced before it is rendered...
+		render.gate.set()
+		assert tx.wait_rendered(5.0)
+		assert render.l_rendered == [b"\x01", b"\x03"] and tx.n_dropped == 2 # ...and 1 goes stale while rendering
+		tx.submit(b"\x04") # replaces 3, rendered but not yet on air
+		assert tx.wait_rendered(5.0) and tx.n_dropped == 3
+
+		out = np.concatenate([stream.pull() for _ in range(4)])
+		assert np.allclose(out[:N_SAM], 0.04) and np.all(out[N_SAM:] == 0.0)
+		assert not tx.busy
+		l_events = tx.drain_events()
+		assert len(l_events) == 1 and l_events[0].n_dropped == 3
+		assert l_events[0].latency_sec >= l_events[0].playback_sec >= 0.05 # includes the output latency
+	finally:
+		tx.stop()
+
+def test_back_to_back_and_xruns():
+	tx, render, stream = _transmitter()
+	render.gate.set()
+	try:
+		tx.submit(b"\x05")
+		assert tx.wait_rendered(5.0)
+		first = stream.pull() # 5 goes on air; the next one renders while it plays
+		tx.submit(b"\x06")
+		assert tx.wait_rendered(5.0)
+		out = np.concatenate([first] + [stream.pull(status="output underflow" if i == 1 else None) for i in range(5)])
+		assert np.allclose(out[:N_SAM], 0.05) and np.allclose(out[N_SAM:(2 * N_SAM)], 0.06) # no gap between them
+		assert np.all(out[(2 * N_SAM):] == 0.0)
+		assert tx.n_dropped == 0 and tx.n_xruns == 1
+		l_events = tx.drain_events()
+		assert [ev.n_dropped for ev in l_events] == [0, 0] and l_events[1].jitter_sec < 1e-9 # started as 5 ended
+	finally:
+		tx.stop()
+
+if __name__ == "__main__":
+	test_newest_payload_wins()
+	test_back_to_back_and_xruns()
+	print("Transmitter test success")
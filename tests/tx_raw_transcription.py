@@ -8,11 +8,11 @@ if str(ROOT) not in sys.path:
 
 import queue
 import threading
-import sounddevice as sd
 from faster_whisper import WhisperModel
 
 from cicada import payload, speech
 from cicada.modem import Modem
+from cicada.transmitter import StreamTransmitter
 from cicada.fsk.waveform import FSKWaveform, FSKParameters, default_mod_table
 from cicada.fsk.demodulator import FSKDemodulator, FSKDemodulatorParameters
 
@@ -33,7 +33,7 @@ transcript_writer = speech.TranscriptLogger(transcript_path)
 model = WhisperModel(model_size, compute_type="float32")
 
 q_mic = queue.Queue()
-q_transcripts = queue.Queue()
+q_transcripts = queue.Queue(maxsize=1)
 t_mic = threading.Thread(target=speech.mic_worker, args=(q_mic,), daemon=True)
 t_transcriber = threading.Thread(
 	target=speech.audio_transcript_worker,
@@ -46,22 +46,18 @@ t_transcriber = threading.Thread(
 	},
 	daemon=True,
 )
+transmitter = StreamTransmitter(modem)
 t_mic.start()
 t_transcriber.start()
+transmitter.start()
 
 print("[tx] capturing mic, transcribing, and transmitting plaintext payloads...")
 while True:
-	chunk_text = None
-	try:
-		while True:
-			chunk_text = q_transcripts.get_nowait()
-	except queue.Empty:
-		pass
-	if chunk_text is None:
-		chunk_text = q_transcripts.get()
+	item = q_transcripts.get()
+	if item is None: break
+	chunk_text, t_window_end = item
 	print(f"[tx] {chunk_text}")
 
 	pl = payload_cls.from_transcript(chunk_text)
-	samples = modem.modulate_bytes(pl.to_bytes())
-	sd.play(samples, wf.fs_Hz)
-	sd.wait()
+	transmitter.submit(pl.to_bytes(), t_submit=t_window_end)
+	transmitter.drain_events()
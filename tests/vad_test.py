@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""The signer's VAD must find tone bursts over a noise floor (padded, short clicks dropped, close
+bursts merged), adapt to a louder floor, treat skipped audio as silence, and keep silent windows
+away from the transcriber."""
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from cicada.vad import StreamingVAD, VADGatedTranscriber, VADParameters
+
+FS = 16000
+FRAME = 480 # 30 ms
+
+def _noise(sec: float, level_db: float, seed: int = 0) -> np.ndarray:
+	return np.random.default_rng(seed).normal(0.0, 10 ** (level_db / 20), int(sec * FS)).astype(np.float32)
+
+def _with_tones(x: np.ndarray, l_bursts: list[tuple[float, float]]) -> np.ndarray:
+	x = x.copy()
+	for t0, t1 in l_bursts:
+		n0, n1 = int(t0 * FS), int(t1 * FS)
+		x[n0:n1] += 0.3 * np.sin(2 * np.pi * 440 * np.arange(n1 - n0) / FS)
+	return x
+
+def _feed(vad: StreamingVAD, x: np.ndarray, block: int = 1600):
+	for i in range(0, len(x), block):
+		vad.update(x[i:(i + block)])
+
+def test_bursts_and_padding():
+	vad = StreamingVAD(VADParameters(fs_Hz=FS))
+	pad = int(0.2 * FS)
+	x = _with_tones(_noise(8.0, -50), [(2.0, 3.0), (4.0, 4.05), (5.0, 5.5), (5.8, 6.2)]) # speech, click, two close bursts
+	_feed(vad, x)
+	l_regions = vad.speech_regions(0, len(x))
+	assert len(l_regions) == 2, l_regions # the click is dropped, the close bursts merge
+	(a0, b0), (a1, b1) = l_regions
+	assert 2 * FS - pad - FRAME <= a0 <= 2 * FS - pad and b0 == 3 * FS + pad # padding either side, frame aligned
+	assert 5 * FS - pad - FRAME <= a1 <= 5 * FS - pad and 6.2 * FS + pad <= b1 <= 6.2 * FS + pad + FRAME
+	assert vad.speech_regions(int(2.5 * FS), int(4.5 * FS)) == [(int(2.5 * FS), 3 * FS + pad)] # clipped to the window
+	assert vad.speech_regions(int(3.5 * FS), int(4.8 * FS)) == []
+
+	silent = StreamingVAD(VADParameters(fs_Hz=FS))
+	_feed(silent, np.zeros(3 * FS, dtype=np.float32))
+	assert silent.speech_regions(0, 3 * FS) == [] # digital silence is below min_level_db
+
+def test_floor_adapts_and_skips():
+	vad = StreamingVAD(VADParameters(fs_Hz=FS))
+	x = np.concatenate([_noise(2.0, -50, seed=1), _noise(12.0, -30, seed=2)]) # the floor climbs at 2 dB/s
+	_feed(vad, x)
+	l_regions = vad.speech_regions(0, len(x))
+	assert len(l_regions) == 1
+	a, b = l_regions[0]
+	assert a <= 2 * FS and 7.0 * FS < b < 8.2 * FS # (20 - 9) dB / 2 dB/s = 5.5 s, plus padding
+
+	vad.skip(2 * FS) # e.g. dropped windows
+	n_end = len(x) + 2 * FS
+	assert vad.speech_regions(len(x), n_end) == []
+	_feed(vad, _with_tones(_noise(1.0, -30, seed=3), [(0.5, 0.8)]))
+	assert [(a - n_end, b - n_end) for a, b in vad.speech_regions(n_end, n_end + FS)] == [(int(0.3 * FS), int(1.0 * FS))]
+
+class _StubTranscriber:
+	def __init__(self, timeline: bool = False):
+		self.timeline = timeline
+		self.l_inputs = []
+		self.l_resets = []
+
+	def transcribe_window(self, window_audio, end_sam):
+		self.l_inputs.append((len(window_audio), end_sam))
+		return "words"
+
+	def reset(self, end_sam):
+		self.l_resets.append(end_sam)
+
+def test_gated_transcriber():
+	x = _with_tones(_noise(6.0, -50), [(3.5, 4.0)])
+	for timeline in (False, True):
+		inner = _StubTranscriber(timeline)
+		gated = VADGatedTranscriber(inner, StreamingVAD(VADParameters(fs_Hz=FS)))
+		l_texts = [gated.transcribe_window(x[max(0, end - 2 * FS):end], end) for end in range(FS, 6 * FS + 1, FS)]
+		assert l_texts == ["", "", "", "words", "words", ""]
+		assert inner.l_resets == [FS, 2 * FS, 3 * FS, 6 * FS]
+		n_speech = int(0.5 * FS) + 2 * int(0.2 * FS)
+		if timeline:
+			assert inner.l_inputs == [(2 * FS, 4 * FS), (2 * FS, 5 * FS)] # word timestamps need the whole window
+		else:
+			assert [end for _, end in inner.l_inputs] == [4 * FS, 5 * FS]
+			l_expected = [int(0.7 * FS), n_speech] # the first window ends before the trailing padding does
+			assert all(n <= n_in <= n + 2 * FRAME for (n_in, _), n in zip(inner.l_inputs, l_expected)) # edges round out to frames
+		assert gated.stats.windows_skipped == 4
+		assert 0.7 * FS <= gated.stats.n_speech <= 0.7 * FS + 2 * FRAME # counted as audio arrives: the padding after 4 s is not
+		assert gated.stats.n_in == 6 * FS
+
+if __name__ == "__main__":
+	test_bursts_and_padding()
+	test_floor_adapts_and_skips()
+	test_gated_transcriber()
+	print("VAD test success")
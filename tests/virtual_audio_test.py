@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Headless test of the virtual audio devices: a transmission submitted at a known
+point of a virtual mic's stream lands at that point of the virtual speaker's output."""
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from cicada import audio_io, payload
+from cicada.modem import Modem
+from cicada.transmitter import StreamTransmitter
+from cicada.fsk.waveform import FSKWaveform
+from cicada.fsk.demodulator import FSKDemodulator, FSKDemodulatorParameters
+
+MIC_FS_HZ = 16000.0
+SUBMIT_SEC = 2.0
+
+def test_array_input_delivers_everything():
+	x = np.random.default_rng(0).standard_normal(10_000).astype(np.float32)
+	mic = audio_io.ArrayInput(x, MIC_FS_HZ)
+	l_blocks = []
+	with audio_io.open_input(mic, MIC_FS_HZ, 1024, lambda indata, frames, t, status: l_blocks.append(indata[:, 0].copy())) as stream:
+		while stream.active: mic.wait_for(1e9, timeout=0.1)
+	assert mic.finished and np.array_equal(np.concatenate(l_blocks), x)
+
+def test_transmission_is_aligned_with_virtual_mic():
+	wf = FSKWaveform()
+	modem = Modem(wf, demodulator=FSKDemodulator(FSKDemodulatorParameters(plot=False), wf=wf), use_ldpc=True, use_bit_mask=True)
+	pl_bytes = payload.Payload.get_class("plaintext").from_transcript("virtual speaker check").to_bytes()
+
+	mic = audio_io.ArrayInput(np.zeros(int(8 * MIC_FS_HZ), dtype=np.float32), MIC_FS_HZ) # paced by the callback below
+	speaker = audio_io.ArrayOutput(clock=mic)
+	tx = StreamTransmitter(modem, device=speaker).start()
+	submitted = []
+	def _callback(indata, frames, time_info, status):
+		if not submitted and time_info.currentTime >= SUBMIT_SEC:
+			tx.submit(pl_bytes)
+			submitted.append(True)
+			tx.wait_rendered() # before the stream moves on, as in a consumer-paced signer
+	with audio_io.open_input(mic, MIC_FS_HZ, 1024, _callback) as stream:
+		while stream.active: mic.wait_for(1e9, timeout=0.1)
+	tx.stop()
+
+	out = speaker.samples
+	assert len(out) >= len(modem.modulate_bytes(pl_bytes))
+	start = int(np.flatnonzero(out)[0])
+	assert abs(start / wf.fs_Hz - SUBMIT_SEC) < 0.2, start / wf.fs_Hz
+	recovered, _ = modem.recover_bytes(out)
+	assert any(rec[:len(pl_bytes)] == pl_bytes for rec in recovered)
+
+if __name__ == "__main__":
+	test_array_input_delivers_everything()
+	test_transmission_is_aligned_with_virtual_mic()
+	print("Virtual audio test success")
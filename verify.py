@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """Verification CLI for SignaturePayloads or PlaintextPayloads."""
 import argparse
+import sys
 from pathlib import Path
 import extract as extract_cli
 from cicada import interface, payload, verification
+from cicada.ingest import WHISPER_FS_HZ, ingest
 
 def main(argv: list[str] | None = None):
 	parser = interface.build_verify_parser()
@@ -20,15 +22,25 @@ def main(argv: list[str] | None = None):
 	else:
 		output_md = interface.resolve_output_path(out_dir, args.output_md)
 
+	if args.frames_csv is None and args.input_wav is None:
+		parser.error("A frames CSV is required when verifying from a markdown transcript.")
+	audio = None
+	if args.input_wav is not None: # one read of the recording feeds both the demodulator and Whisper
+		l_rates = [WHISPER_FS_HZ] + ([args.wf_fs] if args.frames_csv is None else [])
+		print(f"[verify] reading {args.input_wav}")
+		audio = ingest(args.input_wav, rates=l_rates, start_sec=args.start, end_sec=args.end)
+
 	if args.frames_csv is None:
-		if args.input_wav is None:
-			parser.error("A frames CSV is required when verifying from a markdown transcript.")
 		extract_args = argparse.Namespace(
 			out_dir=args.out_dir,
 			debug=args.debug,
 			payload_type=args.payload_type,
 			input_wav=args.input_wav,
+			start=args.start,
+			end=args.end,
 			output_csv=Path(f"{Path(args.input_wav).stem}_frames.csv"),
+			soft_frames=None,
+			write_soft_frames=True,
 			nonascii_discard_threshold=args.nonascii_discard_threshold,
 			wf_bits_per_symbol=args.wf_bits_per_symbol,
 			wf_fs=args.wf_fs,
@@ -44,17 +56,24 @@ def main(argv: list[str] | None = None):
 			demod_highpass=args.demod_highpass,
 			demod_plot=args.demod_plot,
 			use_ldpc=args.use_ldpc,
+			use_transport=args.use_transport,
 			discard_duplicate_frames=args.discard_duplicate_frames,
 		)
 		print("[verify] no frames CSV provided; extracting frames first...")
-		frames_csv = extract_cli.extract_payloads(extract_args)
+		frames_csv = extract_cli.extract_payloads(extract_args, audio=audio)
 	else:
 		frames_csv = args.frames_csv
 
 	payload_cls = payload.Payload.get_class(args.payload_type)
-	if payload_cls.requires_bls_keys and not args.bls_pubkey.exists():
-		parser.error("BLS pubkey required for this payload type.")
-	verification.run_verification(payload_cls, args, frames_csv, output_md)
+	if args.keyring is not None and not args.keyring.exists():
+		parser.error(f"Keyring {args.keyring} not found.")
+	if payload_cls.requires_bls_keys and args.keyring is None and not args.bls_pubkey.exists():
+		parser.error("BLS pubkey or keyring required for this payload type.")
+	if args.input_wav is not None:
+		interface.build_asr_config(args, out_dir) # with --rtf-budget, swaps in the benchmarked model size and compute type
+	command = sys.argv if argv is None else ["cicada.py", "verify", *argv] # argv of this run, not of a serve/batch process running it
+	verification.run_verification(payload_cls, args, frames_csv, output_md, audio=audio, command=command)
+	return output_md
 
 if __name__ == "__main__":
 	main()